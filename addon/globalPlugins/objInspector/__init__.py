@@ -5,17 +5,13 @@
 
 # Shows a list of objects in active window
 
+from time import perf_counter
+# Time taken to import the add-on, reported in the log when the plugin is created
+_importStart = perf_counter()
 import globalPluginHandler
 import api
 import controlTypes
-# controlTypes module compatibility with old versions of NVDA
-if not hasattr(controlTypes, "Role"):
-	setattr(controlTypes, "Role", type('Enum', (), dict(
-	[(x.split("ROLE_")[1], getattr(controlTypes, x)) for x in dir(controlTypes) if x.startswith("ROLE_")])))
-	setattr(controlTypes, "State", type('Enum', (), dict(
-	[(x.split("STATE_")[1], getattr(controlTypes, x)) for x in dir(controlTypes) if x.startswith("STATE_")])))
-	setattr(controlTypes, "role", type("role", (), {"_roleLabels": controlTypes.roleLabels}))
-# End of compatibility fixes
+from .compat import fixControlTypes
 import ui
 import winUser
 import gui
@@ -24,32 +20,75 @@ import globalCommands
 import globalVars
 import addonHandler
 import scriptHandler
+import textInfos
 import os
+from logHandler import log
 from tones import beep
-from hashlib import md5
-from time import sleep
-from threading import Thread
-try:
-	import cPickle as pickle
-except ImportError:
-	import pickle
 import config
+from .scanner import Scanner, ScanJob, ScanResult
+from .nodeTable import OBJECT, NodeTable, takeSnapshot, makeCaption, favoriteHash, chainStep
+from .pruning import PruneRules
+from .instrumentation import ScanStats
+from .favorites import FavoritesStore
+from .filters import FilterEngine
+from .scanCache import ScanCache, windowKey
+from . import incremental
 
 confspec = {
-	"documents":"boolean(default=False)"
+	"documents":"boolean(default=False)",
+	# Scan budgets, 0 means no limit
+	"maxDepth":"integer(default=0, min=0)",
+	"maxNodes":"integer(default=0, min=0)",
+	"timeLimit":"integer(default=0, min=0)",
+	# Threads that walk the subtrees of the foreground object, 1 means a sequential scan
+	"workers":"integer(default=1, min=1, max=16)",
+	# Seconds a scan is kept to open the list again on the same window, 0 disables the cache
+	"cacheTTL":"integer(default=60, min=0)",
+	# Megabytes of memory for the cache of scans
+	"cacheSize":"integer(default=50, min=1)",
+	# Objects whose descendants are not walked, one rule per item. See pruning.py
+	"pruneRules":"string_list(default=list())",
+	# Record timings and property reads of each scan
+	"scanStats":"boolean(default=True)",
+	# Copy the subtrees that have not changed since the previous scan of the window instead of reading them again
+	"reuseSubtrees":"boolean(default=True)",
+	# Write the trees walked by the scans to files that can be replayed by the benchmarks
+	"recordScans":"boolean(default=False)"
 }
 config.conf.spec["objInspector"]=confspec
 
 addonHandler.initTranslation()
 
+def recordingsPath():
+	# Recorded trees are kept in the configuration of the user, they are not removed when the add-on is updated
+	return os.path.join(globalVars.appArgs.configPath, "objInspector", "recordings")
+
 class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 
 	scriptCategory = "objInspector"
 
 	def __init__(self):
+		start = perf_counter()
 		super(GlobalPlugin, self).__init__()
 		self._objectsListDialog = None
-		self.settingsDialog = SettingsDialog(gui.mainFrame)
+		self._scanJob = None
+		# Dialogs and favorites are created the first time they are needed, most sessions never use them
+		self._favorites = None
+		self._settingsDialog = None
+		self.scanCache = ScanCache()
+		# Events of the windows in the cache since they were scanned
+		self.changeTracker = incremental.ChangeTracker()
+		# Process of each window scanned by cache key, to note its events also while it is not in the foreground
+		self._scannedProcesses = {}
+		# Root object, cache key and title of the scan shown in the objects window
+		self._lastScan = None
+		# ScanStats of the scan in progress and of the last one completed
+		self._scanStats = None
+		self.lastScanStats = None
+		# SnapshotTable opened from a file, closed when another one is opened
+		self._snapshot = None
+		# Objects per second of the last complete sequential scan of each window, to measure the parallel ones
+		self._sequentialRates = {}
 		# Set preferences menu
 		self.menu = gui.mainFrame.sysTrayIcon.preferencesMenu
 		self.BSMenu = wx.Menu()
@@ -62,57 +101,375 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		self.importItem = self.BSMenu.Append(wx.ID_ANY,
 		_("Import favorites"), "")
 		gui.mainFrame.sysTrayIcon.Bind(wx.EVT_MENU, self.onImportFavorites, self.importItem)
+		self.openSnapshotItem = self.BSMenu.Append(wx.ID_ANY,
+		_("Open snapshot..."), "")
+		gui.mainFrame.sysTrayIcon.Bind(wx.EVT_MENU, self.onOpenSnapshot, self.openSnapshotItem)
+		self.cacheStatsItem = self.BSMenu.Append(wx.ID_ANY,
+		_("Scan cache statistics"), "")
+		gui.mainFrame.sysTrayIcon.Bind(wx.EVT_MENU, self.onCacheStats, self.cacheStatsItem)
+		self.scanReportItem = self.BSMenu.Append(wx.ID_ANY,
+		_("Last scan report"), "")
+		gui.mainFrame.sysTrayIcon.Bind(wx.EVT_MENU, self.onScanReport, self.scanReportItem)
 		self.settingsItem = self.BSMenu.Append(wx.ID_ANY,
 		_("Settings"), "")
 		gui.mainFrame.sysTrayIcon.Bind(wx.EVT_MENU, self.onSettings, self.settingsItem)
+		self.startupTimes = (importTime, perf_counter()-start)
+		log.debug("objInspector loaded: import %.1f ms, init %.1f ms" % (self.startupTimes[0]*1000, self.startupTimes[1]*1000))
+
+	@property
+	def favorites(self):
+		# FavoritesStore shared with the objects window, loaded when the window is created
+		if self._favorites is None:
+			self._favorites = FavoritesStore()
+		return self._favorites
+
+	@property
+	def settingsDialog(self):
+		if self._settingsDialog is None:
+			self._settingsDialog = SettingsDialog(gui.mainFrame)
+		return self._settingsDialog
 
 	def script_scanObjects(self, gesture):
+		fixControlTypes()
+		if self._scanJob and self._scanJob.is_alive():
+			# Pressing the gesture again while searching aborts the scan, also from the objects window
+			self._scanJob.cancel()
+			return()
 		obj = api.getForegroundObject()
 		# Limitations: not available in NVDA dialogs nor secure windows
 		if (obj.appModule.productName == "NVDA" and obj.role == controlTypes.Role.DIALOG) or globalVars.appArgs.secure == True:
 			beep(300, 100)
 			ui.message(_("Not available  here"))
 			return()
-		obj = OBJECT(obj, [])
-		ui.message(_("Searching..."))
-		feedback = feedbackThread()
-		feedback.start()
-		try:
-			objects = self.scan([obj])
-		except Exception as inst:
-			feedback.stop()
-			beep(200, 100)
-			ui.message(_("Search failed\n%s %s") % (type(inst), inst.args))
-			return()
-		feedback.stop()
 		title = _("Objects in %s window") % api.getForegroundObject().appModule.appName
-		label = _("%d items") % len(objects)
-		self._createObjectsWindow(objects, title, label)
+		key = windowKey(obj)
+		conf = config.conf["objInspector"]
+		self.scanCache.ttl = conf["cacheTTL"]
+		self.scanCache.maxBytes = conf["cacheSize"]*1024*1024
+		# An expired scan is discarded by get, but it can still be the reference of the new one
+		previous = self.scanCache.peek(key)
+		reference = previous.result if previous and conf["reuseSubtrees"] and not conf["recordScans"] else None
+		# Recorded scans always walk the tree
+		entry = self.scanCache.get(key) if not conf["recordScans"] else None
+		if entry:
+			# Translators: Shown after the items count when the list comes from the cache
+			note = _("(cached {:.0f} seconds ago)").format(entry.age)
+			stats = self.refreshCachedScan(key, entry)
+			if stats is None:
+				self.scanCache.discard(key)
+				self.startScan(obj, key, title)
+				return()
+			if stats.changes:
+				# Translators: Shown after the items count when the list comes from the cache and some objects have been read again
+				note = _("(cached, {count} objects updated)").format(count=stats.touched)
+			if entry.result.truncated:
+				# The list of a truncated scan is not the whole window, also when it comes from the cache
+				note = "%s %s" % (truncatedLabels[entry.result.truncated], note)
+				ui.message(_("{count} objects {note}").format(count=len(entry.result), note=note))
+			self._lastScan = (obj, key, title)
+			self._createObjectsWindow(list(entry.result.table), title, _("%d items") % len(entry.result))
+			self._endObjectsWindowSearch(note)
+			return()
+		self.startScan(obj, key, title, reference)
 	# Translators: Message presented in input help mode.
 	script_scanObjects.__doc__ = _("Shows a list of objects in the active window")
 
-	def scan(self, objects=[]):
-		index = 0
-		children = []
-		patern = objects[-1]
-		if patern.obj.role != controlTypes.Role.DOCUMENT or config.conf["objInspector"]["documents"]:
-			for child in patern.obj.children:
-				# Consider only objects that are visible on screen
-				if child.location and child.location != (0, 0, 0, 0) and controlTypes.State.INVISIBLE not in child.states:
-					children.append(OBJECT(child, [index]))
-				index = index+1
-		for child in children:
-			# Save object ancestry
-			child.ancestry = patern.ancestry+child.ancestry
-			objects.append(child)
-			self.scan(objects)
-		return(objects)
-
-	def _createObjectsWindow(self, objects, title, label):
+	def script_jumpToFavorite(self, gesture):
+		fixControlTypes()
+		root = api.getForegroundObject()
+		if globalVars.appArgs.secure == True:
+			beep(300, 100)
+			ui.message(_("Not available  here"))
+			return()
+		favorites = self.loadFavorites()
+		hashes = favorites.resolvable(root.appModule.appName)
+		if not hashes:
+			ui.message(_("There are no favorites of this application to jump to. Favorites saved by previous versions are updated when the window is scanned"))
+			return()
+		if len(hashes) == 1:
+			self.jumpToFavorite(root, hashes[0])
+			return()
+		hashes.sort(key=lambda hash: favorites.entries[hash]["caption"])
+		wx.CallAfter(self._chooseFavorite, root, hashes, self.findFavorites(root, hashes))
+	# Translators: Message presented in input help mode.
+	script_jumpToFavorite.__doc__ = _("Moves the navigator object to a favorite of the active window without scanning it")
+
+	def findFavorites(self, root, hashes):
+		# Hashes of the favorites that are at their saved path, resolved together so that the levels they share are read once
+		from .pathTrie import PathTrie
+		entries = [self.favorites.entries[hash] for hash in hashes]
+		resolution = PathTrie(root).resolve([entry["path"] for entry in entries], [entry["steps"] for entry in entries])
+		return set([hash for hash, obj in zip(hashes, resolution.objects) if obj is not None])
+
+	def _chooseFavorite(self, root, hashes, found):
+		captions = []
+		for hash in hashes:
+			caption = self.favorites.entries[hash]["caption"]
+			if hash not in found:
+				# Translators: Added to a favorite of the jump list that is not at its saved place; it may be found near it
+				caption = "%s (%s)" % (caption, _("moved or not found"))
+			captions.append(caption)
+		dlg = wx.SingleChoiceDialog(gui.mainFrame, _("Favorite:"), _("Jump to favorite"), captions)
+		gui.mainFrame.prePopup()
+		result = dlg.ShowModal()
+		gui.mainFrame.postPopup()
+		selection = dlg.GetSelection()
+		dlg.Destroy()
+		if result == wx.ID_OK:
+			# Wait until the foreground window is back
+			wx.CallLater(100, self.jumpToFavorite, root, hashes[selection])
+
+	def jumpToFavorite(self, root, hash):
+		resolution = self.resolveFavorite(hash, root)
+		if resolution is None or resolution.obj is None:
+			ui.message(_("Favorite not found, scan the window to look for it"))
+			return()
+		api.setNavigatorObject(resolution.obj)
+		scriptHandler.executeScript(globalCommands.commands.script_navigatorObject_current, None)
+
+	def loadFavorites(self):
+		# Favorites are loaded when the objects window is created
+		favorites = self.favorites
+		if not self._objectsListDialog:
+			try:
+				favorites.load()
+			except:
+				pass
+		return favorites
+
+	def resolveFavorite(self, hash, root=None):
+		"""Finds a favorite walking its path from root, the foreground object by default, instead of scanning the window.
+		Returns a resolver.Resolution whose obj is None if it is not there, or None if the favorite does not know its path.
+		A favorite found at another path, after a bounded search among the siblings along it, must have the same caption;
+		it is saved with its new path and hash.
+		"""
+		from .resolver import PathResolver, Step, pathHash
+		favorites = self.loadFavorites()
+		entry = favorites.entries.get(hash)
+		if entry is None or entry.get("path") is None:
+			return None
+		if root is None:
+			root = api.getForegroundObject()
+		appName = root.appModule.appName
+		if appName != entry["app"]:
+			return None
+		accept = lambda obj: makeCaption(takeSnapshot(obj)) == entry["caption"]
+		resolution = PathResolver().resolve(root, entry["path"], entry["steps"], accept)
+		if resolution.moved:
+			target = resolution.steps[-1] if resolution.steps else Step(root.role, root.windowClassName)
+			favorites.move(hash, pathHash(appName, target, resolution.steps, resolution.path), resolution.path, resolution.steps)
+			try:
+				favorites.save()
+			except Exception as inst:
+				log.warning("objInspector: can not save favorites: %s" % inst)
+		return resolution
+
+	def refreshCachedScan(self, key, entry):
+		"""Reads again the objects of a cached scan affected by the events received since it was stored.
+		Returns incremental.RefreshStats, or None if the window must be scanned again entirely.
+		"""
+		changes = self.changeTracker.pop(key)
+		if changes is None:
+			return None
+		if not changes:
+			return incremental.RefreshStats(0, 0, 0, len(entry.result), 0.0)
+		try:
+			stats = incremental.Refresher(entry.result.table, Scanner()).apply(changes)
+		except incremental.RefreshFailed:
+			return None
+		self.scanCache.resize(key)
+		log.info("objInspector refresh: %d events, %d subtrees walked, %d objects read, %d objects in %.3f seconds" % (stats.changes, stats.subtrees, stats.touched, stats.total, stats.elapsed))
+		return stats
+
+	def startScan(self, root, key, title, reference=None):
+		# reference is a previous ScanResult of the window whose unchanged subtrees are copied
+		self._lastScan = (root, key, title)
+		self.changeTracker.discard(key)
+		for oldKey in [oldKey for oldKey in self._scannedProcesses if oldKey not in self.scanCache]:
+			del self._scannedProcesses[oldKey]
+		self._scannedProcesses[key] = root.processID
+		ui.message(_("Searching..."))
+		self._firstBatch = True
+		self._scanStats = ScanStats() if config.conf["objInspector"]["scanStats"] else None
+		recorder = None
+		if config.conf["objInspector"]["recordScans"]:
+			from .recorder import TreeRecorder
+			try:
+				recorder = TreeRecorder(TreeRecorder.defaultPath(recordingsPath(), root.appModule.appName), root.appModule.appName)
+			except Exception as inst:
+				log.error("objInspector can not record the scan: %s" % inst)
+		scanner = Scanner(onProgress=self._onScanProgress, stats=self._scanStats, recorder=recorder, reference=reference)
+		self._scanJob = ScanJob(scanner, root,
+		onBatch=lambda rows: self._onScanBatch([scanner.table[i] for i in rows], title),
+		onFinish=lambda result: self._onScanFinish(result, key, recorder),
+		onError=lambda inst: self._onScanError(inst, recorder))
+		self.bindGesture("kb:escape", "cancelScan")
+		self._scanJob.start()
+
+	def refreshScan(self):
+		# Scans again the window shown in the objects list, ignoring the cache and reading every object
+		if not self._lastScan or (self._scanJob and self._scanJob.is_alive()):
+			return()
+		root, key, title = self._lastScan
+		self.scanCache.discard(key)
+		self.startScan(root, key, title)
+
+	# Events of the objects of the foreground window are noted while its scan is in the cache
+	def event_nameChange(self, obj, nextHandler):
+		self._noteChange(obj, incremental.NODE)
+		nextHandler()
+
+	def event_gainFocus(self, obj, nextHandler):
+		self._noteChange(obj, incremental.NODE)
+		nextHandler()
+
+	def event_stateChange(self, obj, nextHandler):
+		# Children can appear or disappear when an object is expanded or collapsed
+		self._noteChange(obj, incremental.SUBTREE)
+		nextHandler()
+
+	def event_reorder(self, obj, nextHandler):
+		self._noteChange(obj, incremental.SUBTREE)
+		nextHandler()
+
+	def event_show(self, obj, nextHandler):
+		self._noteChange(obj, incremental.PARENT)
+		nextHandler()
+
+	def event_hide(self, obj, nextHandler):
+		self._noteChange(obj, incremental.PARENT)
+		nextHandler()
+
+	def _noteChange(self, obj, kind):
+		if not len(self.scanCache):
+			return()
+		try:
+			keys = self._cachedWindows(obj)
+		except Exception:
+			return()
+		for key in keys:
+			self.changeTracker.note(key, obj, kind)
+
+	def _cachedWindows(self, obj):
+		# Keys of the cached windows that obj can belong to: the ones of its process, narrowed to its top level window if there are several
+		keys = [key for key, processID in self._scannedProcesses.items() if processID == obj.processID and key in self.scanCache]
+		if len(keys) > 1:
+			window = winUser.getAncestor(obj.windowHandle, winUser.GA_ROOT)
+			keys = [key for key in keys if key[0] == window] or keys
+		return keys
+
+	def expandObject(self, OBJ):
+		"""Walks the descendants of a collapsed placeholder and puts them in the table of its scan after it.
+		Returns the table with the object and its descendants.
+		"""
+		table = OBJ.table
+		index = OBJ.index
+		parent = table.parents[index]
+		if parent < 0:
+			chain, path = "", None
+		else:
+			chain, path = table.signature(parent)
+		scanner = Scanner()
+		subtree = scanner.scanSubtree(OBJ.obj, takeSnapshot(OBJ.obj), table.ordinals[index], table.depth(index),
+		chain, path, table.appName, expand=True)
+		subtree.flags[0] = table.flags[index] & ~NodeTable.PRUNED
+		table.splice(index, index+1, subtree, parent)
+		if self._lastScan and self._lastScan[1] in self.scanCache:
+			self.scanCache.resize(self._lastScan[1])
+		return subtree
+
+	def script_cancelScan(self, gesture):
+		if self._scanJob and self._scanJob.is_alive():
+			self._scanJob.cancel()
+		else:
+			gesture.send()
+
+	# Callbacks of the scan job. They are called from its thread so the window is updated with wx.CallAfter.
+	def _onScanBatch(self, objects, title):
+		if self._firstBatch:
+			# The window is opened with the first batch of objects and filled while the walk goes on.
+			self._firstBatch = False
+			wx.CallAfter(self._populateObjectsWindow, self._createObjectsWindow, objects, title, _("%d items") % len(objects), True)
+		else:
+			wx.CallAfter(self._populateObjectsWindow, self._appendToObjectsWindow, objects)
+
+	def _onScanProgress(self, progress):
+		ui.message(_("Searching... {found} objects, {rate:.0f} per second, depth {depth}").format(
+		found=progress.found, rate=progress.rate, depth=progress.depth))
+
+	def _onScanFinish(self, result, key, recorder=None):
+		wx.CallAfter(self.removeGestureBinding, "kb:escape")
+		if recorder:
+			recorder.close()
+			log.info("objInspector scan recorded in %s: %d objects, %d property reads" % (recorder.path, recorder.nodes, recorder.reads))
+		if result.truncated != ScanResult.CANCELLED:
+			wx.CallAfter(self.scanCache.put, key, result)
+		# Translators: Final timing of a scan, for example "in 2.5 seconds"
+		note = _("in {:.1f} seconds").format(result.elapsed)
+		self._measureSpeedup(result, key)
+		if result.speedup:
+			# Translators: Added to the final timing of a parallel scan, compared with the last sequential scan of the same window
+			note = "%s %s" % (note, _("(parallel, {:.1f} times the speed of a sequential scan)").format(result.speedup))
+		elif result.limits.workers > 1:
+			# Translators: Added to the final timing of a parallel scan when there is no sequential scan of the same window to compare with
+			note = "%s %s" % (note, _("(parallel, {workers} workers)").format(workers=result.limits.workers))
+		if result.pruned:
+			# Translators: Added to the final timing of a scan when some objects have not been explored because of the pruning rules
+			note = "%s %s" % (note, _("({count} collapsed)").format(count=result.pruned))
+		reuse = result.reuse
+		if reuse and reuse.reusedRows:
+			# Translators: Added to the final timing of a scan when some objects have been copied from the previous scan of the window
+			note = "%s %s" % (note, _("({count} reused)").format(count=reuse.reusedRows))
+			log.info("objInspector scan: %d objects reused in %d subtrees, %d subtrees checked with %d reads in %.3f seconds, about %.3f seconds saved" % (
+			reuse.reusedRows, reuse.reusedSubtrees, reuse.probedSubtrees, reuse.probeReads, reuse.probeTime, reuse.timeSaved))
+		if result.truncated:
+			note = "%s %s" % (truncatedLabels[result.truncated], note)
+		if result.truncated or result.elapsed >= Scanner.progressDelay:
+			ui.message(_("{count} objects {note}").format(count=len(result), note=note))
+		log.info("objInspector scan: %d objects, %d property reads, %d reads saved by snapshots" % (len(result), result.fetches, result.fetchesSaved))
+		if not self._firstBatch:
+			wx.CallAfter(self._finishObjectsWindow, note)
+
+	def _measureSpeedup(self, result, key):
+		# The sum of the times of the threads is inflated by the lock of the interpreter, so parallel scans are compared with a sequential one
+		if result.truncated or not result.elapsed or (result.reuse and result.reuse.reusedRows):
+			return()
+		rate = len(result)/result.elapsed
+		if result.limits.workers <= 1:
+			self._sequentialRates[key] = rate
+		elif key in self._sequentialRates:
+			result.speedup = rate/self._sequentialRates[key]
+
+	def _onScanError(self, inst, recorder=None):
+		wx.CallAfter(self.removeGestureBinding, "kb:escape")
+		if recorder:
+			recorder.close()
+		beep(200, 100)
+		ui.message(_("Search failed\n%s %s") % (type(inst), inst.args))
+		if not self._firstBatch:
+			wx.CallAfter(self._endObjectsWindowSearch, "")
+
+	def scan(self, root, limits=None):
+		# Returns a ScanResult with root followed by all its visible descendants
+		fixControlTypes()
+		return Scanner(limits).scan(root)
+
+	def find(self, query, root=None, limit=0):
+		"""Returns a query.MatchTable with the objects below root, the foreground object by default, that match a query.Query.
+		The walk stops after limit objects, 0 for no limit. See query.py.
+		"""
+		fixControlTypes()
+		# Imported here so that loading the add-on does not need it
+		from .query import Finder
+		return Finder(query).find(root if root is not None else api.getForegroundObject(), limit)
+
+	def _createObjectsWindow(self, objects, title, label, searching=False):
 		# If this is the first call create the Window
 		if not self._objectsListDialog:
-			self._objectsListDialog = ObjectsListDialog(gui.mainFrame, objects)
-		self._objectsListDialog.updateDialog(objects, title, label)
+			self._objectsListDialog = ObjectsListDialog(gui.mainFrame, objects, favorites=self.favorites)
+			self._objectsListDialog.refreshHandler = self.refreshScan
+			self._objectsListDialog.expandHandler = self.expandObject
+		self._objectsListDialog.updateDialog(objects, title, label, searching)
 		# Show the window if it is Hiden
 		if not self._objectsListDialog.IsShown():
 			gui.mainFrame.prePopup()
@@ -120,18 +477,93 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			self._objectsListDialog.Centre()
 			gui.mainFrame.postPopup()
 
+	def _appendToObjectsWindow(self, objects):
+		self._objectsListDialog.appendObjects(objects)
+
+	def _endObjectsWindowSearch(self, note):
+		self._objectsListDialog.endSearch(note)
+
+	def _populateObjectsWindow(self, function, *args):
+		# Calls function with a batch of a scan, adding its time to the list phase of the statistics
+		start = perf_counter()
+		function(*args)
+		if self._scanStats:
+			self._scanStats.addPhase("list", perf_counter()-start)
+
+	def _finishObjectsWindow(self, note):
+		self._endObjectsWindowSearch(note)
+		stats = self._scanStats
+		if not stats:
+			return()
+		# Favorites are marked while the list is filled, their time is moved to its own phase
+		favoritesTime = self._objectsListDialog.favoritesTime
+		stats.addPhase("favorites", favoritesTime)
+		stats.addPhase("list", -favoritesTime)
+		self.lastScanStats = stats
+		self._scanStats = None
+		log.debug("objInspector scan report\n%s" % stats.report())
+
 	def onSettings(self, event):
+		fixControlTypes()
 		gui.mainFrame.prePopup()
 		self.settingsDialog.Show()
 		self.settingsDialog.Centre()
 		self.settingsDialog.checkboxDocuments.SetFocus()
 		gui.mainFrame.postPopup()
 
+	def onCacheStats(self, event):
+		cache = self.scanCache
+		gui.messageBox(_("Hits: {hits}\nMisses: {misses}\nEvictions: {evictions}\nWindows in cache: {count}\nMemory: {size} KB").format(
+		hits=cache.hits, misses=cache.misses, evictions=cache.evictions, count=len(cache), size=cache.size//1024),
+		_("Scan cache statistics"), wx.ICON_INFORMATION)
+
+	def onScanReport(self, event):
+		if not self.lastScanStats:
+			gui.messageBox(_("There is no scan report yet. Scans record it when \"Record scan statistics\" is checked in the settings."),
+			_("Last scan report"), wx.ICON_INFORMATION)
+			return()
+		report = self.lastScanStats.report()
+		# Also in the log so that it can be attached to bug reports
+		log.info("objInspector scan report\n%s" % report)
+		ui.browseableMessage(report, _("Last scan report"))
+
+	def onOpenSnapshot(self, event):
+		fixControlTypes()
+		dlg = wx.FileDialog(gui.mainFrame,
+		_("Select a snapshot file"),
+		os.getenv('USERPROFILE'), "",
+		_("Snapshot files(*.ois)|*.ois|All files(*.*)|*.*"), wx.FD_OPEN)
+		gui.mainFrame.prePopup()
+		result = dlg.ShowModal()
+		gui.mainFrame.postPopup()
+		if result != wx.ID_OK:
+			return()
+		from .snapshotFile import SnapshotTable, SnapshotObjects
+		try:
+			table = SnapshotTable(dlg.GetPath())
+		except Exception as inst:
+			gui.messageBox(_("Error loading %s\n\n%s\n%s") % (dlg.GetPath(), type(inst), inst.args), _("Open snapshot"), wx.ICON_ERROR)
+			return()
+		if not len(table):
+			table.close()
+			gui.messageBox(_("The snapshot has no objects"), _("Open snapshot"), wx.ICON_ERROR)
+			return()
+		old = self._snapshot
+		self._snapshot = table
+		# Translators: Title of the objects window showing a snapshot file
+		title = _("Snapshot of {app}: {title}").format(app=table.appName, title=table.title)
+		self._createObjectsWindow(SnapshotObjects(table), title, _("%d items") % len(table))
+		# Translators: Shown after the items count when a snapshot file was not completely written
+		self._endObjectsWindowSearch("" if table.complete else _("(incomplete snapshot)"))
+		# The snapshot shown before is closed once the window has switched to the new one
+		if old:
+			self._objectsListDialog.releaseTable(old)
+			old.close()
+
 	def onExportFavorites(self, event):
 		try:
-			favoritesFile = open (os.path.join(os.path.dirname(__file__), "favorites.dat"), "rb")
-			favorites = pickle.load(favoritesFile)
-			favoritesFile.close()
+			favorites = FavoritesStore()
+			favorites.load()
 		except Exception as inst:
 			gui.messageBox(_("Error loading favorites.dat file:\n\n%s\n%s") % (type(inst), inst.args), _("Export failed"), wx.ICON_ERROR)
 			return()
@@ -147,23 +579,19 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 				if gui.messageBox(_("The file already exists. do you want to replace it?"), _("Warning"), wx.YES_NO+wx.ICON_QUESTION) == 8:
 					return()
 			try:
-				exportFile = open(dlg.GetPath(), "wb")
-				pickle.dump(favorites, exportFile)
-				exportFile.close()
+				favorites.save(dlg.GetPath())
 				gui.messageBox(_("Favorites have been saved correctly"), _("Export result"), wx.ICON_INFORMATION)
 			except Exception as inst:
 				gui.messageBox(_("File can not be saved in the specified location\n\n%s\n%s") % (type(inst), inst.args), _("Warning"), wx.ICON_ERROR)
 
 	def onImportFavorites(self, event):
-		try:
-			favoritesFile = open (os.path.join(os.path.dirname(__file__), "favorites.dat"), "rb")
-			favorites = pickle.load(favoritesFile)
-			favoritesFile.close()
-		except:
-			if self._objectsListDialog:
-				favorites = self._objectsListDialog.favorites
-			else:
-				favorites = []
+		favorites = self.favorites
+		if not self._objectsListDialog:
+			# Favorites are loaded when the objects window is created
+			try:
+				favorites.load()
+			except:
+				pass
 		dlg = wx.FileDialog(gui.mainFrame,
 		_("Select your favorites file"),
 		os.getenv('USERPROFILE'), "objInspector.fav",
@@ -173,87 +601,111 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		gui.mainFrame.postPopup()
 		if result == wx.ID_OK:
 			try:
-				importFile = open(dlg.GetPath(), "rb")
-				importedFav = pickle.load(importFile)
-				importFile .close()
+				importedFav = FavoritesStore.readFile(dlg.GetPath())
 			except Exception as inst:
 				gui.messageBox(_("Error loading %s\n\n%s\n%s") % (dlg.GetPath(), type(inst), inst.args), _("Import failed"), wx.ICON_ERROR)
 				return()
-			count = 0
-			for fav in importedFav:
-				if fav not in favorites:
-					favorites.append(fav)
-					count = count +1
-			if self._objectsListDialog:
-				self._objectsListDialog.favorites = favorites
+			count = favorites.merge(importedFav)
 			if count == 0:
 				gui.messageBox(_("There are No new favorites to add"), _("Import result"), wx.ICON_INFORMATION)
 				return()
 			resultMessage = _("%d favorites added, %d total") % (count, len(favorites))
 			gui.messageBox(resultMessage, _("Import result"), wx.ICON_INFORMATION)
 			try:
-				favoritesFile = open (os.path.join(os.path.dirname(__file__), "favorites.dat"), "wb")
-				pickle.dump(favorites, favoritesFile)
-				favoritesFile.close()
+				favorites.save()
 			except Exception as inst:
 				gui.messageBox(_("Favorites have been loaded but can not be saved on file\n\n%s\n%s") % (type(inst), inst.args), _("Warning"), wx.ICON_ERROR)
 
 	__gestures = {
-	"kb:NVDA+F4": "scanObjects"
+	"kb:NVDA+F4": "scanObjects",
+	"kb:NVDA+shift+F4": "jumpToFavorite"
 	}
 
-class OBJECT():
-	def __init__(self, obj=None, ancestry=[]):
-		self.ancestry=ancestry
-		self.obj = obj
-		self.favorite = False
-		# Compose the caption of the object: roleLabel+name+description
-		role = "%s, " % controlTypes.role._roleLabels[self.obj.role]
-		if self.obj.name == None:
-			name = ""
-		else:
-			name = self.obj.name
-		if self.obj.description:
-			if name:
-				description = ", %s" % self.obj.description
-			else:
-				description = self.obj.description
-		else:
-			description = ""
-		if not name+description:
-			if self.obj.value:
-				name = self.obj.value
-				if len(name) > 50:
-					name = "%s..." % name[0:50]
-			else:
-				name = _("untagged")
-		self.caption = role+name+description
+class ObjectsListCtrl(wx.ListCtrl):
+	"""Virtual list of objects. The caption of a row is requested only when the row is shown,
+	so the strings of the whole list are never copied to the control.
+	"""
 
-	def getAncestry(self):
-		# Returns a python code to access the object. 
-		ancestry = "obj = fg"
-		for i in self.ancestry:
-			ancestry = "%s.children[%d]" % (ancestry, i)
-		return ancestry
+	def __init__(self, parent, size):
+		super(ObjectsListCtrl, self).__init__(parent, wx.NewId(), size=size,
+		style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL | wx.LC_NO_HEADER)
+		self.InsertColumn(0, "")
+		self.SetColumnWidth(0, size[0]-30)
+		self.objects = []
 
-class feedbackThread(Thread):
-	def __init__(self):
-		Thread.__init__(self)
-		self.active = True
+	def setObjects(self, objects):
+		self.objects = objects
+		self.refreshCount()
+
+	def refreshCount(self):
+		self.SetItemCount(len(self.objects))
+		self.Refresh()
+
+	def OnGetItemText(self, item, column):
+		obj = self.objects[item]
+		if obj.pruned:
+			# Translators: Added to the caption of an object whose children have not been explored; the Children button expands it
+			return "%s %s" % (obj.caption, _("(collapsed)"))
+		return obj.caption
+
+	# Same interface as wx.ListBox for the position dialog and the announcements
+	def GetCount(self):
+		return self.GetItemCount()
+
+	def IsEmpty(self):
+		return self.GetItemCount() == 0
 
-	def run (self):
-		sleep(2.0)
-		while self.active:
-			ui.message(_("Searching..."))
-			sleep(1.5)
+	def GetSelection(self):
+		return self.GetFirstSelected()
 
-	def stop(self):
-		self.active = False
+	def SetSelection(self, index):
+		self.Select(index)
+		self.Focus(index)
+		self.EnsureVisible(index)
 
 class ObjectsListDialog(wx.Dialog):
-	def __init__(self, parent, objects, title=""):
+	# Milliseconds after the last key typed in the search field before filtering
+	filterDelay = 150
+	# Choices of the screen region filter
+	REGION_ALL, REGION_MOUSE, REGION_SELECTED, REGION_NEAREST, REGION_CARET = range(5)
+	# Interactive objects listed by the region filter around the mouse or the caret
+	nearestCount = 10
+
+	def __init__(self, parent, objects, title="", favorites=None):
 		super(ObjectsListDialog, self).__init__(parent, title=title)
 		self.objects = []
+		# FavoritesStore shared with the global plugin
+		self.favorites = favorites if favorites is not None else FavoritesStore()
+		# Favorites found in the current scan, their last seen time is saved at the end
+		self.favoritesSeen = 0
+		# Seconds spent marking the favorites of the current scan
+		self.favoritesTime = 0.0
+		self.filterEngine = FilterEngine(getRoleCategories())
+		self.interactiveRoles = frozenset(getRoleCategories()[1])
+		# Typing in the search field is debounced so that the list is filtered once the user stops
+		self._filterTimer = None
+		# Called by the Refresh button to scan the window again
+		self.refreshHandler = None
+		# Called by the Children button to explore a collapsed object
+		self.expandHandler = None
+		self.filteredObjects = []
+		# True while a scan is still adding objects to the list
+		self.searching = False
+		# Shown after the items count, for example when the scan was truncated
+		self.labelNote = ""
+		self.ancestryView = False
+		# Table of the scan shown before the current one of the same window, to compare them
+		self.previousTable = None
+		# SnapshotTable opened to compare with, closed when the differences are no longer shown
+		self.comparedSnapshot = None
+		# Live objects found from the foreground object of the scan shown by their paths, None if it is not live
+		self.pathTrie = None
+		# Locations of the objects of the scan shown, built the first time the list is filtered by screen region
+		self.spatialIndex = None
+		# Mouse and caret positions when the scan was shown, and rectangle of the object selected when the region filter was chosen
+		self.mousePosition = (0, 0)
+		self.caretPosition = None
+		self.regionRect = None
 		self.loadFavorites()
 		# Create interface
 		mainSizer = wx.BoxSizer(wx.VERTICAL)
@@ -263,13 +715,13 @@ class ObjectsListDialog(wx.Dialog):
 		# Label is above the list view.
 		self.ListLabel = wx.StaticText(self, -1, label="")
 		ListSizer.Add(self.ListLabel)
-		self.listBox = wx.ListBox(self, wx.NewId(), style=wx.LB_SINGLE, size=(500, 300))
+		self.listBox = ObjectsListCtrl(self, size=(500, 300))
 		ListSizer.Add(self.listBox, proportion=8)
 		pythonLabel = wx.StaticText(self, -1, label=_("P&ython code"))
 		ListSizer.Add(pythonLabel)
 		self.pythonTextCtrl = wx.TextCtrl(self, size=(400,30), style=wx.TE_MULTILINE | wx.TE_READONLY, value = "")
 		ListSizer.Add(self.pythonTextCtrl )
-		self.Bind(wx.EVT_LISTBOX, self.onListBox, self.listBox)
+		self.Bind(wx.EVT_LIST_ITEM_SELECTED, self.onListBox, self.listBox)
 		panelSizer.Add(ListSizer)
 		# Create a filter side bar
 		filterSizer = wx.BoxSizer(wx.VERTICAL)
@@ -286,6 +738,29 @@ class ObjectsListDialog(wx.Dialog):
 		filterSizer.Add(self.filterHideUntagged)
 		self.filterFavorites = wx.CheckBox(self, label = _("Favo&rited objects"))
 		filterSizer.Add(self.filterFavorites)
+		# Only shown with the differences between two scans
+		from . import treeDiff
+		changeKinds = treeDiff.kindLabels()
+		self.changeLabel = wx.StaticText(self, -1, label=_("Chan&ge:"))
+		filterSizer.Add(self.changeLabel)
+		self.filterChange = wx.Choice(self, choices=[_("All changes")]+[changeKinds[kind] for kind in sorted(changeKinds)])
+		self.filterChange.SetSelection(0)
+		filterSizer.Add(self.filterChange)
+		# Translators: Label of the filter of the objects by their location on the screen
+		filterSizer.Add(wx.StaticText(self, -1, label=_("Screen regi&on:")))
+		self.filterRegion = wx.Choice(self, choices=[
+		# Translators: A choice of the screen region filter
+		_("Whole window"),
+		# Translators: A choice of the screen region filter
+		_("Under the mouse"),
+		# Translators: A choice of the screen region filter
+		_("Inside the selected object"),
+		# Translators: A choice of the screen region filter
+		_("Interactive objects near the mouse"),
+		# Translators: A choice of the screen region filter; the center of the focused object is used when there is no caret
+		_("Interactive objects near the caret")])
+		self.filterRegion.SetSelection(0)
+		filterSizer.Add(self.filterRegion)
 		viewAscendantsButtonID = wx.NewId()
 		self.viewAscendantsButton = wx.Button(self, viewAscendantsButtonID, _("Ascendan&ts"))
 		filterSizer.Add(self.viewAscendantsButton)
@@ -302,10 +777,12 @@ class ObjectsListDialog(wx.Dialog):
 		filterSizer.Add(clearFiltersButton)
 		# Bindings of side bar
 		self.Bind(wx.EVT_RADIOBOX, self.applyFilter, self.filterRadioBox)
-		self.Bind(wx.EVT_TEXT, self.applyFilter, self.filterSearchText)
+		self.Bind(wx.EVT_TEXT, self.onSearchText, self.filterSearchText)
 		self.Bind(wx.EVT_TEXT_ENTER, self.onSearchEnterKey, self.filterSearchText)
 		self.Bind(wx.EVT_CHECKBOX, self.applyFilter, self.filterHideUntagged)
 		self.Bind(wx.EVT_CHECKBOX, self.applyFilter, self.filterFavorites)
+		self.Bind(wx.EVT_CHOICE, self.applyFilter, self.filterChange)
+		self.Bind(wx.EVT_CHOICE, self.onRegionChoice, self.filterRegion)
 		self.Bind(wx.EVT_BUTTON, self.onAscendantsButton, id=viewAscendantsButtonID)
 		self.Bind(wx.EVT_BUTTON, self.onBrothersButton, id=viewBrothersButtonID)
 		self.Bind(wx.EVT_BUTTON, self.onChildrenButton, id=viewChildrenButtonID)
@@ -330,6 +807,15 @@ class ObjectsListDialog(wx.Dialog):
 		favButtonID = wx.NewId()
 		self.favButton = wx.Button(self, favButtonID, _("Fa&v"))
 		buttonsSizer.Add(self.favButton)
+		refreshButtonID = wx.NewId()
+		self.refreshButton = wx.Button(self, refreshButtonID, _("R&efresh"))
+		buttonsSizer.Add(self.refreshButton)
+		compareButtonID = wx.NewId()
+		self.compareButton = wx.Button(self, compareButtonID, _("Co&mpare"))
+		buttonsSizer.Add(self.compareButton)
+		exportButtonID = wx.NewId()
+		self.exportButton = wx.Button(self, exportButtonID, _("E&xport"))
+		buttonsSizer.Add(self.exportButton)
 		separatorLabel = wx.StaticText(self, -1, label="\t")
 		buttonsSizer.Add(separatorLabel)
 		cancelButton = wx.Button(self, wx.ID_CANCEL, _("Close"))
@@ -341,6 +827,9 @@ class ObjectsListDialog(wx.Dialog):
 		self.Bind( wx.EVT_BUTTON, self.onRightClickButton, id=rightClickButtonID)
 		self.Bind( wx.EVT_BUTTON, self.onDevInfoButton, id=devInfoButtonID)
 		self.Bind( wx.EVT_BUTTON, self.onFavButton, id=favButtonID)
+		self.Bind( wx.EVT_BUTTON, self.onRefreshButton, id=refreshButtonID)
+		self.Bind( wx.EVT_BUTTON, self.onCompareButton, id=compareButtonID)
+		self.Bind( wx.EVT_BUTTON, self.onExportButton, id=exportButtonID)
 		self.Bind(wx.EVT_CHAR_HOOK, self.onKeyEvent)
 		mainSizer.Fit(self)
 		self.SetSizer(mainSizer)
@@ -349,7 +838,7 @@ class ObjectsListDialog(wx.Dialog):
 	# Manage events
 	def onKeyEvent(self, event):
 		foco = wx.Window.FindFocus()
-		if isinstance(foco, wx.ListBox):
+		if isinstance(foco, ObjectsListCtrl):
 			if event.ControlDown() and event.GetKeyCode() == ord('I'): # Control+I announces listbox position information.
 				obj = event.GetEventObject()
 				ui.message(
@@ -394,44 +883,217 @@ class ObjectsListDialog(wx.Dialog):
 		scriptHandler.executeScript(globalCommands.commands.script_navigatorObject_devInfo, None)
 
 	def onFavButton(self, event):
-		hash = self.getObjectHash(self.getObjectFromList())
+		obj = self.getObjectFromList()
+		try:
+			hash = self.getObjectHash(obj)
+		except LookupError:
+			ui.message(_("The object no longer exists"))
+			return()
+		# The favorite flags are part of the last filter result
+		self.filterEngine.invalidate()
 		if hash in self.favorites:
 			self.favorites.remove(hash)
-			self.objects[self.objects.index(self.getObjectFromList())].favorite = False
+			obj.favorite = False
 			if self.filterFavorites.GetValue() == True:
 				self.applyFilter(event)
 			ui.message(_("Unfavorited"))
 		else:
-			self.favorites.append(hash)
-			self.objects[self.objects.index(self.getObjectFromList())].favorite = True
+			# The path is kept to find the favorite without a scan; objects out of a scan take the signatures read by the trie
+			if obj.hash:
+				source = self.sourceObject(obj)
+				self.favorites.add(hash, self.appName, source.caption, source.ancestry, source.steps)
+			elif self.pathTrie:
+				steps = [(int(role), windowClassName) for role, windowClassName in self.pathTrie.signatures(obj.ancestry)]
+				self.favorites.add(hash, self.appName, obj.caption, obj.ancestry, steps)
+			else:
+				self.favorites.add(hash, self.appName, obj.caption)
+			obj.favorite = True
 			ui.message(_("Favorited"))
 		self.listBox.SetFocus()
 		self.saveFavorites()
 
+	def onRefreshButton(self, event):
+		if self.refreshHandler:
+			self.refreshHandler()
+
+	def onExportButton(self, event):
+		if self.searching or not self.objects:
+			return()
+		dlg = wx.FileDialog(self,
+		_("Select a file for the snapshot of the objects"),
+		os.getenv('USERPROFILE'), "%s.ois" % self.appName,
+		_("Snapshot files(*.ois)|*.ois"), wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT)
+		result = dlg.ShowModal()
+		if result != wx.ID_OK:
+			return()
+		from .snapshotFile import exportTable
+		try:
+			count = exportTable(self.objects[0].table, dlg.GetPath(), self.GetTitle())
+		except Exception as inst:
+			gui.messageBox(_("File can not be saved in the specified location\n\n%s\n%s") % (type(inst), inst.args), _("Warning"), wx.ICON_ERROR)
+			return()
+		ui.message(_("%d objects saved") % count)
+
+	def onCompareButton(self, event):
+		if self.searching or not self.objects or self.isDiff():
+			return()
+		choices = [_("Snapshot file...")]
+		if self.previousTable:
+			choices.insert(0, _("Previous scan of this window"))
+		dlg = wx.SingleChoiceDialog(self, _("Compare the objects with:"), _("Compare"), choices)
+		result = dlg.ShowModal()
+		selection = choices[dlg.GetSelection()]
+		dlg.Destroy()
+		if result != wx.ID_OK:
+			return()
+		if selection == choices[-1]:
+			dlg = wx.FileDialog(self,
+			_("Select a snapshot file"),
+			os.getenv('USERPROFILE'), "",
+			_("Snapshot files(*.ois)|*.ois|All files(*.*)|*.*"), wx.FD_OPEN)
+			result = dlg.ShowModal()
+			if result != wx.ID_OK:
+				return()
+			from .snapshotFile import SnapshotTable
+			try:
+				old = SnapshotTable(dlg.GetPath())
+			except Exception as inst:
+				gui.messageBox(_("Error loading %s\n\n%s\n%s") % (dlg.GetPath(), type(inst), inst.args), _("Compare"), wx.ICON_ERROR)
+				return()
+		else:
+			old = self.previousTable
+		from . import treeDiff
+		self.showDiff(treeDiff.TreeDiff(old, self.objects[0].table))
+		if old is not self.previousTable:
+			# The rows of the differences shown read the snapshot; if there are none it is not needed
+			if self.isDiff():
+				self.comparedSnapshot = old
+			else:
+				old.close()
+
+	def releaseTable(self, table):
+		# Called before table is closed, so that it is not compared with later
+		if self.previousTable is table:
+			self.previousTable = None
+
+	def showDiff(self, diff):
+		# Shows the differences between two scans; the change filter selects a kind of change
+		table = diff.table()
+		if not len(table):
+			ui.message(_("No changes"))
+			return()
+		title = _("Changes in %s") % self.GetTitle()
+		self.updateDialog(list(table), title, "%d %s (%s)" % (len(table), _("items"), diff.summary()))
+
+	def isDiff(self):
+		return bool(self.objects) and hasattr(self.objects[0].table, "kinds")
+
+	def scanTable(self):
+		# Table of the scan shown, or of the new scan of the differences shown
+		table = self.objects[0].table
+		return table.sources[1] if self.isDiff() else table
+
+	def onSearchText(self, event):
+		if self._filterTimer:
+			self._filterTimer.Stop()
+		self._filterTimer = wx.CallLater(self.filterDelay, self.applyFilter, None)
+
 	def onSearchEnterKey(self, event):
+		if self._filterTimer and self._filterTimer.IsRunning():
+			self._filterTimer.Stop()
+			self.applyFilter(None)
 		self.listBox.SetFocus()
 
 	def applyFilter(self, event):
-		self.filteredObjects = []
-		for obj in self.objects:
-			valid = True
-			if self.filterHideUntagged.GetValue() == True and not obj.obj.name and not obj.obj.description:
-				valid = False
-			elif self.filterSearchText.GetValue().upper() not in obj.caption.upper():
-				valid = False
-			elif self.filterRadioBox.GetSelection() > 0 and obj.obj.role not in roleCategories[self.filterRadioBox.GetSelection()]:
-				valid = False
-			elif self.filterFavorites.GetValue() == True:
-				valid = obj.favorite
-			if valid == True:
-				self.filteredObjects.append(obj)
-		label = "%d %s" % (len(self.filteredObjects), _("items"))
-		if len (self.filteredObjects) < len(self.objects):
-			label = "%s %s" % (label, _("[filter active]"))
-		self.updateList(self.filteredObjects, label)
-		if event.GetEventObject() == self.filterHideUntagged or event.GetEventObject() == self.filterFavorites:
+		positions = self.filterEngine.filter(
+			self.filterSearchText.GetValue(),
+			self.filterRadioBox.GetSelection(),
+			self.filterHideUntagged.GetValue(),
+			self.filterFavorites.GetValue())
+		kind = self.filterChange.GetSelection()
+		if kind > 0 and self.isDiff():
+			kinds = self.objects[0].table.kinds
+			positions = [i for i in positions if kinds[i] == kind]
+		rows = self.regionRows()
+		if rows is not None:
+			objects = self.objects
+			positions = [i for i in positions if objects[i].index in rows]
+		self.filteredObjects = [self.objects[i] for i in positions]
+		self.updateList(self.filteredObjects, self.countLabel())
+		if event and (event.GetEventObject() == self.filterHideUntagged or event.GetEventObject() == self.filterFavorites):
 			self.listBox.SetFocus()
 
+	def isFilterActive(self):
+		return self.filterRadioBox.GetSelection() > 0 or self.filterSearchText.GetValue() != "" or self.filterHideUntagged.GetValue() or self.filterFavorites.GetValue() or self.filterChange.GetSelection() > 0 or self.filterRegion.GetSelection() > 0
+
+	def onRegionChoice(self, event):
+		# The region inside the selected object is the one it has when the filter is chosen
+		obj = self.getObjectFromList()
+		location = obj.snapshot.location if obj else None
+		self.regionRect = (location[0], location[1], location[0]+location[2], location[1]+location[3]) if location else None
+		self.applyFilter(event)
+
+	def regionRows(self):
+		# Rows of the objects in the screen region chosen, None for the whole window
+		region = self.filterRegion.GetSelection()
+		if region <= self.REGION_ALL:
+			return None
+		table = self.objects[0].table
+		if self.spatialIndex is None or self.spatialIndex.table is not table:
+			from .spatialIndex import SpatialIndex
+			self.spatialIndex = SpatialIndex(table, len(self.objects))
+		else:
+			# Objects added by a scan in progress; the scan may be writing rows after them
+			self.spatialIndex.update(len(self.objects))
+		index = self.spatialIndex
+		if region == self.REGION_CARET:
+			if self.caretPosition is None:
+				return set()
+			x, y = self.caretPosition
+		else:
+			x, y = self.mousePosition
+		if region == self.REGION_MOUSE:
+			return set(index.at(x, y))
+		if region == self.REGION_SELECTED:
+			return set(index.inside(*self.regionRect)) if self.regionRect else set()
+		return set(index.nearest(x, y, self.isInteractive, self.nearestCount))
+
+	def readCaretPosition(self):
+		# Point of the caret, or the center of the focused object if it has no caret. None while the focus is in NVDA, such as the objects window
+		try:
+			focus = api.getFocusObject()
+			if focus.appModule.appName == "nvda":
+				return None
+			try:
+				point = api.getCaretObject().makeTextInfo(textInfos.POSITION_CARET).pointAtStart
+				return (point.x, point.y)
+			except Exception:
+				pass
+			location = focus.location
+			if not location:
+				return None
+			return (location[0]+location[2]//2, location[1]+location[3]//2)
+		except Exception:
+			return None
+
+	def isInteractive(self, row):
+		snapshot = self.spatialIndex.table.snapshot(row)
+		return snapshot.role in self.interactiveRoles or controlTypes.State.FOCUSABLE in snapshot.states
+
+	def countLabel(self):
+		if self.filteredObjects or self.isFilterActive():
+			count = len(self.filteredObjects)
+		else:
+			count = len(self.objects)
+		label = "%d %s" % (count, _("items"))
+		if count < len(self.objects):
+			label = "%s %s" % (label, _("[filter active]"))
+		if self.labelNote:
+			label = "%s %s" % (label, self.labelNote)
+		if self.searching:
+			label = "%s %s" % (label, _("searching..."))
+		return label
+
 	def onAscendantsButton (self, event):
 		self.viewAncestry(self.getAscendants, _("ascendants of"))
 
@@ -439,12 +1101,15 @@ class ObjectsListDialog(wx.Dialog):
 		self.viewAncestry(self.getBrothers, _("brothers of"))
 
 	def onChildrenButton(self, event):
+		obj = self.getObjectFromList()
+		if obj.pruned and obj.table.live and self.expandHandler and not self.searching and not self.isDiff():
+			self.expandObject(obj)
+			return()
 		self.viewAncestry(self.getChildren, _("children of"))
 
 	def onClearFiltersButton(self, event):
 		self.clearFilter()
-		label = "%d %s" % (len(self.objects), _("items"))
-		self.updateList(self.objects, label)
+		self.updateList(self.objects, self.countLabel())
 		self.listBox.SetFocus()
 # End of manage events
 
@@ -459,67 +1124,168 @@ class ObjectsListDialog(wx.Dialog):
 				winUser.mouse_event(winUser.MOUSEEVENTF_RIGHTUP,0,0,None,None)
 
 	def getObjectFromList(self):
-		index = self.listBox.GetSelections()
-		if index is not None:
-			if self.filteredObjects:
-				obj = self.filteredObjects[index[0]]
-			else:
-				obj = self.objects[index[0]]
-			return(obj)
+		index = self.listBox.GetSelection()
+		if index >= 0:
+			return(self.listBox.objects[index])
 
 	def updateList(self, objects, label):
 		self.ListLabel.SetLabel(label)
-		self.listBox.SetItems([obj.caption for obj in objects])
-		if self.listBox.GetItems():
+		self.listBox.setObjects(objects)
+		if not self.listBox.IsEmpty():
 			self.listBox.SetSelection(0)
 			self.updatePythonText()
 		else:
 			self.emptyList()
 
-	def updateDialog(self, objects, title, label):
+	def updateDialog(self, objects, title, label, searching=False):
+		table = objects[0].table
+		if self.objects and not hasattr(table, "kinds"):
+			# The scan shown before a new one of the same application is kept to compare them
+			shown = self.scanTable()
+			if shown is not table:
+				self.previousTable = shown if shown.appName == table.appName else None
 		self.SetTitle(title)
 		self.objects = objects
-		thMarkFavorites = Thread(target=self.markFavorites)
-		thMarkFavorites.start()
+		root = self.scanTable().objs[0] if table.live else None
+		if self.pathTrie is None or self.pathTrie.root.obj is not root:
+			self.pathTrie = None
+			if root is not None:
+				from .pathTrie import PathTrie
+				self.pathTrie = PathTrie(root)
+		self.spatialIndex = None
+		# The mouse is usually on the window scanned, not yet on the objects window
+		self.mousePosition = tuple(winUser.getCursorPos())
+		caret = self.readCaretPosition()
+		if caret is not None:
+			self.caretPosition = caret
+		diff = self.isDiff()
+		self.changeLabel.Show(diff)
+		self.filterChange.Show(diff)
+		self.Layout()
+		# All the objects of a scan belong to the application of the foreground object
+		self.appName = table.appName if table.appName is not None else objects[0].obj.appModule.appName
+		self.searching = searching
+		self.labelNote = ""
+		self.favoritesSeen = 0
+		self.favoritesTime = 0.0
+		if table.live:
+			self.markFavorites()
+		self.filterEngine.reset(objects)
 		self.clearFilter()
+		if self.comparedSnapshot and not (self.isDiff() and table.sources[0] is self.comparedSnapshot):
+			self.comparedSnapshot.close()
+			self.comparedSnapshot = None
+		if searching:
+			label = self.countLabel()
 		self.updateList(objects, label)
 		self.listBox.SetFocus()
-		thMarkFavorites.join()
+
+	def appendObjects(self, objects):
+		# Adds a batch of objects of a scan in progress keeping the selection and the filters
+		self.markFavorites(objects)
+		self.objects.extend(objects)
+		matches = self.filterEngine.update()
+		if self.ancestryView:
+			return()
+		if self.filteredObjects or self.isFilterActive():
+			rows = self.regionRows()
+			objects = [self.objects[i] for i in matches if rows is None or self.objects[i].index in rows]
+			self.filteredObjects.extend(objects)
+		if objects:
+			wasEmpty = self.listBox.IsEmpty()
+			# The list shows self.objects or self.filteredObjects, which have grown
+			self.listBox.refreshCount()
+			if wasEmpty:
+				self.listBox.SetSelection(0)
+				self.updatePythonText()
+		self.ListLabel.SetLabel(self.countLabel())
+
+	def endSearch(self, note=""):
+		self.searching = False
+		self.labelNote = note
+		if self.favoritesSeen:
+			# Keep the time the favorites were last seen
+			self.saveFavorites()
+		if not self.ancestryView:
+			self.ListLabel.SetLabel(self.countLabel())
 
 	def viewAncestry(self, function, text):
+		self.ancestryView = True
 		self.filterRadioBox.Enabled = False
 		self.filterSearchText.Enabled = False
 		self.filterHideUntagged.Enabled = False
 		self.filterFavorites.Enabled = False
+		self.filterChange.Enabled = False
+		self.filterRegion.Enabled = False
 		obj = self.getObjectFromList()
 		self.filteredObjects = function(obj)
 		label = "%d %s %s" % (len(self.filteredObjects), text, obj.caption)
 		self.updateList(self.filteredObjects, label)
 		self.listBox.SetFocus()
 
+	def isScanned(self, obj):
+		# Objects of the scan shown are navigated with the index of the table, without reading the live objects
+		if not self.objects:
+			return False
+		table = self.objects[0].table
+		return obj.table is table or obj.table in getattr(table, "sources", ())
+
+	def sourceObject(self, obj):
+		# Rows of the differences between two scans are navigated in the scan they come from
+		if hasattr(obj.table, "sources"):
+			return obj.table.source(obj.index)
+		return obj
+
 	def getAscendants(self, obj):
+		obj = self.sourceObject(obj)
+		if self.isScanned(obj):
+			table = obj.table
+			# As before, the first object is its own ascendant
+			return [table[i] for i in table.ascendants(obj.index) or [obj.index]]
+		ancestry = obj.ancestry
+		objects = self.pathTrie.ascendants(ancestry)
+		if len(objects) < len(ancestry):
+			ui.message(_("Some ascendants no longer exist"))
 		ascendants = [self.objects[0]]
-		for i in obj.ancestry[:-1]:
-			object = ascendants[-1].obj.children[i]
-			ancestry = ascendants[-1].ancestry
-			ascendants.append(OBJECT(object, ancestry+[i]))
+		for level in range(1, len(objects)):
+			ascendants.append(OBJECT(objects[level], ancestry[:level]))
 		return ascendants
 
 	def getBrothers(self, obj):
+		obj = self.sourceObject(obj)
 		if obj == self.objects[0]:
 			return ([obj])
-		parent = obj.obj.parent
-		brothers = self.getChildren(OBJECT(parent, obj.ancestry[:-1]))
+		if self.isScanned(obj):
+			table = obj.table
+			return [table[i] for i in table.siblings(obj.index)]
+		brothers = self.liveChildren(obj.ancestry[:-1])
 		return(brothers)
 
+	def expandObject(self, obj):
+		self.expandHandler(obj)
+		table = obj.table
+		# Rows after the object have moved, so the objects of the scan are taken again from the table
+		self.objects = list(table)
+		self.markFavorites()
+		self.filterEngine.reset(self.objects)
+		# Rows after the object have moved in the index of locations too
+		self.spatialIndex = None
+		self.viewAncestry(self.getChildren, _("children of"))
+
 	def getChildren(self, obj):
-		children = []
-		index = 0
-		for child in obj.obj.children:
-			ancestry = obj.ancestry+[index]
-			children.append(OBJECT(child, ancestry))
-			index = index+1
-		return(children)
+		obj = self.sourceObject(obj)
+		if self.isScanned(obj):
+			table = obj.table
+			return [table[i] for i in table.children(obj.index)]
+		return self.liveChildren(obj.ancestry, obj.obj)
+
+	def liveChildren(self, ancestry, obj=None):
+		# Objects for the children of the object at ancestry, read once per scan
+		children = self.pathTrie.children(ancestry, obj)
+		if children is None:
+			ui.message(_("The object no longer exists"))
+			return []
+		return [OBJECT(child, ancestry+[index]) for index, child in enumerate(children)]
 
 	def updatePythonText(self):
 		# Enable controls
@@ -527,14 +1293,17 @@ class ObjectsListDialog(wx.Dialog):
 		self.viewAscendantsButton.Enabled = True
 		self.viewBrothersButton.Enabled = True
 		self.viewChildrenButton.Enabled = True
-		self.doActionButton.Enabled = True
-		self.leftClickButton.Enabled = True
-		self.rightClickButton.Enabled = True
-		self.devInfoButton.Enabled = True
-		self.favButton.Enabled = True
 		obj = self.getObjectFromList()
+		# Objects of a snapshot file can not be acted on
+		live = obj.obj is not None
+		self.doActionButton.Enabled = live
+		self.leftClickButton.Enabled = live
+		self.rightClickButton.Enabled = live
+		self.devInfoButton.Enabled = live
+		self.favButton.Enabled = True
 		self.pythonTextCtrl.Clear()
-		self.pythonTextCtrl.SetValue("fg = api.getForegroundObject()\n"+obj.getAncestry())
+		accessor = self.pathTrie.accessor(obj.ancestry) if self.pathTrie else obj.getAncestry()
+		self.pythonTextCtrl.SetValue("fg = api.getForegroundObject()\n"+accessor)
 
 	def emptyList(self):
 		beep(100, 20)
@@ -551,46 +1320,55 @@ class ObjectsListDialog(wx.Dialog):
 		self.favButton.Enabled = False
 
 	def clearFilter(self):
+		self.ancestryView = False
 		self.filterRadioBox.Enabled = True
 		self.filterSearchText.Enabled = True
 		self.filterHideUntagged.Enabled = True
 		self.filterFavorites.Enabled = True
+		self.filterChange.Enabled = True
+		self.filterRegion.Enabled = True
 		self.filterRadioBox.SetSelection(0)
-		self.filterSearchText.SetValue("")
+		# ChangeValue does not send a text event, which would filter the list again after a delay
+		self.filterSearchText.ChangeValue("")
 		self.filterHideUntagged.SetValue(False)
 		self.filterFavorites.SetValue(False)
+		self.filterChange.SetSelection(0)
+		self.filterRegion.SetSelection(0)
+		self.regionRect = None
 		self.filteredObjects = []
 
 	def loadFavorites(self):
 		try:
-			favoritesFile = open (os.path.join(os.path.dirname(__file__), "favorites.dat"), "rb")
-			self.favorites = pickle.load(favoritesFile)
+			self.favorites.load()
 			import tones
 			tones.beep(1000,90)
 		except:
-			self.favorites = []
+			pass
 
 	def getObjectHash(self, OBJ):
-		obj = self.objects[0].obj
-		line = "%s\n%d %s\n" % (OBJ.obj.appModule.appName, OBJ.obj.role, OBJ.obj.windowClassName)
-		for x in OBJ.ancestry:
-			obj = obj.children[x]
-			line = line + " %d %s\n" % (obj.role, obj.windowClassName)
-		line = line + OBJ.getAncestry()
-		return (md5(line.encode()).digest())
+		# Objects of a scan have their hash computed during the walk
+		if OBJ.hash:
+			return OBJ.hash
+		# The objects along the path are read through the trie of the scan, which shares them with the other paths
+		signatures = self.pathTrie.signatures(OBJ.ancestry)
+		if signatures is None:
+			raise LookupError("The object at %s no longer exists" % OBJ.ancestry)
+		from .resolver import Step
+		chain = "".join([chainStep(Step(*signature)) for signature in signatures])
+		return favoriteHash(self.appName, OBJ.snapshot, chain, self.pathTrie.accessor(OBJ.ancestry))
 
 	def saveFavorites(self):
 		try:
-			favoritesFile = open (os.path.join(os.path.dirname(__file__), "favorites.dat"), "wb")
-			pickle.dump(self.favorites, favoritesFile, 2)
-			favoritesFile.close()
+			self.favorites.save()
 		except Exception as inst:
 			gui.messageBox(_("Can not save favorites file.\n\n%s\n%s") % (type(inst), inst.args), _("Warning"), wx.ICON_ERROR)
 
-	def markFavorites(self):
-		for i in range (0, len(self.objects)):
-			if self.getObjectHash(self.objects[i]) in self.favorites:
-				self.objects[i].favorite = True
+	def markFavorites(self, objects=None):
+		if objects is None:
+			objects = self.objects
+		start = perf_counter()
+		self.favoritesSeen = self.favoritesSeen+self.favorites.mark(objects, self.appName)
+		self.favoritesTime = self.favoritesTime+perf_counter()-start
 	# Inicio de mis modificaciones
 class PositionDialog(wx.Dialog):
 	def __init__(self, datos):
@@ -682,47 +1460,65 @@ Only a number between 1 and {} is allowed.""").format(self.datos)
 		return
 
 
-roleCategories = [None,
-# Interactive objects
-[controlTypes.Role.BUTTON,
-controlTypes.Role.CHECKBOX,
-controlTypes.Role.CHECKMENUITEM,
-controlTypes.Role.COLORCHOOSER,
-controlTypes.Role.COMBOBOX,
-controlTypes.Role.EDITABLETEXT,
-controlTypes.Role.MENU,
-controlTypes.Role.MENUBUTTON,
-controlTypes.Role.MENUITEM,
-controlTypes.Role.PASSWORDEDIT,
-controlTypes.Role.RADIOBUTTON,
-controlTypes.Role.RADIOMENUITEM,
-controlTypes.Role.SPINBUTTON,
-controlTypes.Role.TOGGLEBUTTON],
-# Data objects
-[controlTypes.Role.DATAITEM,
-controlTypes.Role.DOCUMENT,
-controlTypes.Role.LISTITEM,
-controlTypes.Role.TREEVIEWITEM,
-controlTypes.Role.RICHEDIT],
-# Static objects
-[controlTypes.Role.GRAPHIC,
-controlTypes.Role.ICON,
-controlTypes.Role.LABEL,
-controlTypes.Role.STATICTEXT,
-controlTypes.Role.STATUSBAR],
-# Container objects
-[controlTypes.Role.APPLICATION,
-controlTypes.Role.DESKTOPPANE,
-controlTypes.Role.DIALOG,
-controlTypes.Role.DIRECTORYPANE,
-controlTypes.Role.FRAME,
-controlTypes.Role.GLASSPANE,
-controlTypes.Role.MENUBAR,
-controlTypes.Role.OPTIONPANE,
-controlTypes.Role.PANE,
-controlTypes.Role.PANEL,
-controlTypes.Role.TOOLBAR,
-controlTypes.Role.WINDOW]]
+# Translators: Appended to the items count when a scan stops before the end.
+truncatedLabels = {
+	ScanResult.DEPTH: _("[truncated: depth limit]"),
+	ScanResult.NODES: _("[truncated: items limit]"),
+	ScanResult.TIME: _("[truncated: time limit]"),
+	ScanResult.CANCELLED: _("[cancelled]")
+}
+
+_roleCategories = None
+
+def getRoleCategories():
+	# Roles of each category of the filter, built the first time an objects window is created
+	global _roleCategories
+	if _roleCategories is None:
+		_roleCategories = buildRoleCategories()
+	return _roleCategories
+
+def buildRoleCategories():
+	return [None,
+	# Interactive objects
+	[controlTypes.Role.BUTTON,
+	controlTypes.Role.CHECKBOX,
+	controlTypes.Role.CHECKMENUITEM,
+	controlTypes.Role.COLORCHOOSER,
+	controlTypes.Role.COMBOBOX,
+	controlTypes.Role.EDITABLETEXT,
+	controlTypes.Role.MENU,
+	controlTypes.Role.MENUBUTTON,
+	controlTypes.Role.MENUITEM,
+	controlTypes.Role.PASSWORDEDIT,
+	controlTypes.Role.RADIOBUTTON,
+	controlTypes.Role.RADIOMENUITEM,
+	controlTypes.Role.SPINBUTTON,
+	controlTypes.Role.TOGGLEBUTTON],
+	# Data objects
+	[controlTypes.Role.DATAITEM,
+	controlTypes.Role.DOCUMENT,
+	controlTypes.Role.LISTITEM,
+	controlTypes.Role.TREEVIEWITEM,
+	controlTypes.Role.RICHEDIT],
+	# Static objects
+	[controlTypes.Role.GRAPHIC,
+	controlTypes.Role.ICON,
+	controlTypes.Role.LABEL,
+	controlTypes.Role.STATICTEXT,
+	controlTypes.Role.STATUSBAR],
+	# Container objects
+	[controlTypes.Role.APPLICATION,
+	controlTypes.Role.DESKTOPPANE,
+	controlTypes.Role.DIALOG,
+	controlTypes.Role.DIRECTORYPANE,
+	controlTypes.Role.FRAME,
+	controlTypes.Role.GLASSPANE,
+	controlTypes.Role.MENUBAR,
+	controlTypes.Role.OPTIONPANE,
+	controlTypes.Role.PANE,
+	controlTypes.Role.PANEL,
+	controlTypes.Role.TOOLBAR,
+	controlTypes.Role.WINDOW]]
 
 class SettingsDialog(wx.Dialog):
 	def __init__(self, *args, **kwds):
@@ -736,6 +1532,48 @@ class SettingsDialog(wx.Dialog):
 		self.checkboxDocuments.SetValue(config.conf["objInspector"]["documents"])
 		mainSizer.Add(self.checkboxDocuments, 0, 0, 0)
 
+		self.checkboxScanStats = wx.CheckBox(self, wx.ID_ANY, _("Record scan &statistics"))
+		self.checkboxScanStats.SetValue(config.conf["objInspector"]["scanStats"])
+		mainSizer.Add(self.checkboxScanStats, 0, 0, 0)
+
+		# Translators: Option of the settings to write the trees walked to files for profiling
+		self.checkboxRecordScans = wx.CheckBox(self, wx.ID_ANY, _("Record scanned &trees to files"))
+		self.checkboxRecordScans.SetValue(config.conf["objInspector"]["recordScans"])
+		mainSizer.Add(self.checkboxRecordScans, 0, 0, 0)
+
+		# Translators: Option of the settings to copy the parts of a window that have not changed from its previous scan
+		self.checkboxReuseSubtrees = wx.CheckBox(self, wx.ID_ANY, _("&Reuse unchanged parts of the previous scan"))
+		self.checkboxReuseSubtrees.SetValue(config.conf["objInspector"]["reuseSubtrees"])
+		mainSizer.Add(self.checkboxReuseSubtrees, 0, 0, 0)
+
+		# Scan budgets
+		limitsSizer = wx.FlexGridSizer(2, 5, 5)
+		limitsSizer.Add(wx.StaticText(self, wx.ID_ANY, _("Maximum &depth (0 = no limit)")))
+		self.spinMaxDepth = wx.SpinCtrl(self, wx.ID_ANY, min=0, max=1000, initial=config.conf["objInspector"]["maxDepth"])
+		limitsSizer.Add(self.spinMaxDepth)
+		limitsSizer.Add(wx.StaticText(self, wx.ID_ANY, _("Maximum &items (0 = no limit)")))
+		self.spinMaxNodes = wx.SpinCtrl(self, wx.ID_ANY, min=0, max=1000000, initial=config.conf["objInspector"]["maxNodes"])
+		limitsSizer.Add(self.spinMaxNodes)
+		limitsSizer.Add(wx.StaticText(self, wx.ID_ANY, _("Maximum &time in seconds (0 = no limit)")))
+		self.spinTimeLimit = wx.SpinCtrl(self, wx.ID_ANY, min=0, max=3600, initial=config.conf["objInspector"]["timeLimit"])
+		limitsSizer.Add(self.spinTimeLimit)
+		limitsSizer.Add(wx.StaticText(self, wx.ID_ANY, _("Parallel scan &workers (1 = sequential)")))
+		self.spinWorkers = wx.SpinCtrl(self, wx.ID_ANY, min=1, max=16, initial=config.conf["objInspector"]["workers"])
+		limitsSizer.Add(self.spinWorkers)
+		limitsSizer.Add(wx.StaticText(self, wx.ID_ANY, _("Keep scans in &cache for seconds (0 = no cache)")))
+		self.spinCacheTTL = wx.SpinCtrl(self, wx.ID_ANY, min=0, max=86400, initial=config.conf["objInspector"]["cacheTTL"])
+		limitsSizer.Add(self.spinCacheTTL)
+		limitsSizer.Add(wx.StaticText(self, wx.ID_ANY, _("Cache &memory in megabytes")))
+		self.spinCacheSize = wx.SpinCtrl(self, wx.ID_ANY, min=1, max=4096, initial=config.conf["objInspector"]["cacheSize"])
+		limitsSizer.Add(self.spinCacheSize)
+		mainSizer.Add(limitsSizer, 0, wx.ALL, 4)
+
+		# Translators: Label of the pruning rules in the settings, for example "role=list children>500" or "class=GlassPane"
+		mainSizer.Add(wx.StaticText(self, wx.ID_ANY, _("&Pruning rules, one per line (role=, class=, app=, children>)")))
+		self.textPruneRules = wx.TextCtrl(self, wx.ID_ANY, "\n".join(config.conf["objInspector"]["pruneRules"]),
+		size=(400, 80), style=wx.TE_MULTILINE)
+		mainSizer.Add(self.textPruneRules, 0, wx.ALL | wx.EXPAND, 4)
+
 		btnSizer = wx.StdDialogButtonSizer()
 		mainSizer.Add(btnSizer, 0, wx.ALIGN_RIGHT | wx.ALL, 4)
 		self.button_OK = wx.Button(self, wx.ID_OK, "")
@@ -747,7 +1585,46 @@ class SettingsDialog(wx.Dialog):
 		self.SetAffirmativeId(self.button_OK.GetId())
 		self.Layout()
 
+		self.Bind(wx.EVT_BUTTON, self.onOk, self.button_OK)
 		self.Bind(wx.EVT_CHECKBOX, self.setDocumentChoice, self.checkboxDocuments)
+		self.Bind(wx.EVT_CHECKBOX, self.setScanStats, self.checkboxScanStats)
+		self.Bind(wx.EVT_CHECKBOX, self.setRecordScans, self.checkboxRecordScans)
+		self.Bind(wx.EVT_CHECKBOX, self.setReuseSubtrees, self.checkboxReuseSubtrees)
+		self.Bind(wx.EVT_SPINCTRL, self.setLimits, self.spinMaxDepth)
+		self.Bind(wx.EVT_SPINCTRL, self.setLimits, self.spinMaxNodes)
+		self.Bind(wx.EVT_SPINCTRL, self.setLimits, self.spinTimeLimit)
+		self.Bind(wx.EVT_SPINCTRL, self.setLimits, self.spinWorkers)
+		self.Bind(wx.EVT_SPINCTRL, self.setLimits, self.spinCacheTTL)
+		self.Bind(wx.EVT_SPINCTRL, self.setLimits, self.spinCacheSize)
+
+	def onOk(self, event):
+		lines = [line.strip() for line in self.textPruneRules.GetValue().splitlines() if line.strip()]
+		rules, errors = PruneRules.parse(lines)
+		if errors:
+			gui.messageBox("\n".join(["%s: %s" % error for error in errors]), _("Invalid pruning rules"), wx.ICON_ERROR)
+			self.textPruneRules.SetFocus()
+			return()
+		config.conf["objInspector"]["pruneRules"] = lines
+		event.Skip()
 
 	def setDocumentChoice(self, event):
 		config.conf["objInspector"]["documents"] = self.checkboxDocuments.GetValue()
+
+	def setScanStats(self, event):
+		config.conf["objInspector"]["scanStats"] = self.checkboxScanStats.GetValue()
+
+	def setRecordScans(self, event):
+		config.conf["objInspector"]["recordScans"] = self.checkboxRecordScans.GetValue()
+
+	def setReuseSubtrees(self, event):
+		config.conf["objInspector"]["reuseSubtrees"] = self.checkboxReuseSubtrees.GetValue()
+
+	def setLimits(self, event):
+		config.conf["objInspector"]["maxDepth"] = self.spinMaxDepth.GetValue()
+		config.conf["objInspector"]["maxNodes"] = self.spinMaxNodes.GetValue()
+		config.conf["objInspector"]["timeLimit"] = self.spinTimeLimit.GetValue()
+		config.conf["objInspector"]["workers"] = self.spinWorkers.GetValue()
+		config.conf["objInspector"]["cacheTTL"] = self.spinCacheTTL.GetValue()
+		config.conf["objInspector"]["cacheSize"] = self.spinCacheSize.GetValue()
+
+importTime = perf_counter()-_importStart
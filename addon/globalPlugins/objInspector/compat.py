@@ -0,0 +1,23 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: compatibility with old versions of NVDA
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# Before NVDA 2021.2 roles and states were ROLE_ and STATE_ constants of controlTypes.
+# fixControlTypes adds the Role and State classes used by the add-on. It is called
+# the first time the add-on is used instead of when NVDA loads it.
+
+import controlTypes
+
+def fixControlTypes():
+	if hasattr(controlTypes, "Role"):
+		return()
+	setattr(controlTypes, "Role", type('Enum', (), dict(
+	[(x.split("ROLE_")[1], getattr(controlTypes, x)) for x in dir(controlTypes) if x.startswith("ROLE_")])))
+	setattr(controlTypes, "State", type('Enum', (), dict(
+	[(x.split("STATE_")[1], getattr(controlTypes, x)) for x in dir(controlTypes) if x.startswith("STATE_")])))
+	setattr(controlTypes, "role", type("role", (), {"_roleLabels": controlTypes.roleLabels}))
+
+def enumNames(enum):
+	# Names by value of the members of controlTypes.Role or State, which are plain classes of constants in old versions of NVDA
+	return dict([(getattr(enum, name), name) for name in dir(enum) if name.isupper()])
@@ -0,0 +1,116 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: favorites store
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# Favorites are indexed by the hash of the object so that checking, adding and removing one
+# does not depend on how many there are. Each one keeps some information for the user:
+# the application, the caption of the object and the last time it was found in a scan.
+# Favorites of previous versions get them the first time they are found.
+# The path of the object and the signatures along it (see resolver.py) let the favorite be
+# found again without a scan.
+
+import os
+from time import time
+try:
+	import cPickle as pickle
+except ImportError:
+	import pickle
+
+def favoritesPath():
+	return os.path.join(os.path.dirname(__file__), "favorites.dat")
+
+def newEntry(app="", caption="", lastSeen=None, path=None, steps=None):
+	# Entries are plain dictionaries so that favorites files do not depend on the classes of the add-on.
+	# steps are (role, windowClassName) tuples with the role as an integer for the same reason.
+	return {"app": app, "caption": caption, "lastSeen": lastSeen,
+	"path": list(path) if path is not None else None,
+	"steps": [(int(role), windowClassName) for role, windowClassName in steps] if steps is not None else None}
+
+class FavoritesStore(object):
+
+	def __init__(self, path=None):
+		self.path = path if path else favoritesPath()
+		# Metadata of each favorite by hash
+		self.entries = {}
+
+	def __contains__(self, hash):
+		return hash in self.entries
+
+	def __len__(self):
+		return len(self.entries)
+
+	def __iter__(self):
+		return iter(self.entries)
+
+	@staticmethod
+	def readFile(path):
+		"""Returns a dictionary of entries by hash read from a favorites file.
+		Files of previous versions are lists of hashes without metadata: their entries have no application, caption
+		nor path until the first scan that finds them fills them (see mark).
+		"""
+		with open(path, "rb") as favoritesFile:
+			favorites = pickle.load(favoritesFile)
+		if isinstance(favorites, dict):
+			return favorites
+		return dict([(hash, newEntry()) for hash in favorites])
+
+	def load(self):
+		self.entries = self.readFile(self.path)
+
+	def save(self, path=None):
+		with open(path if path else self.path, "wb") as favoritesFile:
+			pickle.dump(self.entries, favoritesFile, 2)
+
+	def add(self, hash, app="", caption="", path=None, steps=None):
+		self.entries[hash] = newEntry(app, caption, time(), path, steps)
+
+	def move(self, hash, newHash, path, steps):
+		# The favorite has been found at another path, which changes its hash
+		entry = self.entries.pop(hash)
+		entry["path"] = list(path)
+		entry["steps"] = [(int(role), windowClassName) for role, windowClassName in steps]
+		self.entries[newHash] = entry
+
+	def resolvable(self, app):
+		# Hashes of the favorites of an application that know their path
+		return [hash for hash, entry in self.entries.items() if entry.get("app") == app and entry.get("path") is not None]
+
+	def remove(self, hash):
+		self.entries.pop(hash, None)
+
+	def merge(self, entries):
+		# Adds the entries that are not in the store yet and returns how many have been added
+		new = set(entries).difference(self.entries)
+		self.entries.update([(hash, entries[hash]) for hash in new])
+		return len(new)
+
+	def mark(self, objects, appName=None):
+		"""Sets the favorite flag of the objects of a scan according to the store, updating the time they were last seen.
+		Objects of a cached scan are marked again, so flags of removed favorites are cleared too.
+		Favorites saved without their path, by previous versions, take it from the object, as well as their caption
+		and appName, the application of the scan, so that they can be resolved without scanning. The path is only taken
+		from objects that know the signatures along it.
+		Returns how many have been found.
+		"""
+		entries = self.entries
+		now = time()
+		count = 0
+		for obj in objects:
+			entry = entries.get(obj.hash)
+			obj.favorite = entry is not None
+			if entry is not None:
+				entry["lastSeen"] = now
+				if entry.get("path") is None:
+					path = obj.ancestry
+					steps = obj.steps
+					# Rows that are not in the tree of a scan, like the differences between two scans, have a path but not its signatures
+					if len(steps) == len(path):
+						entry["path"] = path
+						entry["steps"] = steps
+				if not entry.get("app") and appName:
+					entry["app"] = appName
+				if not entry.get("caption"):
+					entry["caption"] = obj.caption
+				count = count+1
+		return count
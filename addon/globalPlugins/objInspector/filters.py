@@ -0,0 +1,84 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: filter engine of the objects list
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# The keys used by the filters (casefolded caption, role category and untagged flag)
+# are computed once per scan, the first time the list is filtered. When the search text only grows, the previous result
+# is narrowed instead of checking all the objects again.
+
+class FilterEngine(object):
+	"""Filters a list of objects of a scan and returns the positions of the ones that match.
+	roleCategories is a list of lists of roles; the category of an object is the position of the list that contains its role, 0 if none.
+	"""
+
+	def __init__(self, roleCategories):
+		self.categoryOf = {}
+		for category, roles in enumerate(roleCategories):
+			for role in roles or []:
+				self.categoryOf[role] = category
+		self.reset([])
+
+	def reset(self, objects):
+		# objects is the list of the dialog, it can grow while the scan goes on; call update after that.
+		self.objects = objects
+		self.captions = []
+		self.categories = bytearray()
+		self.untagged = bytearray()
+		self._criteria = None
+		self._result = []
+		self._stale = False
+
+	def invalidate(self):
+		# The last result can not be narrowed any more, for example when favorites have changed; the next filter checks all the objects.
+		# The criteria are kept, so that update still finds the new objects that match them
+		self._stale = True
+
+	def update(self):
+		"""Computes the keys of the objects added to the list since the last filter.
+		Returns the positions of the new objects that match the last filter applied, which are added to its result.
+		"""
+		if self._criteria is None:
+			# Keys are not needed until the list is filtered
+			return []
+		start = len(self.captions)
+		self._computeKeys()
+		new = self._match(range(start, len(self.captions)), *self._criteria)
+		self._result.extend(new)
+		return new
+
+	def _computeKeys(self):
+		for obj in self.objects[len(self.captions):]:
+			snapshot = obj.snapshot
+			self.captions.append(obj.caption.casefold())
+			self.categories.append(self.categoryOf.get(snapshot.role, 0))
+			self.untagged.append(not snapshot.name and not snapshot.description)
+
+	def filter(self, text="", category=0, hideUntagged=False, favorites=False):
+		"""Returns the positions of the objects that pass the filters.
+		category 0 means all the categories.
+		"""
+		self._computeKeys()
+		query = text.casefold()
+		criteria = (query, category, hideUntagged, favorites)
+		last = self._criteria
+		if last and not self._stale and last[1:] == criteria[1:] and query.startswith(last[0]):
+			# A character has been typed at the end of the search text, only the previous result can match
+			candidates = self._result
+		else:
+			candidates = range(len(self.captions))
+		self._result = self._match(candidates, *criteria)
+		self._criteria = criteria
+		self._stale = False
+		return self._result
+
+	def _match(self, positions, query, category, hideUntagged, favorites):
+		captions = self.captions
+		categories = self.categories
+		untagged = self.untagged
+		objects = self.objects
+		return [i for i in positions
+		if not (hideUntagged and untagged[i])
+		and query in captions[i]
+		and not (category and categories[i] != category)
+		and not (favorites and not objects[i].favorite)]
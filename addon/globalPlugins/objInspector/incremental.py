@@ -0,0 +1,190 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: incremental refresh of cached scans
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# NVDA events of the foreground window are recorded while its scan is in the cache.
+# When the list is requested again only the objects and subtrees affected by those
+# events are read again and patched into the cached table.
+
+from time import time
+from .nodeTable import NodeTable, takeSnapshot, chainStep, favoriteHash
+from .scanner import isVisible
+
+# Kinds of change
+# Properties of the object have changed
+NODE = "node"
+# Descendants of the object may have changed
+SUBTREE = "subtree"
+# The object has appeared or disappeared, the children of its parent have changed
+PARENT = "parent"
+
+class ChangeTracker(object):
+	"""Changes noted by window key since the scan of the window was cached.
+	When there are too many changes the window is marked to be scanned again entirely.
+	"""
+
+	maxChanges = 200
+
+	def __init__(self):
+		# List of (object, kind) by key, None if the window needs a full scan
+		self.pending = {}
+
+	def note(self, key, obj, kind):
+		changes = self.pending.setdefault(key, [])
+		if changes is None:
+			return()
+		if len(changes) >= self.maxChanges:
+			self.pending[key] = None
+		else:
+			changes.append((obj, kind))
+
+	def pop(self, key):
+		# Returns the changes of the window, or None if it must be scanned again entirely
+		return self.pending.pop(key, [])
+
+	def discard(self, key):
+		self.pending.pop(key, None)
+
+class RefreshStats(object):
+
+	def __init__(self, changes, subtrees, touched, total, elapsed):
+		# Events applied, subtrees walked again and objects read
+		self.changes = changes
+		self.subtrees = subtrees
+		self.touched = touched
+		# Objects in the table after the refresh
+		self.total = total
+		self.elapsed = elapsed
+
+class RefreshFailed(Exception):
+	pass
+
+class Refresher(object):
+	"""Applies the changes noted by a ChangeTracker to the NodeTable of a scan.
+	scanner is used to walk the dirty subtrees, with the same limits as a full scan.
+	"""
+
+	# Levels that are walked up from an object not found in the table looking for an ascendant that is there
+	maxLevels = 20
+
+	def __init__(self, table, scanner):
+		self.table = table
+		self.scanner = scanner
+		self._rolesIndex = None
+
+	def findRow(self, obj):
+		# Row of a live object, comparing it only with the rows of the same role
+		if self._rolesIndex is None:
+			self._rolesIndex = {}
+			for index, role in enumerate(self.table.roles):
+				self._rolesIndex.setdefault(role, []).append(index)
+		objs = self.table.objs
+		for index in self._rolesIndex.get(int(obj.role), []):
+			if objs[index] == obj:
+				return index
+		return None
+
+	def locate(self, obj, kind):
+		# Returns (row, kind) with the row that must be read again and whether its descendants must be walked too
+		row = self.findRow(obj)
+		if row is not None and kind != PARENT:
+			return row, kind
+		if row is not None:
+			return self._parentRow(row), SUBTREE
+		# A new object: the subtree of the first ascendant that is in the table is walked again
+		for level in range(self.maxLevels):
+			obj = obj.parent
+			if not obj:
+				break
+			row = self.findRow(obj)
+			if row is not None:
+				return row, SUBTREE
+		raise RefreshFailed()
+
+	def _parentRow(self, row):
+		parent = self.table.parents[row]
+		if parent < 0:
+			raise RefreshFailed()
+		return parent
+
+	def apply(self, changes):
+		"""Patches the table. Returns RefreshStats, or raises RefreshFailed if the window must be scanned again entirely."""
+		start = time()
+		table = self.table
+		dirty = {}
+		try:
+			for obj, kind in changes:
+				row, kind = self.locate(obj, kind)
+				if dirty.get(row) != SUBTREE:
+					dirty[row] = kind
+		except RefreshFailed:
+			raise
+		except Exception:
+			# Dead objects and other accessibility errors
+			raise RefreshFailed()
+		if dirty.get(0) == SUBTREE:
+			raise RefreshFailed()
+		# Rows inside a subtree that will be walked again are discarded
+		rows = []
+		subtreeEnd = -1
+		for row in sorted(dirty):
+			if row < subtreeEnd:
+				continue
+			rows.append(row)
+			if dirty[row] == SUBTREE:
+				subtreeEnd = table.subtreeEnd(row)
+		touched = 0
+		subtrees = 0
+		# From the last one, so that the rows before are not moved.
+		# A node whose role has changed is replaced with the subtree of its parent, the rows inside it are skipped then.
+		limit = len(table)
+		for row in reversed(rows):
+			if row >= limit:
+				continue
+			try:
+				if dirty[row] == SUBTREE:
+					limit, count = self._refreshSubtree(row)
+					subtrees = subtrees+1
+				else:
+					limit, count = self._refreshNode(row)
+			except RefreshFailed:
+				raise
+			except Exception:
+				raise RefreshFailed()
+			touched = touched+count
+		return RefreshStats(len(changes), subtrees, touched, len(table), time()-start)
+
+	# Both return (first row replaced, objects read)
+
+	def _refreshSubtree(self, row):
+		table = self.table
+		obj = table.objs[row]
+		end = table.subtreeEnd(row)
+		location = obj.location
+		states = obj.states if location else None
+		if not isVisible(location, states):
+			table.splice(row, end, NodeTable(), table.parents[row])
+			return row, 1
+		parent = self._parentRow(row)
+		chain, path = table.signature(parent)
+		subtree = self.scanner.scanSubtree(obj, takeSnapshot(obj, location, states),
+		table.ordinals[row], table.depth(row), chain, path, table.appName)
+		table.splice(row, end, subtree, parent)
+		return row, len(subtree)
+
+	def _refreshNode(self, row):
+		table = self.table
+		obj = table.objs[row]
+		snapshot = takeSnapshot(obj)
+		old = table.snapshot(row)
+		if chainStep(snapshot) != chainStep(old) or not isVisible(snapshot.location, snapshot.states):
+			# The hashes of the descendants or the visible children of the parent depend on it
+			return self._refreshSubtree(self._parentRow(row))
+		node = NodeTable()
+		chain, path = table.signature(row)
+		node.add(obj, snapshot, -1, table.ordinals[row], hash=favoriteHash(table.appName, snapshot, chain, path))
+		node.flags[0] = table.flags[row]
+		node.childCounts[0] = table.childCounts[row]
+		table.splice(row, row+1, node, table.parents[row])
+		return row, 1
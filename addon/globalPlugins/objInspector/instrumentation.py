@@ -0,0 +1,147 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: statistics of a scan
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# Records where the time of a scan goes: the phases (walk, captions, favorites
+# and list), the accessibility properties read and how long each one took,
+# a histogram of the time spent on each object and the subtrees that were
+# slowest to explore, so that expensive applications and controls can be found.
+
+import addonHandler
+from array import array
+from collections import OrderedDict
+from time import perf_counter
+
+addonHandler.initTranslation()
+
+class PropertyProbe(object):
+	"""Wraps an NVDA object counting and timing the properties read through it.
+	reads is a dictionary of [count, seconds] by property name.
+	"""
+
+	__slots__ = ("obj", "reads")
+
+	def __init__(self, obj, reads):
+		self.obj = obj
+		self.reads = reads
+
+	def __getattr__(self, name):
+		start = perf_counter()
+		value = getattr(self.obj, name)
+		elapsed = perf_counter()-start
+		entry = self.reads.get(name)
+		if entry is None:
+			self.reads[name] = [1, elapsed]
+		else:
+			entry[0] = entry[0]+1
+			entry[1] = entry[1]+elapsed
+		return value
+
+def addReads(reads, other):
+	for name, (count, seconds) in other.items():
+		entry = reads.setdefault(name, [0, 0.0])
+		entry[0] = entry[0]+count
+		entry[1] = entry[1]+seconds
+
+class ScanStats(object):
+	"""Statistics of a scan. The scanner fills the walk and captions phases, the reads, the histogram and nodeTimes;
+	the global plugin adds the favorites and list phases while the objects window is filled.
+	"""
+
+	# The histogram has a bucket per power of 2 microseconds, the last one holds the slower ones
+	bucketCount = 24
+	# Subtrees listed in the report
+	slowestCount = 10
+	# A subtree is not listed when a single child takes this fraction of its time, the child is listed instead
+	dominantChild = 0.8
+
+	def __init__(self):
+		self.phases = OrderedDict([("walk", 0.0), ("captions", 0.0), ("favorites", 0.0), ("list", 0.0)])
+		self.reads = {}
+		self.histogram = [0]*self.bucketCount
+		# Seconds spent reading the children of each row of the table of the scan
+		self.nodeTimes = array("d")
+		# List of (seconds, objects, caption, python path) built by finish
+		self.slowest = []
+		self.appName = ""
+		self.objects = 0
+		# merkle.SubtreeReuse of the scan, None if it had no reference
+		self.reuse = None
+
+	def addPhase(self, name, seconds):
+		self.phases[name] = self.phases.get(name, 0.0)+seconds
+
+	@classmethod
+	def bucket(cls, seconds):
+		return min(max(int(seconds*1000000), 1).bit_length()-1, cls.bucketCount-1)
+
+	def addLatencies(self, histogram):
+		for index, count in enumerate(histogram):
+			self.histogram[index] = self.histogram[index]+count
+
+	def finish(self, table):
+		"""Ranks the slowest subtrees of the scan. Must be called before the table is modified.
+		The time of a subtree is the time of its root plus the time of its descendants.
+		"""
+		self.appName = table.appName or ""
+		self.objects = len(table)
+		times = self.nodeTimes
+		count = min(len(times), len(table))
+		parents = table.parents
+		inclusive = array("d", times[:count])
+		heaviestChild = array("d", bytes(8*count))
+		# Descendants come after their ascendants, so a reverse pass completes every subtree before adding it to its parent
+		for index in range(count-1, 0, -1):
+			parent = parents[index]
+			if parent >= 0:
+				inclusive[parent] = inclusive[parent]+inclusive[index]
+				if inclusive[index] > heaviestChild[parent]:
+					heaviestChild[parent] = inclusive[index]
+		candidates = [index for index in range(1, count)
+		if inclusive[index] > 0 and heaviestChild[index] < self.dominantChild*inclusive[index]]
+		candidates.sort(key=lambda index: inclusive[index], reverse=True)
+		self.slowest = []
+		for index in candidates[:self.slowestCount]:
+			obj = table[index]
+			self.slowest.append((inclusive[index], table.subtreeEnd(index)-index, obj.caption, obj.getAncestry()))
+
+	def percentile(self, fraction):
+		# Upper bound in seconds of the bucket that holds the given fraction of the objects
+		total = sum(self.histogram)
+		if not total:
+			return 0.0
+		accumulated = 0
+		for index, count in enumerate(self.histogram):
+			accumulated = accumulated+count
+			if accumulated >= fraction*total:
+				return (2**(index+1))/1000000.0
+		return (2**self.bucketCount)/1000000.0
+
+	def report(self):
+		lines = [_("Scan of {app}: {count} objects").format(app=self.appName, count=self.objects)]
+		lines.append(_("Phases:"))
+		for name, seconds in self.phases.items():
+			lines.append("  %s: %.3f s" % (name, seconds))
+		reuse = self.reuse
+		if reuse:
+			lines.append(_("Reused from the previous scan: {rows} objects in {subtrees} subtrees, {probes} subtrees checked with {reads} reads in {seconds:.3f} s, about {saved:.3f} s saved").format(
+			rows=reuse.reusedRows, subtrees=reuse.reusedSubtrees, probes=reuse.probedSubtrees, reads=reuse.probeReads,
+			seconds=reuse.probeTime, saved=reuse.timeSaved))
+		if self.reads:
+			lines.append(_("Property reads:"))
+			for name, (count, seconds) in sorted(self.reads.items(), key=lambda item: item[1][1], reverse=True):
+				lines.append(_("  {name}: {count} reads, {seconds:.3f} s, {average:.0f} us each").format(
+				name=name, count=count, seconds=seconds, average=seconds*1000000/count))
+		if sum(self.histogram):
+			lines.append(_("Time per object (median {median:.0f} us, 95% {p95:.0f} us):").format(
+			median=self.percentile(0.5)*1000000, p95=self.percentile(0.95)*1000000))
+			for index, count in enumerate(self.histogram):
+				if count:
+					lines.append("  %d-%d us: %d" % (2**index, 2**(index+1), count))
+		if self.slowest:
+			lines.append(_("Slowest subtrees:"))
+			for seconds, objects, caption, path in self.slowest:
+				lines.append(_("  {seconds:.3f} s, {objects} objects, {caption}: {path}").format(
+				seconds=seconds, objects=objects, caption=caption, path=path))
+		return "\n".join(lines)
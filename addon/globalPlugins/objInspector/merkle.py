@@ -0,0 +1,202 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: reuse of the unchanged subtrees of a previous scan
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# The fingerprint of an object is a digest of the properties that the list shows
+# or that identify it: role, name, description, value (read only for objects
+# without name nor description, as the scan does), window class, states and
+# count of children. The signature of a subtree is a digest of the
+# fingerprint of its root and the signatures of the subtrees of its children, as
+# in a Merkle tree, so two subtrees with the same signature have the same
+# fingerprints everywhere.
+# When a window is scanned again, the subtrees of the previous scan are checked
+# reading only the fingerprints of their objects at the same paths. If the
+# signature is the same, the rows of the previous scan are copied with the live
+# objects just found instead of reading all their properties; otherwise only the
+# branches whose signature differs are walked again.
+# Locations are not checked: they are taken from the previous scan, moved as much
+# as the foreground window has moved. Neither are the children that were not visible,
+# so one that appears without other changes in its parent is found by the next
+# full scan.
+
+from array import array
+from hashlib import blake2b
+from threading import Lock
+from time import perf_counter
+
+DIGEST_SIZE = 8
+
+def fingerprint(role, name, description, value, windowClassName, states, childCount):
+	key = "%d\n%s\n%s\n%s\n%s\n%s\n%d" % (role, name, description, value, windowClassName,
+	",".join(sorted([str(int(state)) for state in states])), childCount)
+	return blake2b(key.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+def combine(fingerprint, signatures):
+	# Signature of a subtree from the fingerprint of its root and the signatures of its children
+	digest = blake2b(fingerprint, digest_size=DIGEST_SIZE)
+	for signature in signatures:
+		digest.update(signature)
+	return digest.digest()
+
+class SubtreeSignatures(object):
+	"""Fingerprints and subtree signatures of the rows of a NodeTable, and for the subtree of each row
+	its end, its height and whether it has objects at the depth limit.
+	Rows whose children were not read, pruned or at the depth limit, have a count of -1.
+	"""
+
+	def __init__(self, table):
+		count = len(table)
+		self.fingerprints = [None]*count
+		self.signatures = [None]*count
+		self.ends = array("i", range(1, count+1))
+		self.heights = array("i", bytes(4*count))
+		self.limited = bytearray(count)
+		strings = table._strings
+		stateSets = table._stateSets
+		for row in range(count-1, -1, -1):
+			self.fingerprints[row] = fingerprint(table.roles[row], strings[table.names[row]], strings[table.descriptions[row]],
+			strings[table.values[row]], strings[table.windowClassNames[row]], stateSets[table.states[row]], table.childCounts[row])
+			children = table.children(row)
+			if len(children):
+				self.ends[row] = self.ends[children[-1]]
+				self.heights[row] = max([self.heights[child] for child in children])+1
+				self.limited[row] = max([self.limited[child] for child in children])
+			elif table.childCounts[row] < 0 and not table.flags[row] & table.PRUNED:
+				self.limited[row] = 1
+			self.signatures[row] = combine(self.fingerprints[row], [self.signatures[child] for child in children])
+
+class SubtreeReuse(object):
+	"""Subtrees of reference, the ScanResult of a previous complete scan of the same window, that can be reused by a new scan.
+	Subtrees smaller than minRows are always walked. Counters are updated by the threads of a parallel scan.
+	"""
+
+	minRows = 4
+
+	def __init__(self, reference):
+		self.table = reference.table
+		start = perf_counter()
+		self.signatures = SubtreeSignatures(self.table)
+		# Seconds taken by each object of the previous scan, to estimate the time saved
+		self.rowCost = reference.elapsed/len(self.table) if len(self.table) else 0.0
+		# Live signature and object of the rows checked, by row of the reference
+		self._live = {}
+		self._childRows = {}
+		self._lock = Lock()
+		self.shift = (0, 0)
+		self.probedSubtrees = 0
+		self.probeReads = 0
+		self.reusedSubtrees = 0
+		self.reusedRows = 0
+		self.probeTime = perf_counter()-start
+
+	def matchRoot(self, snapshot):
+		# Returns the row of the reference for the root of the new scan, -1 if it is not the same window
+		table = self.table
+		if not len(table) or table.roles[0] != int(snapshot.role) or table._strings[table.windowClassNames[0]] != snapshot.windowClassName:
+			return -1
+		old = table.snapshot(0).location
+		if old and snapshot.location:
+			self.shift = (snapshot.location[0]-old[0], snapshot.location[1]-old[1])
+		return 0
+
+	def childRow(self, row, ordinal, snapshot):
+		# Row of the reference at the same position below row, if it has the same role and window class as snapshot
+		table = self.table
+		rows = self._childRows.get(row)
+		if rows is None:
+			rows = self._childRows[row] = dict([(table.ordinals[child], child) for child in table.children(row)])
+		child = rows.get(ordinal, -1)
+		if child < 0 or table.roles[child] != int(snapshot.role) or table._strings[table.windowClassNames[child]] != snapshot.windowClassName:
+			return -1
+		return child
+
+	def unchanged(self, row, obj, snapshot):
+		"""Returns True if the subtree of row is the same in obj, the live object at its path, whose snapshot has just been taken.
+		The fingerprints of the subtree are read the first time one of its rows is checked.
+		"""
+		live = self._live.get(row)
+		if live is None:
+			if self.signatures.ends[row]-row < self.minRows:
+				return False
+			self._verify(row, obj, snapshot)
+			live = self._live[row]
+		return live[0] == self.signatures.signatures[row]
+
+	def liveObjects(self, start, stop):
+		return [self._live[row][1] for row in range(start, stop)]
+
+	def _verify(self, row, obj, snapshot):
+		# Reads the fingerprints of the rows below row whose ancestors have the same fingerprint, and computes their live signatures
+		start = perf_counter()
+		table = self.table
+		ordinals = table.ordinals
+		fingerprints = self.signatures.fingerprints
+		end = self.signatures.ends[row]
+		objects = {row: obj}
+		found = {}
+		reads = 0
+		for current in range(row, end):
+			live = objects.get(current)
+			if live is None:
+				continue
+			if current == row:
+				role, name, description, value, windowClassName, states = snapshot.role, snapshot.name, snapshot.description, \
+				snapshot.value, snapshot.windowClassName, snapshot.states
+			else:
+				role, name, description, windowClassName, states = live.role, live.name, live.description, live.windowClassName, live.states
+				reads = reads+5
+				value = None
+				if not name and not description:
+					value = live.value
+					reads = reads+1
+			if table.childCounts[current] < 0:
+				# Children of pruned objects and of the ones at the depth limit were not read by the previous scan
+				children = ()
+				childCount = -1
+			else:
+				children = live.children
+				childCount = len(children)
+				reads = reads+1
+			found[current] = fingerprint(role, name, description, value, windowClassName, states, childCount)
+			if found[current] != fingerprints[current]:
+				# Positions may have changed; the descendants are checked when the walk reaches them
+				continue
+			for child in table.children(current):
+				if ordinals[child] < len(children):
+					objects[child] = children[ordinals[child]]
+		signatures = {}
+		for current in range(end-1, row-1, -1):
+			if current not in found:
+				continue
+			signature = None
+			if found[current] == fingerprints[current]:
+				childSignatures = [signatures.get(child) for child in table.children(current)]
+				if None not in childSignatures:
+					signature = combine(found[current], childSignatures)
+			signatures[current] = signature
+			self._live[current] = (signature, objects[current])
+		with self._lock:
+			self.probedSubtrees = self.probedSubtrees+1
+			self.probeReads = self.probeReads+reads
+			self.probeTime = self.probeTime+perf_counter()-start
+
+	def shiftLocations(self, table, rows):
+		# Moves the locations of the rows copied to table as much as the root has moved since the reference
+		if self.shift == (0, 0):
+			return
+		locations = table.locations
+		for row in rows:
+			if locations[row*4+2] or locations[row*4+3] or locations[row*4] or locations[row*4+1]:
+				locations[row*4] += self.shift[0]
+				locations[row*4+1] += self.shift[1]
+
+	def addReused(self, rows):
+		with self._lock:
+			self.reusedSubtrees = self.reusedSubtrees+1
+			self.reusedRows = self.reusedRows+rows
+
+	@property
+	def timeSaved(self):
+		# Estimated seconds saved: the time the reused objects took in the previous scan minus the time spent checking them
+		return self.reusedRows*self.rowCost-self.probeTime
@@ -0,0 +1,468 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: compact storage of the objects found by a scan
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# Each object is a row of a set of arrays instead of a Python instance.
+# The ancestry is not copied in every object: rows keep the index of their parent
+# and the position among its children, and paths are rebuilt when they are needed.
+
+import controlTypes
+import addonHandler
+from array import array
+from collections import namedtuple
+from hashlib import md5
+import sys
+
+addonHandler.initTranslation()
+
+# Properties of an object read once during the scan.
+# value is only read when the object has neither name nor description, otherwise it is None.
+NodeSnapshot = namedtuple("NodeSnapshot", ("role", "name", "description", "value", "states", "location", "windowClassName"))
+
+def takeSnapshot(obj, location=None, states=None):
+	# location and states can be passed if they have already been read to check the visibility
+	if location is None:
+		location = obj.location
+	if states is None:
+		states = obj.states
+	name = obj.name
+	description = obj.description
+	value = None if name or description else obj.value
+	return NodeSnapshot(obj.role, name, description, value, frozenset(states), location, obj.windowClassName)
+
+def makeCaption(snapshot):
+	# Compose the caption of the object: roleLabel+name+description
+	role = "%s, " % controlTypes.role._roleLabels[snapshot.role]
+	if snapshot.name == None:
+		name = ""
+	else:
+		name = snapshot.name
+	if snapshot.description:
+		if name:
+			description = ", %s" % snapshot.description
+		else:
+			description = snapshot.description
+	else:
+		description = ""
+	if not name+description:
+		if snapshot.value:
+			name = snapshot.value
+			if len(name) > 50:
+				name = "%s..." % name[0:50]
+		else:
+			name = _("untagged")
+	return role+name+description
+
+def chainStep(snapshot):
+	# Line added to the signature chain for each level of the path
+	return " %d %s\n" % (snapshot.role, snapshot.windowClassName)
+
+def pathStep(ordinal):
+	return ".children[%d]" % ordinal
+
+# Path of the foreground object in the python code shown for each object
+ROOT_PATH = "obj = fg"
+
+def favoriteHash(appName, snapshot, chain, path):
+	"""Hash that identifies an object in the favorites.
+	chain is the concatenation of chainStep of the objects from the first level down to this one, and path its python code.
+	"""
+	line = "%s\n%d %s\n" % (appName, snapshot.role, snapshot.windowClassName)
+	return md5((line+chain+path).encode()).digest()
+
+NO_HASH = bytes(16)
+
+class NodeTable(object):
+	"""Columns with the objects of a scan, one row per object in the order they were found.
+	Rows without parent in the table have parent -1; their path from the foreground object is kept in rootPaths.
+	Strings and sets of states are interned: columns hold the index of the value in a pool.
+	Captions are stored as UTF-8 in a single buffer, captionOffsets has the start of each one.
+	hashes has the 16 bytes of the favorites hash of each row, or zeros if it was not computed during the scan.
+	"""
+
+	# Rows refer to live NVDA objects, False for tables read from a file
+	live = True
+	# Bits of the flags column
+	FAVORITE = 1
+	# Placeholder of an object whose descendants have not been walked because of a pruning rule
+	PRUNED = 2
+
+	def __init__(self):
+		self.parents = array("i")
+		# Position of the object among the children of its parent
+		self.ordinals = array("i")
+		self.roles = array("i")
+		self.names = array("i")
+		self.descriptions = array("i")
+		self.values = array("i")
+		self.windowClassNames = array("i")
+		self.states = array("i")
+		# Four items per row: left, top, width, height
+		self.locations = array("i")
+		# Number of children of each object, visible or not; -1 if they have not been read
+		self.childCounts = array("i")
+		self.captionOffsets = array("I", [0])
+		self.captionBuffer = bytearray()
+		self.flags = bytearray()
+		self.hashes = bytearray()
+		# Live NVDA objects, needed to act on them
+		self.objs = []
+		self.rootPaths = {}
+		self._strings = [None]
+		self._stringIndex = {None: 0}
+		self._stateSets = []
+		self._stateSetIndex = {}
+		# Role values by code, so that snapshots give back the same objects that were stored
+		self._roles = {}
+		# Application of the foreground object of the scan
+		self.appName = None
+		# Index of the children of each row, built when it is first needed. See children.
+		self._childStarts = None
+		self._childRows = None
+
+	def __len__(self):
+		return len(self.parents)
+
+	def __getitem__(self, index):
+		if index < 0:
+			index = index+len(self)
+		if not 0 <= index < len(self):
+			raise IndexError(index)
+		return OBJECT(table=self, index=index)
+
+	def __iter__(self):
+		for index in range(len(self)):
+			yield OBJECT(table=self, index=index)
+
+	def _intern(self, string):
+		try:
+			return self._stringIndex[string]
+		except KeyError:
+			self._stringIndex[string] = len(self._strings)
+			self._strings.append(string)
+			return len(self._strings)-1
+
+	def _internStates(self, states):
+		try:
+			return self._stateSetIndex[states]
+		except KeyError:
+			self._stateSetIndex[states] = len(self._stateSets)
+			self._stateSets.append(states)
+			return len(self._stateSets)-1
+
+	def add(self, obj, snapshot, parent=-1, ordinal=0, caption=None, hash=None):
+		# Appends a row and returns its index
+		self._roles.setdefault(int(snapshot.role), snapshot.role)
+		self.parents.append(parent)
+		self.ordinals.append(ordinal)
+		self.roles.append(int(snapshot.role))
+		self.names.append(self._intern(snapshot.name))
+		self.descriptions.append(self._intern(snapshot.description))
+		self.values.append(self._intern(snapshot.value))
+		self.windowClassNames.append(self._intern(snapshot.windowClassName))
+		self.states.append(self._internStates(snapshot.states))
+		self.locations.extend(snapshot.location if snapshot.location else (0, 0, 0, 0))
+		if caption is None:
+			caption = makeCaption(snapshot)
+		self.captionBuffer.extend(caption.encode("utf-8"))
+		self.captionOffsets.append(len(self.captionBuffer))
+		self.childCounts.append(-1)
+		self.flags.append(0)
+		self.hashes.extend(hash if hash else NO_HASH)
+		self.objs.append(obj)
+		return len(self.parents)-1
+
+	def addRoot(self, obj, snapshot, path=()):
+		# Adds a row without parent in the table. path is its ancestry from the foreground object.
+		index = self.add(obj, snapshot)
+		if path:
+			self.rootPaths[index] = list(path)
+		return index
+
+	def extend(self, table, parent):
+		"""Appends the rows of another table. Its rows without parent become children of parent.
+		Returns the range of the new rows.
+		"""
+		offset = len(self)
+		for index in range(len(table)):
+			self.add(table.objs[index], table.snapshot(index),
+			parent if table.parents[index] < 0 else table.parents[index]+offset,
+			table.ordinals[index], table.caption(index), table.hash(index))
+			self.flags[-1] = table.flags[index]
+			self.childCounts[-1] = table.childCounts[index]
+		return range(offset, len(self))
+
+	def appendRows(self, table, start, stop, parent, objs=None):
+		"""Appends the rows from start to stop of another table, which must be whole subtrees, copying its columns.
+		Rows whose parent is before start become children of parent. objs are the live objects of the new rows, the ones of table by default.
+		Returns the range of the new rows.
+		"""
+		offset = len(self)
+		self.parents.extend(array("i", [parent if p < start else p-start+offset for p in table.parents[start:stop]]))
+		self.ordinals.extend(table.ordinals[start:stop])
+		self.roles.extend(table.roles[start:stop])
+		for code, role in table._roles.items():
+			self._roles.setdefault(code, role)
+		# Only the strings and sets of states of the rows copied are interned in the pools of this table
+		strings = {}
+		for name in ("names", "descriptions", "values", "windowClassNames"):
+			column = getattr(self, name)
+			for i in getattr(table, name)[start:stop]:
+				index = strings.get(i)
+				if index is None:
+					index = strings[i] = self._intern(table._strings[i])
+				column.append(index)
+		stateSets = {}
+		for i in table.states[start:stop]:
+			index = stateSets.get(i)
+			if index is None:
+				index = stateSets[i] = self._internStates(table._stateSets[i])
+			self.states.append(index)
+		self.locations.extend(table.locations[start*4:stop*4])
+		byteStart = table.captionOffsets[start]
+		byteDelta = len(self.captionBuffer)-byteStart
+		self.captionBuffer.extend(table.captionBuffer[byteStart:table.captionOffsets[stop]])
+		self.captionOffsets.extend(array("I", [offset+byteDelta for offset in table.captionOffsets[start+1:stop+1]]))
+		self.flags.extend(table.flags[start:stop])
+		self.childCounts.extend(table.childCounts[start:stop])
+		self.hashes.extend(table.hashes[start*16:stop*16])
+		self.objs.extend(objs if objs is not None else table.objs[start:stop])
+		return range(offset, len(self))
+
+	def splice(self, start, stop, table, parent):
+		"""Replaces the rows from start to stop, which must be a whole subtree, by the rows of table.
+		Rows of table without parent become children of parent. Returns the difference in the number of rows.
+		"""
+		delta = len(table)-(stop-start)
+		self.parents[start:] = array("i", [parent if p < 0 else p+start for p in table.parents]) \
+		+array("i", [p+delta if p >= stop else p for p in self.parents[stop:]])
+		self.ordinals[start:stop] = table.ordinals
+		self.roles[start:stop] = table.roles
+		for code, role in table._roles.items():
+			self._roles.setdefault(code, role)
+		# Strings and sets of states are interned again in the pools of this table
+		strings = [self._intern(string) for string in table._strings]
+		for name in ("names", "descriptions", "values", "windowClassNames"):
+			getattr(self, name)[start:stop] = array("i", [strings[i] for i in getattr(table, name)])
+		stateSets = [self._internStates(states) for states in table._stateSets]
+		self.states[start:stop] = array("i", [stateSets[i] for i in table.states])
+		self.locations[start*4:stop*4] = table.locations
+		self.flags[start:stop] = table.flags
+		self.childCounts[start:stop] = table.childCounts
+		self.hashes[start*16:stop*16] = table.hashes
+		self.objs[start:stop] = table.objs
+		byteStart = self.captionOffsets[start]
+		byteStop = self.captionOffsets[stop]
+		byteDelta = len(table.captionBuffer)-(byteStop-byteStart)
+		self.captionBuffer[byteStart:byteStop] = table.captionBuffer
+		self.captionOffsets[start+1:] = array("I", [offset+byteStart for offset in table.captionOffsets[1:]]) \
+		+array("I", [offset+byteDelta for offset in self.captionOffsets[stop+1:]])
+		if delta:
+			self.rootPaths = dict([(i+delta if i >= stop else i, path) for i, path in self.rootPaths.items()])
+		self._childStarts = None
+		return delta
+
+	def _buildChildIndex(self):
+		"""Children of row i are childRows[childStarts[i]:childStarts[i+1]], in the order they were found.
+		Rows without parent are kept at the end, from childStarts[count], count being the rows indexed.
+		"""
+		# A scan in progress may be adding rows; only the ones already there are indexed
+		count = len(self.parents)
+		parents = self.parents[:count]
+		starts = array("i", bytes(4*(count+2)))
+		for parent in parents:
+			starts[parent+1 if parent >= 0 else count+1] += 1
+		for index in range(1, count+2):
+			starts[index] = starts[index]+starts[index-1]
+		rows = array("i", bytes(4*count))
+		positions = array("i", starts)
+		for index, parent in enumerate(parents):
+			if parent < 0:
+				parent = count
+			rows[positions[parent]] = index
+			positions[parent] = positions[parent]+1
+		self._childStarts = starts
+		self._childRows = rows
+		self._indexSize = count
+
+	def children(self, index):
+		# Rows of the children of a row found by the scan. Rows added later are indexed again the next time.
+		if self._childStarts is None or self._indexSize != len(self):
+			self._buildChildIndex()
+		if index >= self._indexSize:
+			# Added while the index was built, its children are not in the table yet
+			return array("i")
+		starts = self._childStarts
+		return self._childRows[starts[index]:starts[index+1]]
+
+	def siblings(self, index):
+		# Rows with the same parent, including the row itself
+		parent = self.parents[index]
+		if parent < 0:
+			self.children(0)
+			return self._childRows[self._childStarts[self._indexSize]:]
+		return self.children(parent)
+
+	def ascendants(self, index):
+		# Rows of the ascendants of a row, from the first one of the table down to its parent
+		rows = []
+		index = self.parents[index]
+		while index >= 0:
+			rows.append(index)
+			index = self.parents[index]
+		rows.reverse()
+		return rows
+
+	def depth(self, index):
+		depth = 0
+		while self.parents[index] >= 0:
+			index = self.parents[index]
+			depth = depth+1
+		return depth
+
+	def subtreeEnd(self, index):
+		# Rows of the descendants of a row follow it; returns the index of the first row after them
+		end = index+1
+		subtree = set([index])
+		parents = self.parents
+		while end < len(parents) and parents[end] in subtree:
+			subtree.add(end)
+			end = end+1
+		return end
+
+	def signature(self, index):
+		"""Signature chain and python path of a row, rebuilt from the columns.
+		They are the ones used by the scan to compute the favorites hash of the row.
+		"""
+		rows = self._pathRows(index)
+		chain = "".join([" %d %s\n" % (self.roles[i], self._strings[self.windowClassNames[i]]) for i in rows])
+		return chain, ROOT_PATH+"".join([pathStep(self.ordinals[i]) for i in rows])
+
+	def steps(self, index):
+		# Role and window class name of the objects of the signature chain of a row
+		return [(self.roles[i], self._strings[self.windowClassNames[i]]) for i in self._pathRows(index)]
+
+	def _pathRows(self, index):
+		# Rows from the first level below the root down to index
+		rows = []
+		while self.parents[index] >= 0:
+			rows.append(index)
+			index = self.parents[index]
+		rows.reverse()
+		return rows
+
+	def memorySize(self):
+		# Approximate bytes taken by the table, without the live objects it refers to
+		size = sys.getsizeof(self.objs)+len(self.captionBuffer)+len(self.flags)+len(self.hashes)
+		for column in (self.parents, self.ordinals, self.roles, self.names, self.descriptions, self.values,
+		self.windowClassNames, self.states, self.locations, self.childCounts, self.captionOffsets):
+			size = size+column.itemsize*len(column)
+		for string in self._strings:
+			size = size+sys.getsizeof(string)
+		for states in self._stateSets:
+			size = size+sys.getsizeof(states)
+		return size
+
+	def location(self, index):
+		# (left, top, width, height) of a row, None if it has no location
+		location = tuple(self.locations[index*4:index*4+4])
+		return location if location != (0, 0, 0, 0) else None
+
+	def snapshot(self, index):
+		strings = self._strings
+		return NodeSnapshot(self._roles[self.roles[index]],
+		strings[self.names[index]],
+		strings[self.descriptions[index]],
+		strings[self.values[index]],
+		self._stateSets[self.states[index]],
+		self.location(index),
+		strings[self.windowClassNames[index]])
+
+	def hash(self, index):
+		hash = bytes(self.hashes[index*16:index*16+16])
+		return hash if hash != NO_HASH else None
+
+	def caption(self, index):
+		return self.captionBuffer[self.captionOffsets[index]:self.captionOffsets[index+1]].decode("utf-8")
+
+	def ancestry(self, index):
+		# Positions of the object and its ascendants among their siblings, from the foreground object down
+		path = []
+		while index >= 0:
+			parent = self.parents[index]
+			if parent < 0:
+				path.extend(reversed(self.rootPaths.get(index, [])))
+				break
+			path.append(self.ordinals[index])
+			index = parent
+		path.reverse()
+		return path
+
+class OBJECT(object):
+	"""An object found by a scan: a row of a NodeTable.
+	Objects created from a live NVDA object and its ancestry are stored alone in their own table.
+	"""
+
+	__slots__ = ("table", "index")
+
+	def __init__(self, obj=None, ancestry=[], snapshot=None, table=None, index=0):
+		if table is None:
+			table = NodeTable()
+			index = table.addRoot(obj, snapshot if snapshot else takeSnapshot(obj), ancestry)
+		self.table = table
+		self.index = index
+
+	def __eq__(self, other):
+		return isinstance(other, OBJECT) and self.table is other.table and self.index == other.index
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __hash__(self):
+		return hash((id(self.table), self.index))
+
+	@property
+	def obj(self):
+		return self.table.objs[self.index]
+
+	@property
+	def snapshot(self):
+		# Properties of the object are read only once, the caption, the filters and the favorites use the snapshot
+		return self.table.snapshot(self.index)
+
+	@property
+	def caption(self):
+		return self.table.caption(self.index)
+
+	@property
+	def ancestry(self):
+		return self.table.ancestry(self.index)
+
+	@property
+	def steps(self):
+		return self.table.steps(self.index)
+
+	@property
+	def favorite(self):
+		return bool(self.table.flags[self.index] & NodeTable.FAVORITE)
+
+	@favorite.setter
+	def favorite(self, value):
+		if value:
+			self.table.flags[self.index] |= NodeTable.FAVORITE
+		else:
+			self.table.flags[self.index] &= ~NodeTable.FAVORITE
+
+	@property
+	def pruned(self):
+		return bool(self.table.flags[self.index] & NodeTable.PRUNED)
+
+	@property
+	def hash(self):
+		# Favorites hash computed during the scan, None for objects created out of a scan
+		return self.table.hash(self.index)
+
+	def getAncestry(self):
+		# Returns a python code to access the object.
+		return ROOT_PATH+"".join([pathStep(i) for i in self.ancestry])
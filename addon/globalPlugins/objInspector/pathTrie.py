@@ -0,0 +1,172 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: paths of objects that share their prefixes
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# A path is the list of positions among the children from the foreground object
+# down to an object. Paths resolved together usually share their first levels:
+# the ascendants of an object, the children of the same parent or the favorites
+# of a window. A trie keeps each prefix once, so the children of each object along
+# them are read once, and the live objects found are kept until the trie is
+# discarded with the scan it belongs to. The text of the accessor of a path is
+# joined from the steps of its nodes, which are built once.
+
+from collections import namedtuple
+from .nodeTable import ROOT_PATH, pathStep
+
+# objects has the live object of each path, None for the ones in missing, the paths that no longer resolve
+PathResolution = namedtuple("PathResolution", ("objects", "missing", "reads"))
+
+class TrieNode(object):
+	"""Prefix of one or more paths. obj is its live object once resolved; liveChildren the children of obj, read once.
+	signature is the role and window class name of obj, read when a path is resolved checking its steps.
+	"""
+
+	__slots__ = ("parent", "ordinal", "step", "children", "obj", "liveChildren", "signature", "failed")
+
+	def __init__(self, parent, ordinal):
+		self.parent = parent
+		self.ordinal = ordinal
+		self.step = pathStep(ordinal) if parent is not None else ""
+		self.children = {}
+		self.obj = None
+		self.liveChildren = None
+		self.signature = None
+		self.failed = False
+
+class PathTrie(object):
+	"""Paths from root, the live foreground object of a scan, sharing their prefixes.
+	reads counts the properties read from the live objects.
+	"""
+
+	def __init__(self, root):
+		self.root = TrieNode(None, -1)
+		self.root.obj = root
+		self.reads = 0
+
+	def add(self, path):
+		# Returns the node of path, creating the ones of its prefixes that are not in the trie
+		node = self.root
+		for ordinal in path:
+			node = self._child(node, ordinal)
+		return node
+
+	def _child(self, node, ordinal):
+		child = node.children.get(ordinal)
+		if child is None:
+			child = node.children[ordinal] = TrieNode(node, ordinal)
+		return child
+
+	def accessor(self, path):
+		# Python text that gets the object at path from fg, such as "obj = fg.children[2].children[0]"
+		node = self.add(path)
+		steps = []
+		while node.parent is not None:
+			steps.append(node.step)
+			node = node.parent
+		steps.reverse()
+		return ROOT_PATH+"".join(steps)
+
+	def children(self, path, obj=None):
+		"""Live children of the object at path, read only the first time. obj is its live object, if it is already known.
+		Returns None if the path no longer resolves.
+		"""
+		node = self.add(path)
+		if obj is not None and node.obj is None:
+			node.obj = obj
+		if not self._resolve(node):
+			return None
+		return self._liveChildren(node)
+
+	def _liveChildren(self, node):
+		if node.liveChildren is None:
+			self.reads = self.reads+1
+			node.liveChildren = list(node.obj.children)
+		return node.liveChildren
+
+	def signatures(self, path):
+		"""Role and window class name of the objects along path, from the first level down, read once.
+		Returns None if the path no longer resolves.
+		"""
+		node = self.add(path)
+		if not self._resolve(node):
+			return None
+		signatures = []
+		while node.parent is not None:
+			signatures.append(self._signature(node))
+			node = node.parent
+		signatures.reverse()
+		return signatures
+
+	def _signature(self, node):
+		if node.signature is None:
+			self.reads = self.reads+2
+			node.signature = (node.obj.role, node.obj.windowClassName)
+		return node.signature
+
+	def _resolve(self, node, step=None):
+		# Finds the live object of node from its nearest resolved ascendant. step is the (role, window class name) it must have.
+		pending = []
+		current = node
+		while current.obj is None and not current.failed:
+			pending.append(current)
+			current = current.parent
+		if current.failed:
+			for item in pending:
+				item.failed = True
+			return False
+		for i in range(len(pending)-1, -1, -1):
+			item = pending[i]
+			children = self._liveChildren(item.parent)
+			if item.ordinal >= len(children):
+				# The descendants of an object that is not there are not either
+				for rest in pending[:i+1]:
+					rest.failed = True
+				return False
+			item.obj = children[item.ordinal]
+		if step is not None:
+			return self._signature(node) == tuple(step)
+		return True
+
+	def resolve(self, paths, steps=None):
+		"""Returns a PathResolution of a batch of paths. Shared prefixes are read once.
+		steps has for each path the list of the (role, window class name) of the objects along it, from the first level down;
+		a path whose objects do not match them no longer resolves.
+		"""
+		start = self.reads
+		objects = []
+		missing = []
+		for i, path in enumerate(paths):
+			node = self.add(path)
+			if steps is None:
+				found = self._resolve(node)
+			else:
+				found = self._resolveSteps(path, steps[i])
+			objects.append(node.obj if found else None)
+			if not found:
+				missing.append(list(path))
+		return PathResolution(objects, missing, self.reads-start)
+
+	def _resolveSteps(self, path, steps):
+		if len(path) != len(steps):
+			return False
+		node = self.root
+		for ordinal, step in zip(path, steps):
+			node = self._child(node, ordinal)
+			if not self._resolve(node, step):
+				return False
+		return True
+
+	def ascendants(self, path):
+		# Live objects from the root down to the parent of path; the list ends before the first one that no longer resolves
+		node = self.add(path[:-1]) if path else self.root
+		chain = []
+		while node is not None:
+			chain.append(node)
+			node = node.parent
+		objects = []
+		for node in reversed(chain):
+			if not self._resolve(node):
+				break
+			objects.append(node.obj)
+		return objects
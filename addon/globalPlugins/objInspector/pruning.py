@@ -0,0 +1,114 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: pruning rules of the scan
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# Objects that match a rule are added to the list as collapsed placeholders:
+# the scan does not walk their descendants, which are read only when the user
+# asks for the children of the object.
+# A rule is a line of terms separated by spaces, all of them must match:
+#   role=list children>500
+#   class=GlassPane
+#   app=explorer role=tree
+# role is the name of a controlTypes.Role, class the window class name, app the
+# name of the application module and children the minimum count of children.
+
+import controlTypes
+import addonHandler
+from .compat import enumNames
+
+addonHandler.initTranslation()
+
+class PruneRule(object):
+
+	def __init__(self, role=None, windowClassName=None, appName=None, minChildren=0):
+		self.role = role
+		self.windowClassName = windowClassName
+		self.appName = appName
+		self.minChildren = minChildren
+
+	@classmethod
+	def parse(cls, text):
+		# Raises ValueError with a message for the user if the rule is not valid
+		rule = cls()
+		terms = text.split()
+		if not terms:
+			raise ValueError(_("Empty rule"))
+		for term in terms:
+			if term.startswith("children>"):
+				try:
+					rule.minChildren = int(term[9:])+1
+				except ValueError:
+					raise ValueError(_("Invalid count of children in %s") % term)
+				continue
+			key, sep, value = term.partition("=")
+			if not sep or not value:
+				raise ValueError(_("Invalid term %s") % term)
+			if key == "role":
+				# getattr also works with the Role class of old versions of NVDA
+				rule.role = getattr(controlTypes.Role, value.upper(), None) if value.replace("_", "").isalpha() else None
+				if rule.role is None:
+					raise ValueError(_("Unknown role %s") % value)
+			elif key == "class":
+				rule.windowClassName = value
+			elif key == "app":
+				rule.appName = value.lower()
+			else:
+				raise ValueError(_("Invalid term %s") % term)
+		return rule
+
+	def __str__(self):
+		terms = []
+		if self.role is not None:
+			terms.append("role=%s" % enumNames(controlTypes.Role).get(self.role, str(self.role)).lower())
+		if self.windowClassName is not None:
+			terms.append("class=%s" % self.windowClassName)
+		if self.appName is not None:
+			terms.append("app=%s" % self.appName)
+		if self.minChildren:
+			terms.append("children>%d" % (self.minChildren-1))
+		return " ".join(terms)
+
+	def matches(self, obj, snapshot, appName):
+		# The count of children is read only when the other terms match
+		if self.role is not None and snapshot.role != self.role:
+			return False
+		if self.windowClassName is not None and snapshot.windowClassName != self.windowClassName:
+			return False
+		if self.appName is not None and appName.lower() != self.appName:
+			return False
+		return not self.minChildren or obj.childCount >= self.minChildren
+
+class PruneRules(object):
+	"""Set of rules checked for each object found by a scan.
+	documents adds the rule of the "Drill down into documents" setting when it is False.
+	"""
+
+	def __init__(self, rules=(), documents=True):
+		self.rules = list(rules)
+		if not documents:
+			self.rules.append(PruneRule(role=controlTypes.Role.DOCUMENT))
+
+	@classmethod
+	def parse(cls, lines, documents=True):
+		# Returns the rules and the list of (line, error message) of the lines that are not valid
+		rules = []
+		errors = []
+		for line in lines:
+			if not line.strip():
+				continue
+			try:
+				rules.append(PruneRule.parse(line))
+			except ValueError as inst:
+				errors.append((line, inst.args[0]))
+		return cls(rules, documents), errors
+
+	def __len__(self):
+		return len(self.rules)
+
+	def match(self, obj, snapshot, appName):
+		# Returns the first rule that prunes the object or None
+		for rule in self.rules:
+			if rule.matches(obj, snapshot, appName):
+				return rule
+		return None
@@ -0,0 +1,185 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: queries on the objects of a window without the objects window
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# Scripts and other add-ons can look for objects with the predicates of a Query,
+# for example the first enabled button named Send:
+#   from globalPlugins.objInspector import query
+#   match = query.findFirst(api.getForegroundObject(), query.Query(role=controlTypes.Role.BUTTON, name="^Send$", notStates=[controlTypes.State.UNAVAILABLE]))
+#   if match: match.obj.doAction()
+# The predicates are checked during the walk, reading the properties of each
+# object only until one fails: depth first, then states (already read to check
+# the visibility), role, name and description. Subtrees below the maximum depth
+# are not walked, and the walk stops when the requested number of objects has
+# been found. Only the objects found are stored, each one with its path and its
+# favorites hash.
+
+import re
+import controlTypes
+from .compat import fixControlTypes
+from .nodeTable import NodeTable, takeSnapshot, favoriteHash, chainStep, pathStep, ROOT_PATH
+from .resolver import Step
+
+class Query(object):
+	"""Predicates that the objects found must match. Those not given match any object.
+	role: a role or a collection of roles.
+	name, description: regular expressions, as text or compiled, searched in them. Objects without them do not match.
+	states: states that the object must have; notStates: states that it must not have.
+	minDepth, maxDepth: levels below the foreground object, which is at level 0. maxDepth 0 means no limit.
+	documents: walk the descendants of documents.
+	visibleOnly: like the scans, skip the objects that are not visible and their descendants.
+	"""
+
+	def __init__(self, role=None, name=None, description=None, states=(), notStates=(), minDepth=0, maxDepth=0, documents=True, visibleOnly=True):
+		# Queries can be built before the add-on has been used, and their states and roles compared with controlTypes.State and Role
+		fixControlTypes()
+		if role is None:
+			self.roles = None
+		elif isinstance(role, (list, tuple, set, frozenset)):
+			self.roles = frozenset(role)
+		else:
+			self.roles = frozenset([role])
+		self.name = re.compile(name) if isinstance(name, str) else name
+		self.description = re.compile(description) if isinstance(description, str) else description
+		self.states = frozenset(states)
+		self.notStates = frozenset(notStates)
+		self.minDepth = minDepth
+		self.maxDepth = maxDepth
+		self.documents = documents
+		self.visibleOnly = visibleOnly
+
+	def matchStates(self, states):
+		return self.states <= states and not (self.notStates & states)
+
+	def matchText(self, expression, text):
+		return expression is None or (text is not None and expression.search(text) is not None)
+
+class MatchTable(NodeTable):
+	"""Objects found by a query. Each one is a row without parent that keeps its path and the signatures of the objects along it,
+	so that its python code, its favorites hash and its steps are the ones it has in a scan.
+	"""
+
+	def __init__(self):
+		super(MatchTable, self).__init__()
+		self._steps = []
+
+	def addMatch(self, obj, snapshot, path, steps):
+		chain = "".join([chainStep(Step(*step)) for step in steps])
+		index = self.add(obj, snapshot, hash=favoriteHash(self.appName, snapshot, chain, ROOT_PATH+"".join([pathStep(ordinal) for ordinal in path])))
+		if path:
+			self.rootPaths[index] = list(path)
+		self._steps.append(tuple(steps))
+		return index
+
+	def steps(self, index):
+		return [(int(role), windowClassName) for role, windowClassName in self._steps[index]]
+
+	def signature(self, index):
+		chain = "".join([chainStep(Step(*step)) for step in self._steps[index]])
+		return chain, ROOT_PATH+"".join([pathStep(ordinal) for ordinal in self.ancestry(index)])
+
+class Finder(object):
+	"""Walks the tree of objects checking a Query. visited and reads count the objects and the properties read by the last find."""
+
+	def __init__(self, query):
+		self.query = query
+		self.visited = 0
+		self.reads = 0
+
+	def find(self, root, limit=0):
+		"""Returns a MatchTable with the objects below root, included, that match the query, in the order of a scan.
+		limit is the number of objects after which the walk stops, 0 for all.
+		"""
+		fixControlTypes()
+		query = self.query
+		table = MatchTable()
+		table.appName = root.appModule.appName
+		self.visited = 0
+		self.reads = 0
+		# Each entry is [object, depth, parent entry, position among its siblings, signature]; the entries of the ascendants give the path of a match
+		stack = [[root, 0, None, 0, None]]
+		while stack:
+			entry = stack.pop()
+			obj, depth = entry[0], entry[1]
+			self.visited = self.visited+1
+			if depth == 0:
+				location = states = None
+			else:
+				location = obj.location
+				self.reads = self.reads+1
+				if query.visibleOnly and (not location or location == (0, 0, 0, 0)):
+					continue
+				states = obj.states
+				self.reads = self.reads+1
+				if query.visibleOnly and controlTypes.State.INVISIBLE in states:
+					continue
+			role = None
+			if depth >= query.minDepth:
+				if states is None:
+					states = obj.states
+					self.reads = self.reads+1
+				role = self._match(obj, states)
+				if role is not False:
+					table.addMatch(obj, takeSnapshot(obj, location, states), *self._path(entry))
+					if limit and len(table) >= limit:
+						break
+			if query.maxDepth and depth >= query.maxDepth:
+				continue
+			if not query.documents and depth > 0:
+				if role is None or role is False:
+					role = obj.role
+					self.reads = self.reads+1
+				if role == controlTypes.Role.DOCUMENT:
+					continue
+			children = obj.children
+			self.reads = self.reads+1
+			# Reversed so that the first child is the next to be visited
+			for index in range(len(children)-1, -1, -1):
+				stack.append([children[index], depth+1, entry, index, None])
+		return table
+
+	def _match(self, obj, states):
+		# Returns the role of obj if it matches the query, False otherwise. Properties are read in order of cost until one fails.
+		query = self.query
+		if not query.matchStates(states):
+			return False
+		role = obj.role
+		self.reads = self.reads+1
+		if query.roles is not None and role not in query.roles:
+			return False
+		if query.name is not None:
+			self.reads = self.reads+1
+			if not query.matchText(query.name, obj.name):
+				return False
+		if query.description is not None:
+			self.reads = self.reads+1
+			if not query.matchText(query.description, obj.description):
+				return False
+		return role
+
+	def _path(self, entry):
+		# Path and steps of the object of a stack entry, from the entries of its ascendants. Signatures are read once per entry.
+		path = []
+		steps = []
+		while entry[2] is not None:
+			if entry[4] is None:
+				entry[4] = (entry[0].role, entry[0].windowClassName)
+				self.reads = self.reads+2
+			path.append(entry[3])
+			steps.append(entry[4])
+			entry = entry[2]
+		path.reverse()
+		steps.reverse()
+		return path, steps
+
+def find(root, query, limit=0):
+	"""Returns a MatchTable with the objects below root, included, that match query. Its items are OBJECT with their snapshot,
+	python code (getAncestry) and live object. The walk stops after limit objects, 0 for no limit.
+	"""
+	return Finder(query).find(root, limit)
+
+def findFirst(root, query):
+	# Returns the first OBJECT that matches query in the order of a scan, or None
+	table = Finder(query).find(root, 1)
+	return table[0] if len(table) else None
@@ -0,0 +1,106 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: recording of the trees walked by a scan
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# While a scan is recorded every property read by the walk is written to a
+# compressed file with its value and the time it took, so that the tree of a real
+# application can be replayed later without it (see benchmarks/replay.py).
+# The file is a gzip of JSON lines. The first line is a header:
+#   {"version": 1, "appName": ..., "time": ...}
+# and then one line per property read:
+#   [node, property, value, microseconds]
+# Nodes are numbered in the order they are found, the root is 0. The value of
+# children is the list of the numbers of the children; roles and states are
+# written by name so that they do not depend on the version of NVDA.
+
+import controlTypes
+from .compat import enumNames
+import gzip
+import json
+import os
+from threading import Lock
+from time import perf_counter, time, strftime
+
+FORMAT_VERSION = 1
+
+class RecordingProbe(object):
+	"""Wraps an NVDA object of a recorded scan writing each property read through it."""
+
+	__slots__ = ("obj", "recorder", "node")
+
+	def __init__(self, obj, recorder, node):
+		self.obj = obj
+		self.recorder = recorder
+		self.node = node
+
+	def __getattr__(self, name):
+		start = perf_counter()
+		value = getattr(self.obj, name)
+		self.recorder.write(self.node, name, value, perf_counter()-start)
+		return value
+
+class TreeRecorder(object):
+	"""Writes the properties read by a scan to path. The scanner wraps the objects with wrap before reading them.
+	Objects are kept until the recording is closed so that they can be identified by id.
+	"""
+
+	def __init__(self, path, appName=""):
+		self.path = path
+		self.nodes = 0
+		self.reads = 0
+		self._ids = {}
+		self._objects = []
+		self._lock = Lock()
+		self._roleNames = enumNames(controlTypes.Role)
+		self._stateNames = enumNames(controlTypes.State)
+		self._file = gzip.open(path, "wt", encoding="utf-8")
+		self._file.write(json.dumps({"version": FORMAT_VERSION, "appName": appName, "time": time()})+"\n")
+
+	@staticmethod
+	def defaultPath(folder, appName):
+		if not os.path.isdir(folder):
+			os.makedirs(folder)
+		return os.path.join(folder, "%s-%s.oir.gz" % (appName, strftime("%Y%m%d-%H%M%S")))
+
+	def _node(self, obj):
+		# Number of an object, assigned the first time it is seen
+		key = id(obj)
+		node = self._ids.get(key)
+		if node is None:
+			node = self._ids[key] = self.nodes
+			self._objects.append(obj)
+			self.nodes = self.nodes+1
+		return node
+
+	def wrap(self, obj):
+		with self._lock:
+			return RecordingProbe(obj, self, self._node(obj))
+
+	def encode(self, name, value):
+		if name == "children":
+			return [self._node(child) for child in value]
+		if name == "role":
+			return self._roleNames.get(value, str(value))
+		if name == "states":
+			return sorted([self._stateNames.get(state, str(state)) for state in value])
+		if name == "location":
+			return list(value) if value else None
+		if name == "parent" or name == "appModule":
+			return None
+		return value
+
+	def write(self, node, name, value, seconds):
+		with self._lock:
+			if not self._file:
+				return
+			self._file.write(json.dumps([node, name, self.encode(name, value), int(seconds*1000000)], separators=(",", ":"))+"\n")
+			self.reads = self.reads+1
+
+	def close(self):
+		with self._lock:
+			if self._file:
+				self._file.close()
+				self._file = None
+			self._ids = {}
+			self._objects = []
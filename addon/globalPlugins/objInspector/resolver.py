@@ -0,0 +1,90 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: resolution of a favorite from its path
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# A favorite keeps the path from the foreground object (the positions among the
+# children at each level) and the signature of each object along it: its role and
+# window class name, the same values that are hashed in the signature chain.
+# The resolver walks the path checking the signatures, so a favorite is reached
+# reading a few properties per level instead of scanning the whole window.
+# If a signature does not match, because objects have been added or removed
+# before it, the siblings next to the expected position are tried, up to a
+# budget of property reads.
+
+from collections import namedtuple
+from .nodeTable import ROOT_PATH, chainStep, pathStep, favoriteHash
+
+# Signature of an object along a path. It has the fields of a snapshot used by chainStep and favoriteHash.
+Step = namedtuple("Step", ("role", "windowClassName"))
+
+# obj is None if the favorite has not been found; path is the one where it has been found
+Resolution = namedtuple("Resolution", ("obj", "path", "steps", "reads", "moved"))
+
+def pathHash(appName, target, steps, path):
+	"""Favorites hash of the object at path, whose signature is target.
+	steps are the signatures of the objects from the first level down to it.
+	"""
+	chain = "".join([chainStep(Step(*step)) for step in steps])
+	return favoriteHash(appName, target, chain, ROOT_PATH+"".join([pathStep(ordinal) for ordinal in path]))
+
+class PathResolver(object):
+	"""Finds an object from its path and the signatures of the objects along it.
+	window is how many siblings at each side of the expected position are tried when a signature does not match,
+	maxReads the property reads allowed to find one object.
+	"""
+
+	def __init__(self, window=3, maxReads=200):
+		self.window = window
+		self.maxReads = maxReads
+		self.reads = 0
+
+	def resolve(self, root, path, steps, accept=None):
+		"""Returns a Resolution of the object at path from root.
+		An object found out of its path is only returned if accept(obj) is true, when accept is given.
+		"""
+		self.reads = 0
+		path = list(path)
+		steps = [Step(*step) for step in steps]
+		if len(path) != len(steps):
+			raise ValueError("A path of %d levels with %d signatures" % (len(path), len(steps)))
+		found = self._walk(root, path, steps, 0, [], accept)
+		if found is None:
+			return Resolution(None, None, steps, self.reads, False)
+		return Resolution(found[0], found[1], steps, self.reads, found[1] != path)
+
+	def candidates(self, ordinal, count):
+		# Positions among count children to try for ordinal, the expected one first and then the nearest ones
+		if count <= 0:
+			return
+		# If there are less children than before the last one is the nearest
+		center = min(ordinal, count-1)
+		yield center
+		for distance in range(1, self.window+1):
+			for candidate in (center-distance, center+distance):
+				if 0 <= candidate < count:
+					yield candidate
+
+	def _read(self, obj, name):
+		self.reads = self.reads+1
+		return getattr(obj, name)
+
+	def _walk(self, obj, path, steps, level, found, accept):
+		# Depth first search of the rest of the path below obj. Returns (object, path) or None.
+		if level == len(path):
+			if accept is not None and found != path and not accept(obj):
+				return None
+			return obj, found
+		if self.reads >= self.maxReads:
+			return None
+		children = self._read(obj, "children")
+		for candidate in self.candidates(path[level], len(children)):
+			if self.reads >= self.maxReads:
+				return None
+			child = children[candidate]
+			if Step(self._read(child, "role"), self._read(child, "windowClassName")) != steps[level]:
+				continue
+			result = self._walk(child, path, steps, level+1, found+[candidate], accept)
+			if result is not None:
+				return result
+		return None
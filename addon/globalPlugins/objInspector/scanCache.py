@@ -0,0 +1,99 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: cache of scan results
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# The last scans are kept by window so that opening the objects list again on the same
+# window does not walk the whole tree. Entries expire after a time and the least recently
+# used ones are discarded when the cache takes more memory than allowed.
+
+from collections import OrderedDict
+from time import time
+
+def windowKey(obj):
+	# Identifies the window of a foreground object
+	return (obj.windowHandle, obj.appModule.appName, obj.windowClassName)
+
+class CacheEntry(object):
+
+	def __init__(self, result, size):
+		self.result = result
+		self.size = size
+		self.time = time()
+
+	@property
+	def age(self):
+		return time()-self.time
+
+class ScanCache(object):
+	"""Scan results by window key with expiration (ttl, in seconds) and LRU eviction when maxBytes is exceeded.
+	A ttl of 0 disables the cache.
+	"""
+
+	def __init__(self, ttl=60, maxBytes=50*1024*1024):
+		self.ttl = ttl
+		self.maxBytes = maxBytes
+		# Least recently used entries first
+		self._entries = OrderedDict()
+		self.size = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __contains__(self, key):
+		return key in self._entries
+
+	def get(self, key):
+		# Returns the entry of the window or None if there is not a valid one
+		entry = self._entries.get(key)
+		if entry and self.ttl and entry.age <= self.ttl:
+			self._entries.move_to_end(key)
+			self.hits = self.hits+1
+			return entry
+		if entry:
+			self.discard(key)
+		self.misses = self.misses+1
+		return None
+
+	def peek(self, key):
+		# Returns the entry of the window even if it has expired, without counting it as a hit or a miss
+		return self._entries.get(key)
+
+	def put(self, key, result):
+		self.discard(key)
+		if not self.ttl:
+			return()
+		entry = CacheEntry(result, result.table.memorySize())
+		if entry.size > self.maxBytes:
+			return()
+		self._entries[key] = entry
+		self.size = self.size+entry.size
+		while self.size > self.maxBytes:
+			oldKey, oldEntry = self._entries.popitem(last=False)
+			self.size = self.size-oldEntry.size
+			self.evictions = self.evictions+1
+
+	def resize(self, key):
+		# Updates the memory taken by an entry whose result has been modified, keeping its time
+		entry = self._entries.get(key)
+		if not entry:
+			return()
+		size = entry.result.table.memorySize()
+		self.size = self.size+size-entry.size
+		entry.size = size
+		while self.size > self.maxBytes and len(self._entries) > 1:
+			oldKey, oldEntry = self._entries.popitem(last=False)
+			self.size = self.size-oldEntry.size
+			self.evictions = self.evictions+1
+
+	def discard(self, key):
+		entry = self._entries.pop(key, None)
+		if entry:
+			self.size = self.size-entry.size
+
+	def clear(self):
+		self._entries.clear()
+		self.size = 0
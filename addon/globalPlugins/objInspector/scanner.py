@@ -0,0 +1,480 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: traversal engine
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# Walks the tree of objects below the foreground object without recursion.
+# Depth, number of nodes and time can be limited; when a limit is reached the
+# walk stops and the partial result is marked as truncated.
+# A previous complete scan of the same window can be given as reference: the
+# subtrees whose signatures have not changed are copied from it (see merkle).
+
+import controlTypes
+import config
+from collections import namedtuple
+from threading import Lock, Thread
+from time import time, perf_counter
+from array import array
+from .nodeTable import NodeTable, takeSnapshot, makeCaption, favoriteHash, chainStep, pathStep, ROOT_PATH
+from .instrumentation import PropertyProbe, ScanStats, addReads
+from .pruning import PruneRules
+from .merkle import SubtreeReuse
+
+class ScanLimits(object):
+	"""Budgets of a scan. A value of 0 means no limit.
+	maxDepth: levels below the root that will be explored.
+	maxNodes: maximum number of objects in the result.
+	timeLimit: wall-clock seconds the walk can take.
+	documents: drill down into documents.
+	workers: threads that walk the subtrees of the children of the root. 1 means a sequential walk.
+	rules: PruneRules with the objects whose descendants are not walked. By default only documents, if they are not explored.
+	"""
+
+	def __init__(self, maxDepth=0, maxNodes=0, timeLimit=0, documents=False, workers=1, rules=None):
+		self.maxDepth = maxDepth
+		self.maxNodes = maxNodes
+		self.timeLimit = timeLimit
+		self.documents = documents
+		self.workers = workers
+		self.rules = rules if rules is not None else PruneRules(documents=documents)
+
+	@classmethod
+	def fromConfig(cls):
+		# Configuration is read only once per scan
+		conf = config.conf["objInspector"]
+		return cls(
+			maxDepth=conf["maxDepth"],
+			maxNodes=conf["maxNodes"],
+			timeLimit=conf["timeLimit"],
+			documents=conf["documents"],
+			workers=conf["workers"],
+			# Rules that are not valid are rejected by the settings dialog
+			rules=PruneRules.parse(conf["pruneRules"], conf["documents"])[0])
+
+	def walkKey(self):
+		# Limits that decide which objects are walked below the ones found; scans with the same key can share subtrees
+		return (self.maxDepth, self.documents, tuple([str(rule) for rule in self.rules.rules]))
+
+class ScanResult(object):
+	# Reasons why a scan can be truncated
+	DEPTH = "depth"
+	NODES = "nodes"
+	TIME = "time"
+	CANCELLED = "cancelled"
+
+	def __init__(self, table, truncated=None, elapsed=0.0, visited=0, depth=0, speedup=None, fetches=0, fetchesSaved=0, pruned=0, limits=None, reuse=None):
+		# NodeTable with the objects found
+		self.table = table
+		# None if the walk was complete, otherwise one of the reasons above
+		self.truncated = truncated
+		self.elapsed = elapsed
+		# Objects examined, including the ones that are not visible
+		self.visited = visited
+		# Deepest level reached
+		self.depth = depth
+		# In parallel scans, how many times faster than the last complete sequential scan of the same window, in objects per second.
+		# The scanner does not know it, None until it is measured against that scan
+		self.speedup = speedup
+		# Accessibility properties read during the walk and reads avoided thanks to the snapshots
+		self.fetches = fetches
+		self.fetchesSaved = fetchesSaved
+		# Objects added as collapsed placeholders by the pruning rules
+		self.pruned = pruned
+		# ScanLimits of the scan
+		self.limits = limits
+		# merkle.SubtreeReuse with the subtrees copied from the reference scan, None if there was no reference
+		self.reuse = reuse
+
+	def canBeReference(self, limits, appName):
+		# True if the subtrees of this result can be reused by a scan of the same window with limits
+		return self.truncated in (None, self.DEPTH) and self.limits is not None and len(self.table) > 0 \
+		and self.table.appName == appName and self.limits.walkKey() == limits.walkKey()
+
+	def __len__(self):
+		return len(self.table)
+
+# State of a scan in progress. rate is objects visited per second.
+ScanProgress = namedtuple("ScanProgress", ("visited", "found", "depth", "elapsed", "rate"))
+
+def isVisible(location, states):
+	# Consider only objects that are visible on screen
+	return bool(location) and location != (0, 0, 0, 0) and controlTypes.State.INVISIBLE not in states
+
+def snapshotFetches(snapshot):
+	# Property reads done to check the visibility of an object and to take its snapshot
+	return 6 if snapshot.name or snapshot.description else 7
+
+def legacyFetches(snapshot):
+	"""Property reads that were done for the same visible object without snapshots:
+	visibility check (location twice and states), caption (role, name, description and value, some of them twice)
+	and the role, window class and application of the favorites hash.
+	"""
+	count = 3+1+(2 if snapshot.name is not None else 1)+(2 if snapshot.description else 1)+3
+	if not (snapshot.name or snapshot.description):
+		count = count+(2 if snapshot.value else 1)
+	return count
+
+class Scanner(object):
+	"""Explicit stack traversal of the tree of objects.
+	The objects found are added to a NodeTable in the same order as a recursive preorder walk: each object is followed by its descendants.
+	If limits.workers is greater than 1 the subtrees of the children of the root are walked in a pool of threads.
+	The result keeps the same order, but when the items limit is reached the objects kept may differ from the ones of a sequential walk.
+	reference is the ScanResult of a previous scan of the same window whose unchanged subtrees are reused, if it was walked with the same limits.
+	"""
+
+	# Seconds between batches of iterScan. The first one is delivered sooner so that results are shown quickly.
+	firstBatchInterval = 0.1
+	batchInterval = 0.3
+	# Seconds before the first call to onProgress and between the following ones
+	progressDelay = 2.0
+	progressInterval = 3.0
+
+	def __init__(self, limits=None, onProgress=None, stats=None, recorder=None, reference=None):
+		self.limits = limits if limits else ScanLimits.fromConfig()
+		# Called with a ScanProgress from the thread that runs the walk
+		self.onProgress = onProgress
+		# instrumentation.ScanStats filled by iterScan, None to not record them
+		self.stats = stats
+		# recorder.TreeRecorder that writes the properties read, None to not record the tree
+		self.recorder = recorder
+		self.reference = reference
+		self._reuse = None
+		self.cancelled = False
+		self.table = NodeTable()
+		self.result = None
+		self._lock = Lock()
+
+	def cancel(self):
+		# The walk stops before visiting the next object
+		self.cancelled = True
+
+	def scan(self, root):
+		for batch in self.iterScan(root):
+			pass
+		return self.result
+
+	def iterScan(self, root, snapshot=None):
+		"""Generator that walks root, an NVDA object, and its visible descendants.
+		Yields ranges of the rows of self.table added since the previous batch.
+		When it is exhausted the complete ScanResult is in self.result.
+		"""
+		if snapshot is None:
+			snapshot = takeSnapshot(self.recorder.wrap(root) if self.recorder else root)
+		# All the objects of a scan belong to the application of the foreground object
+		self._start(root.appModule.appName)
+		self.table.appName = self._appName
+		rootRow = -1
+		if self.reference and self.reference.canBeReference(self.limits, self._appName):
+			self._reuse = SubtreeReuse(self.reference)
+			rootRow = self._reuse.matchRoot(snapshot)
+		if self.limits.workers > 1:
+			walk = self._parallelWalk(root, snapshot, rootRow)
+		else:
+			walk = self._walk(self.table, root, snapshot, -1, 0, 0, "", None,
+			times=self.stats.nodeTimes if self.stats else None, oldRow=rootRow)
+		for batch in walk:
+			yield batch
+		if self.cancelled:
+			self._truncated = ScanResult.CANCELLED
+		self.result = ScanResult(self.table, self._truncated, time()-self._startTime, self._visited, self._maxDepth, None, self._fetches, self._fetchesSaved, self._pruned,
+		self.limits, self._reuse)
+		if self.stats:
+			self.stats.reuse = self._reuse
+			self.stats.addPhase("walk", self.result.elapsed-self.stats.phases["captions"])
+			self.stats.finish(self.table)
+
+	def scanSubtree(self, obj, snapshot, ordinal, depth, parentChain, parentPath, appName, expand=False):
+		"""Walks again the subtree of an object that was found by a previous scan, sequentially.
+		ordinal, depth and the signature chain and path of its parent are the ones it has in that scan.
+		If expand is True the children of the object are walked even if it matches a pruning rule.
+		Returns a NodeTable whose first row, without parent, is the object.
+		"""
+		self._start(appName)
+		table = NodeTable()
+		table.appName = appName
+		for batch in self._walk(table, obj, snapshot, -1, ordinal, depth, parentChain, parentPath, expand):
+			pass
+		if self.cancelled:
+			self._truncated = ScanResult.CANCELLED
+		self.result = ScanResult(table, self._truncated, time()-self._startTime, self._visited, self._maxDepth, None, self._fetches, self._fetchesSaved, self._pruned, self.limits)
+		return table
+
+	def _start(self, appName):
+		self._appName = appName
+		self._startTime = time()
+		self._deadline = self._startTime+self.limits.timeLimit if self.limits.timeLimit else None
+		self._nextProgress = self._startTime+self.progressDelay
+		self._truncated = None
+		self._found = 0
+		self._visited = 1
+		self._maxDepth = 0
+		self._fetches = 0
+		self._fetchesSaved = 0
+		self._pruned = 0
+
+	def _walk(self, table, root, snapshot, parent, ordinal, rootDepth, parentChain, parentPath, expand=False, times=None, oldRow=-1):
+		"""Adds root and its descendants to table in preorder. Generator of the ranges of rows added.
+		The favorites hash of each object is built from the signature chain and the path of its parent.
+		parentPath is None for the foreground object. If expand is True root is not pruned.
+		times is an array where the seconds spent reading the children of each row are appended, when the scan records statistics.
+		oldRow is the row of root in the reference scan, -1 if it is not there.
+		"""
+		reuse = self._reuse
+		captionsTime = 0.0
+		nextBatch = time()+self.firstBatchInterval
+		batchStart = len(table)
+		# Each entry of the stack is (object, snapshot, parent row, position among its siblings, depth, parent chain, parent path, row in the reference)
+		stack = [(root, snapshot, parent, ordinal, rootDepth, parentChain, parentPath, oldRow)]
+		while stack:
+			if self._mustStop():
+				break
+			now = time()
+			if self.onProgress and now >= self._nextProgress:
+				self._reportProgress(now)
+			if len(table) > batchStart and now >= nextBatch:
+				yield range(batchStart, len(table))
+				batchStart = len(table)
+				nextBatch = time()+self.batchInterval
+			obj, snapshot, parent, ordinal, depth, chain, path, oldRow = stack.pop()
+			if oldRow >= 0 and not (expand and obj is root) and reuse.unchanged(oldRow, obj, snapshot) \
+			and self._copySubtree(table, oldRow, obj, snapshot, parent, depth, times):
+				continue
+			if not self._count(depth):
+				break
+			chain, path = self._signature(snapshot, ordinal, chain, path)
+			if times is None:
+				index = table.add(obj, snapshot, parent, ordinal, hash=favoriteHash(self._appName, snapshot, chain, path))
+			else:
+				start = perf_counter()
+				caption = makeCaption(snapshot)
+				captionsTime = captionsTime+perf_counter()-start
+				index = table.add(obj, snapshot, parent, ordinal, caption, favoriteHash(self._appName, snapshot, chain, path))
+			if not (expand and obj is root) and self._prune(table, index, obj, snapshot):
+				if times is not None:
+					times.append(0.0)
+				continue
+			if times is None:
+				children, table.childCounts[index] = self._visibleChildren(obj, snapshot, depth)
+			else:
+				start = perf_counter()
+				children, table.childCounts[index] = self._visibleChildren(obj, snapshot, depth)
+				times.append(perf_counter()-start)
+			# Reversed so that the first child is the next to be visited
+			for child, childSnapshot, childOrdinal in reversed(children):
+				childRow = reuse.childRow(oldRow, childOrdinal, childSnapshot) if oldRow >= 0 else -1
+				stack.append((child, childSnapshot, index, childOrdinal, depth+1, chain, path, childRow))
+		if captionsTime:
+			with self._lock:
+				self.stats.addPhase("captions", captionsTime)
+		if len(table) > batchStart:
+			yield range(batchStart, len(table))
+
+	def _copySubtree(self, table, row, obj, snapshot, parent, depth, times):
+		"""Adds the rows of the subtree of row in the reference scan to table, with the live objects found checking its signature.
+		obj and snapshot are the ones just taken of its root. Returns False if the items limit does not allow the whole subtree,
+		which is then walked as usual.
+		"""
+		reuse = self._reuse
+		old = reuse.table
+		signatures = reuse.signatures
+		end = signatures.ends[row]
+		with self._lock:
+			if self.limits.maxNodes and self._found+end-row > self.limits.maxNodes:
+				return False
+			self._found = self._found+end-row
+			self._maxDepth = max(self._maxDepth, depth+signatures.heights[row])
+			self._pruned = self._pruned+len([flag for flag in old.flags[row:end] if flag & NodeTable.PRUNED])
+			if signatures.limited[row] and not self._truncated:
+				self._truncated = ScanResult.DEPTH
+		# The root is added with the snapshot just taken, its descendants are copied
+		index = table.add(obj, snapshot, parent, old.ordinals[row], hash=old.hash(row))
+		table.flags[index] = old.flags[row]
+		table.childCounts[index] = old.childCounts[row]
+		rows = table.appendRows(old, row+1, end, index, reuse.liveObjects(row+1, end))
+		reuse.shiftLocations(table, rows)
+		if times is not None:
+			times.extend(array("d", bytes(8*(end-row))))
+		reuse.addReused(end-row)
+		return True
+
+	def _parallelWalk(self, root, snapshot, rootRow=-1):
+		# The root and its children are visited here, the subtrees of the children are walked by the pool.
+		if not self._count(0):
+			return
+		rootChain, rootPath = self._signature(snapshot, 0, "", None)
+		rootIndex = self.table.add(root, snapshot, hash=favoriteHash(self._appName, snapshot, rootChain, rootPath))
+		stats = self.stats
+		if self._prune(self.table, rootIndex, root, snapshot):
+			if stats:
+				stats.nodeTimes.append(0.0)
+			yield range(rootIndex, rootIndex+1)
+			return
+		start = perf_counter()
+		children, self.table.childCounts[rootIndex] = self._visibleChildren(root, snapshot, 0)
+		if stats:
+			stats.nodeTimes.append(perf_counter()-start)
+		yield range(rootIndex, rootIndex+1)
+		if not children:
+			return
+		# Imported here so that loading the add-on does not need it
+		from concurrent.futures import ThreadPoolExecutor
+		def walkSubtree(child):
+			# Each subtree is stored in its own table and merged when the previous ones are complete
+			table = NodeTable()
+			times = array("d") if stats else None
+			obj, snapshot, ordinal = child
+			oldRow = self._reuse.childRow(rootRow, ordinal, snapshot) if rootRow >= 0 else -1
+			for batch in self._walk(table, obj, snapshot, -1, ordinal, 1, rootChain, rootPath, times=times, oldRow=oldRow):
+				pass
+			return table, times
+		with ThreadPoolExecutor(max_workers=self.limits.workers) as pool:
+			futures = [pool.submit(walkSubtree, child) for child in children]
+			try:
+				# Subtrees are delivered in order, as soon as each one and the previous ones are complete
+				for future in futures:
+					table, times = future.result()
+					if times is not None:
+						stats.nodeTimes.extend(times)
+					if len(table):
+						yield self.table.extend(table, rootIndex)
+			except:
+				self.cancel()
+				raise
+
+	def _signature(self, snapshot, ordinal, parentChain, parentPath):
+		# Returns the signature chain and the path of an object from the ones of its parent
+		if parentPath is None:
+			return "", ROOT_PATH
+		return parentChain+chainStep(snapshot), parentPath+pathStep(ordinal)
+
+	def _prune(self, table, index, obj, snapshot):
+		# Marks the row as a collapsed placeholder if a rule matches the object
+		if not self.limits.rules.match(obj, snapshot, self._appName):
+			return False
+		table.flags[index] |= NodeTable.PRUNED
+		with self._lock:
+			self._pruned = self._pruned+1
+		return True
+
+	def _probe(self, obj, reads):
+		# Wraps obj so that its properties are recorded and counted
+		if self.recorder:
+			obj = self.recorder.wrap(obj)
+		if self.stats:
+			obj = PropertyProbe(obj, reads)
+		return obj
+
+	def _visibleChildren(self, obj, snapshot, depth):
+		# Returns a list of (object, snapshot, position) with the visible children that must be explored and the count of all the children, -1 if they are not explored
+		stats = self.stats
+		probing = stats or self.recorder
+		if probing:
+			# Properties are read through probes that count, time or record them
+			reads = {}
+			histogram = [0]*ScanStats.bucketCount
+			obj = self._probe(obj, reads)
+		limits = self.limits
+		if limits.maxDepth and depth >= limits.maxDepth:
+			if obj.childCount:
+				with self._lock:
+					if not self._truncated:
+						self._truncated = ScanResult.DEPTH
+			return [], -1
+		children = []
+		count = 0
+		visited = 0
+		fetches = 0
+		saved = 0
+		for index, child in enumerate(obj.children):
+			count = count+1
+			if self.cancelled:
+				break
+			visited = visited+1
+			if probing:
+				start = perf_counter()
+				node = child
+				child = self._probe(child, reads)
+			location = child.location
+			if not location or location == (0, 0, 0, 0):
+				# Before snapshots location was read again when it was not empty
+				fetches = fetches+1
+				saved = saved+(1 if location else 0)
+			else:
+				states = child.states
+				if controlTypes.State.INVISIBLE in states:
+					fetches = fetches+2
+					saved = saved+1
+				else:
+					snapshot = takeSnapshot(child, location, states)
+					fetches = fetches+snapshotFetches(snapshot)
+					saved = saved+legacyFetches(snapshot)-snapshotFetches(snapshot)
+					children.append((node if probing else child, snapshot, index))
+			if stats:
+				histogram[ScanStats.bucket(perf_counter()-start)] += 1
+		with self._lock:
+			self._visited = self._visited+visited
+			self._fetches = self._fetches+fetches
+			self._fetchesSaved = self._fetchesSaved+saved
+			if stats:
+				addReads(stats.reads, reads)
+				stats.addLatencies(histogram)
+		return children, count
+
+	def _count(self, depth):
+		# Adds an object to the count of found objects if the items limit allows it
+		with self._lock:
+			if self.limits.maxNodes and self._found >= self.limits.maxNodes:
+				self._truncated = ScanResult.NODES
+				return False
+			self._found = self._found+1
+			if depth > self._maxDepth:
+				self._maxDepth = depth
+		return True
+
+	def _truncate(self, reason):
+		# A limit that stops the walk takes precedence over the depth limit
+		with self._lock:
+			if not self._truncated or self._truncated == ScanResult.DEPTH:
+				self._truncated = reason
+
+	def _mustStop(self):
+		if self.cancelled:
+			self._truncated = ScanResult.CANCELLED
+		elif self._deadline and time() > self._deadline:
+			self._truncate(ScanResult.TIME)
+		return self._truncated in (ScanResult.NODES, ScanResult.TIME, ScanResult.CANCELLED)
+
+	def _reportProgress(self, now):
+		with self._lock:
+			# Another thread may have just reported it
+			if now < self._nextProgress:
+				return
+			self._nextProgress = now+self.progressInterval
+		elapsed = now-self._startTime
+		self.onProgress(ScanProgress(self._visited, self._found, self._maxDepth, elapsed, self._visited/elapsed))
+
+class ScanJob(Thread):
+	"""Runs a scan in a background thread.
+	onBatch(rows), onFinish(result) and onError(exception) are called from this thread. rows is a range of scanner.table.
+	"""
+
+	def __init__(self, scanner, root, onBatch, onFinish, onError):
+		Thread.__init__(self)
+		self.daemon = True
+		self.scanner = scanner
+		self.root = root
+		self.onBatch = onBatch
+		self.onFinish = onFinish
+		self.onError = onError
+
+	def run(self):
+		try:
+			for batch in self.scanner.iterScan(self.root):
+				self.onBatch(batch)
+		except Exception as inst:
+			self.onError(inst)
+			return()
+		self.onFinish(self.scanner.result)
+
+	def cancel(self):
+		self.scanner.cancel()
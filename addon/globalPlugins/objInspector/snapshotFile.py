@@ -0,0 +1,299 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: snapshot files of the objects found by a scan
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# A snapshot keeps a scan after the window has changed, for offline analysis or
+# to attach it to a bug report. Objects are appended to the file one by one as
+# they are written, and an index is added at the end when it is closed:
+#   magic, length and JSON of the header {"version", "appName", "title", "time"}
+#   one record per object:
+#     parent, ordinal, role, flags, favorites hash, location, count of states (struct RECORD)
+#     codes of the states
+#     caption, name, description, value and window class name, each one with its length in bytes (-1 for None)
+#   index: columns with the offset of each record, parents, ordinals, flags and hashes
+#   trailer JSON with the names of the roles and states found and the paths of the rows without parent
+#   footer: offsets of the index and of the trailer, count of records and the end magic
+# Roles and states are written by code and read back by name, so that a snapshot can be opened
+# with another version of NVDA. The loader maps the file into memory and reads a record only
+# when its object is shown; if the file was not closed the index is rebuilt from the records.
+
+import controlTypes
+from .compat import enumNames
+from .nodeTable import NodeTable, NodeSnapshot, OBJECT, NO_HASH, ROOT_PATH, pathStep
+from array import array
+import json
+import mmap
+import struct
+from time import time
+
+FORMAT_VERSION = 1
+MAGIC = b"OISNAP\x00\x01"
+END_MAGIC = b"OISNAPIX"
+LENGTH = struct.Struct("<i")
+STATE = struct.Struct("<i")
+RECORD = struct.Struct("<iiiB16s4iH")
+FOOTER = struct.Struct("<QQQ8s")
+
+def encodeString(string):
+	if string is None:
+		return LENGTH.pack(-1)
+	data = string.encode("utf-8")
+	return LENGTH.pack(len(data))+data
+
+class SnapshotWriter(object):
+	"""Appends the objects of a scan to a snapshot file. Rows must be appended after their parent.
+	Only the columns of the index are kept in memory until the file is closed.
+	"""
+
+	def __init__(self, path, appName="", title=""):
+		self.path = path
+		self._file = open(path, "wb")
+		header = json.dumps({"version": FORMAT_VERSION, "appName": appName, "title": title, "time": time()}).encode("utf-8")
+		self._file.write(MAGIC+LENGTH.pack(len(header))+header)
+		self._offset = len(MAGIC)+LENGTH.size+len(header)
+		self.offsets = array("Q")
+		self.parents = array("i")
+		self.ordinals = array("i")
+		self.flags = bytearray()
+		self.hashes = bytearray()
+		self._roles = set()
+		self._states = set()
+
+	def __len__(self):
+		return len(self.offsets)
+
+	def append(self, snapshot, caption, parent=-1, ordinal=0, flags=0, hash=None):
+		# Writes an object and returns its row
+		states = sorted([int(state) for state in snapshot.states])
+		hash = hash if hash else NO_HASH
+		data = RECORD.pack(parent, ordinal, int(snapshot.role), flags, hash,
+		*(snapshot.location if snapshot.location else (0, 0, 0, 0)), len(states)) \
+		+b"".join([STATE.pack(state) for state in states]) \
+		+b"".join([encodeString(string) for string in (caption, snapshot.name, snapshot.description, snapshot.value, snapshot.windowClassName)])
+		self._file.write(data)
+		self.offsets.append(self._offset)
+		self._offset = self._offset+len(data)
+		self.parents.append(parent)
+		self.ordinals.append(ordinal)
+		self.flags.append(flags)
+		self.hashes.extend(hash)
+		self._roles.add(snapshot.role)
+		self._states.update(snapshot.states)
+		return len(self.offsets)-1
+
+	def close(self, rootPaths=None):
+		# Writes the index. rootPaths has the ancestry of the rows without parent by row.
+		if not self._file:
+			return
+		indexOffset = self._offset
+		for column in (self.offsets, self.parents, self.ordinals):
+			self._file.write(column.tobytes())
+		self._file.write(bytes(self.flags))
+		self._file.write(bytes(self.hashes))
+		trailerOffset = indexOffset+len(self.offsets)*(8+4+4+1+16)
+		roleNames = enumNames(controlTypes.Role)
+		stateNames = enumNames(controlTypes.State)
+		trailer = {
+			"roles": dict([(str(int(role)), roleNames.get(role, str(role))) for role in self._roles]),
+			"states": dict([(str(int(state)), stateNames.get(state, str(state))) for state in self._states]),
+			"rootPaths": dict([(str(row), list(path)) for row, path in (rootPaths or {}).items()]),
+		}
+		self._file.write(json.dumps(trailer).encode("utf-8"))
+		self._file.write(FOOTER.pack(indexOffset, len(self.offsets), trailerOffset, END_MAGIC))
+		self._file.close()
+		self._file = None
+
+def exportTable(table, path, title=""):
+	"""Writes the rows of a NodeTable to a snapshot file and returns how many have been written."""
+	writer = SnapshotWriter(path, table.appName or "", title)
+	try:
+		for index in range(len(table)):
+			writer.append(table.snapshot(index), table.caption(index), table.parents[index], table.ordinals[index],
+			table.flags[index], table.hash(index))
+	finally:
+		writer.close(table.rootPaths)
+	return len(writer)
+
+class SnapshotTable(NodeTable):
+	"""NodeTable read from a snapshot file. Rows have no live objects and the file is read only when
+	the properties of a row are needed; the columns used to navigate the tree are views of the mapped file.
+	Rows can not be added. Call close to release the file.
+	"""
+
+	live = False
+
+	def __init__(self, path):
+		super(SnapshotTable, self).__init__()
+		self.path = path
+		self._file = open(path, "rb")
+		try:
+			self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:
+			self._file.close()
+			raise ValueError("%s is empty" % path)
+		self._views = []
+		try:
+			self._open()
+		except Exception:
+			self.close()
+			raise
+
+	def _open(self):
+		data = self._map
+		if data[:len(MAGIC)] != MAGIC:
+			raise ValueError("%s is not an objInspector snapshot" % self.path)
+		length = LENGTH.unpack_from(data, len(MAGIC))[0]
+		start = len(MAGIC)+LENGTH.size
+		header = json.loads(data[start:start+length].decode("utf-8"))
+		if header.get("version") != FORMAT_VERSION:
+			raise ValueError("Unknown snapshot version %s" % header.get("version"))
+		self.appName = header.get("appName")
+		self.title = header.get("title", "")
+		self.time = header.get("time")
+		self.complete = len(data) >= start+length+FOOTER.size and data[-len(END_MAGIC):] == END_MAGIC
+		if self.complete:
+			indexOffset, count, trailerOffset, magic = FOOTER.unpack_from(data, len(data)-FOOTER.size)
+			view = memoryview(data)
+			self._views.append(view)
+			columns = []
+			offset = indexOffset
+			for format, size in (("Q", 8), ("i", 4), ("i", 4)):
+				columns.append(view[offset:offset+size*count].cast(format))
+				offset = offset+size*count
+			self._views.extend(columns)
+			self.offsets, self.parents, self.ordinals = columns
+			self.flags = bytearray(data[offset:offset+count])
+			offset = offset+count
+			self.hashes = view[offset:offset+16*count]
+			self._views.append(self.hashes)
+			trailer = json.loads(data[trailerOffset:len(data)-FOOTER.size].decode("utf-8"))
+		else:
+			# The file was not closed: the index is rebuilt reading all the records
+			self._recover(start+length)
+			trailer = {}
+		self.objs = [None]*len(self.offsets)
+		self.rootPaths = dict([(int(row), path) for row, path in trailer.get("rootPaths", {}).items()])
+		self._roleCodes = self._decodeNames(controlTypes.Role, trailer.get("roles", {}))
+		self._stateCodes = self._decodeNames(controlTypes.State, trailer.get("states", {}))
+
+	@staticmethod
+	def _decodeNames(enum, names):
+		# Values of this version of NVDA by the codes of the file; codes not found are used as they are
+		return dict([(int(code), getattr(enum, name, int(code))) for code, name in names.items()])
+
+	def _recover(self, offset):
+		data = self._map
+		self.offsets = array("Q")
+		self.parents = array("i")
+		self.ordinals = array("i")
+		self.flags = bytearray()
+		self.hashes = bytearray()
+		while offset+RECORD.size <= len(data):
+			fields = RECORD.unpack_from(data, offset)
+			end = self._skipStrings(offset+RECORD.size+STATE.size*fields[-1], 5)
+			if end is None or end > len(data):
+				# The last record was not completely written
+				break
+			self.offsets.append(offset)
+			self.parents.append(fields[0])
+			self.ordinals.append(fields[1])
+			self.flags.append(fields[3])
+			self.hashes.extend(fields[4])
+			offset = end
+
+	def _skipStrings(self, offset, count):
+		data = self._map
+		for i in range(count):
+			if offset+LENGTH.size > len(data):
+				return None
+			length = LENGTH.unpack_from(data, offset)[0]
+			offset = offset+LENGTH.size+max(length, 0)
+		return offset
+
+	def _readStrings(self, offset, count):
+		data = self._map
+		strings = []
+		for i in range(count):
+			length = LENGTH.unpack_from(data, offset)[0]
+			offset = offset+LENGTH.size
+			if length < 0:
+				strings.append(None)
+			else:
+				strings.append(data[offset:offset+length].decode("utf-8"))
+				offset = offset+length
+		return strings
+
+	def close(self):
+		# Views of the map must be released before closing it
+		for view in reversed(self._views):
+			view.release()
+		self._views = []
+		if self._map:
+			self._map.close()
+			self._map = None
+		self._file.close()
+
+	def add(self, *args, **kwargs):
+		raise TypeError("Rows can not be added to a snapshot")
+
+	def splice(self, *args, **kwargs):
+		raise TypeError("Rows can not be added to a snapshot")
+
+	def snapshot(self, index):
+		offset = self.offsets[index]
+		fields = RECORD.unpack_from(self._map, offset)
+		role = fields[2]
+		location = fields[5:9]
+		count = fields[9]
+		offset = offset+RECORD.size
+		states = frozenset([self._stateCodes.get(code, code) for code in struct.unpack_from("<%di" % count, self._map, offset)])
+		caption, name, description, value, windowClassName = self._readStrings(offset+STATE.size*count, 5)
+		return NodeSnapshot(self._roleCodes.get(role, role), name, description, value, states,
+		location if location != (0, 0, 0, 0) else None, windowClassName)
+
+	def location(self, index):
+		location = RECORD.unpack_from(self._map, self.offsets[index])[5:9]
+		return location if location != (0, 0, 0, 0) else None
+
+	def caption(self, index):
+		offset = self.offsets[index]
+		count = RECORD.unpack_from(self._map, offset)[-1]
+		return self._readStrings(offset+RECORD.size+STATE.size*count, 1)[0]
+
+	def _signatureStep(self, index):
+		# Role code as it was written, the one of the favorites hash of the row
+		offset = self.offsets[index]
+		fields = RECORD.unpack_from(self._map, offset)
+		return fields[2], self._readStrings(self._skipStrings(offset+RECORD.size+STATE.size*fields[9], 4), 1)[0]
+
+	def steps(self, index):
+		return [self._signatureStep(i) for i in self._pathRows(index)]
+
+	def signature(self, index):
+		rows = self._pathRows(index)
+		chain = "".join([" %d %s\n" % self._signatureStep(i) for i in rows])
+		return chain, ROOT_PATH+"".join([pathStep(self.ordinals[i]) for i in rows])
+
+	def memorySize(self):
+		# Only the columns copied out of the file are in memory
+		return len(self.flags)+len(self.objs)*8
+
+class SnapshotObjects(object):
+	"""Sequence of the objects of a SnapshotTable. Views of the rows are created when they are requested,
+	so the list of the dialog does not hold an object per row.
+	"""
+
+	def __init__(self, table):
+		self.table = table
+
+	def __len__(self):
+		return len(self.table)
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [OBJECT(table=self.table, index=i) for i in range(*index.indices(len(self.table)))]
+		return self.table[index]
+
+	def __iter__(self):
+		return iter(self.table)
@@ -0,0 +1,198 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: index of the locations of the objects found by a scan
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# The locations read by the scan are put in grids of square cells. Each object
+# goes to the finest grid where it covers a few cells, so small objects are in
+# the grid of small cells and windows and panes in the coarser ones; the very
+# large ones are kept apart. The objects under a point are found looking at one
+# cell per grid, the ones inside a rectangle at the cells it covers where they
+# have their top left corner, and the nearest ones searching the cells in rings
+# around the point until the rings are farther than the objects already found. The index does not read the live
+# objects: it answers from the table without scanning again.
+
+from array import array
+import heapq
+
+class SpatialIndex(object):
+	"""Grid index of the locations of the rows of a NodeTable. Rows without location are not indexed.
+	Rows added to the table later are indexed by update; rows moved by a splice are not, the index must be built again.
+	Results are rows of the table.
+	"""
+
+	# Sides of the cells of each grid, in pixels
+	cellSizes = (32, 256, 2048)
+	# An object goes to the first grid where it covers at most this number of cells
+	maxCells = 16
+
+	def __init__(self, table, stop=None):
+		self.table = table
+		# Cells of each grid by (column, row), with the rows of the objects that overlap them
+		self.grids = [{} for size in self.cellSizes]
+		# Cells of each grid with the rows of the objects whose top left corner is in them, each row in only one cell
+		self.origins = [{} for size in self.cellSizes]
+		# Columns and rows of the cells used by each grid, to know when a ring search can stop: [left, top, right, bottom]
+		self._extents = [None]*len(self.cellSizes)
+		self.large = []
+		# Edges of the rectangle of each row, right and bottom excluded
+		self.lefts = array("i")
+		self.tops = array("i")
+		self.rights = array("i")
+		self.bottoms = array("i")
+		self.update(stop)
+
+	def __len__(self):
+		return len(self.lefts)
+
+	def update(self, stop=None):
+		"""Indexes the rows added to the table since the index was built or updated, up to stop.
+		While a scan is adding rows, stop should be the number of rows already delivered, whose locations are written.
+		"""
+		table = self.table
+		for row in range(len(self.lefts), len(table) if stop is None else stop):
+			location = table.location(row)
+			if location is None:
+				self.lefts.append(0)
+				self.tops.append(0)
+				self.rights.append(0)
+				self.bottoms.append(0)
+				continue
+			left, top, width, height = location
+			# Objects without width or height are indexed as one pixel
+			right = left+max(width, 1)
+			bottom = top+max(height, 1)
+			self.lefts.append(left)
+			self.tops.append(top)
+			self.rights.append(right)
+			self.bottoms.append(bottom)
+			for level, size in enumerate(self.cellSizes):
+				columns = range(left//size, (right-1)//size+1)
+				rows = range(top//size, (bottom-1)//size+1)
+				if len(columns)*len(rows) <= self.maxCells:
+					self._insert(level, row, columns, rows)
+					break
+			else:
+				self.large.append(row)
+
+	def _insert(self, level, row, columns, rows):
+		grid = self.grids[level]
+		for column in columns:
+			for cellRow in rows:
+				grid.setdefault((column, cellRow), []).append(row)
+		self.origins[level].setdefault((columns[0], rows[0]), []).append(row)
+		extent = self._extents[level]
+		if extent is None:
+			self._extents[level] = [columns[0], rows[0], columns[-1], rows[-1]]
+		else:
+			extent[0] = min(extent[0], columns[0])
+			extent[1] = min(extent[1], rows[0])
+			extent[2] = max(extent[2], columns[-1])
+			extent[3] = max(extent[3], rows[-1])
+
+	def contains(self, row, x, y):
+		return self.lefts[row] <= x < self.rights[row] and self.tops[row] <= y < self.bottoms[row] and self.rights[row] > self.lefts[row]
+
+	def distance(self, row, x, y):
+		# Squared distance from the point to the rectangle of a row, 0 if the point is inside it
+		dx = max(self.lefts[row]-x, 0, x-self.rights[row]+1)
+		dy = max(self.tops[row]-y, 0, y-self.bottoms[row]+1)
+		return dx*dx+dy*dy
+
+	def at(self, x, y):
+		# Rows of the objects under a point, in the order of the table: each object is followed by the ones inside it
+		found = [row for row in self.large if self.contains(row, x, y)]
+		for level, size in enumerate(self.cellSizes):
+			for row in self.grids[level].get((x//size, y//size), ()):
+				if self.contains(row, x, y):
+					found.append(row)
+		found.sort()
+		return found
+
+	def inside(self, left, top, right, bottom):
+		# Rows of the objects whose rectangle is inside the rectangle from (left, top) to (right, bottom), excluded, in the order of the table
+		found = [row for row in self.large if self._within(row, left, top, right, bottom)]
+		for level, size in enumerate(self.cellSizes):
+			# An object inside the rectangle has its top left corner inside too, so only the origins are checked
+			grid = self.origins[level]
+			extent = self._extents[level]
+			if extent is None:
+				continue
+			# Only the cells that have objects are visited
+			columns = range(max(left//size, extent[0]), min((right-1)//size, extent[2])+1)
+			rows = range(max(top//size, extent[1]), min((bottom-1)//size, extent[3])+1)
+			if len(columns)*len(rows) > len(grid):
+				cells = [cell for cell in grid if cell[0] in columns and cell[1] in rows]
+			else:
+				cells = [(column, cellRow) for column in columns for cellRow in rows]
+			for cell in cells:
+				found.extend([row for row in grid.get(cell, ()) if self._within(row, left, top, right, bottom)])
+		found.sort()
+		return found
+
+	def _within(self, row, left, top, right, bottom):
+		return self.rights[row] > self.lefts[row] and left <= self.lefts[row] and self.rights[row] <= right \
+		and top <= self.tops[row] and self.bottoms[row] <= bottom
+
+	def nearest(self, x, y, accept=None, count=1):
+		"""Rows of the count objects nearest to a point, nearest first. accept(row) selects the objects that can be returned.
+		Objects with the point inside are at distance 0; among them, the smallest ones come first.
+		"""
+		# Heap of (-distance, -area, -row) with the best ones found
+		best = []
+		seen = set()
+		def consider(row):
+			if row in seen:
+				return
+			seen.add(row)
+			item = (-self.distance(row, x, y), -(self.rights[row]-self.lefts[row])*(self.bottoms[row]-self.tops[row]), -row)
+			# accept may be slow, it is not called for the objects farther than the ones found
+			if len(best) == count and item <= best[0]:
+				return
+			if accept is not None and not accept(row):
+				return
+			if len(best) < count:
+				heapq.heappush(best, item)
+			elif item > best[0]:
+				heapq.heapreplace(best, item)
+		for row in self.large:
+			consider(row)
+		for level, size in enumerate(self.cellSizes):
+			extent = self._extents[level]
+			if extent is None:
+				continue
+			grid = self.grids[level]
+			column = min(max(x//size, extent[0]), extent[2])
+			cellRow = min(max(y//size, extent[1]), extent[3])
+			rings = max(column-extent[0], extent[2]-column, cellRow-extent[1], extent[3]-cellRow)
+			for ring in range(rings+1):
+				# Objects of the cells of this ring are at least this far
+				bound = max(ring-1, 0)*size
+				if len(best) == count and bound*bound > -best[0][0]:
+					break
+				for cell in self._ring(column, cellRow, ring):
+					rows = grid.get(cell)
+					if not rows:
+						continue
+					if len(best) == count:
+						# Cells farther than the objects found are skipped
+						dx = max(cell[0]*size-x, 0, x-cell[0]*size-size+1)
+						dy = max(cell[1]*size-y, 0, y-cell[1]*size-size+1)
+						if dx*dx+dy*dy > -best[0][0]:
+							continue
+					for row in rows:
+						consider(row)
+		best.sort(reverse=True)
+		return [-item[2] for item in best]
+
+	def _ring(self, column, row, ring):
+		# Cells at a distance of ring cells from (column, row), counted as the maximum of both axes
+		if ring == 0:
+			yield (column, row)
+			return
+		for dx in range(-ring, ring+1):
+			yield (column+dx, row-ring)
+			yield (column+dx, row+ring)
+		for dy in range(-ring+1, ring):
+			yield (column-ring, row+dy)
+			yield (column+ring, row+dy)
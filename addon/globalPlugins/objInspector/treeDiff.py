@@ -0,0 +1,243 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector: differences between two scans of the same window
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# Objects of the two scans are matched from the root down. The children of two
+# matched objects are matched by role, window class name and name, and then by
+# role and window class name only, in the order they were found. Objects left
+# without pair are matched across the whole tree by role, window class name and
+# caption: they have been moved to another parent. Each object is visited a
+# constant number of times, so the time grows with the size of the trees.
+# Matched children whose order among their siblings has changed are moved too;
+# matched objects with other properties are changed.
+
+import addonHandler
+from .nodeTable import NodeTable
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+addonHandler.initTranslation()
+
+# Kinds of change
+UNCHANGED = 0
+ADDED = 1
+REMOVED = 2
+MOVED = 3
+CHANGED = 4
+
+def kindLabels():
+	# Translated names of the kinds of change by kind
+	return {
+		ADDED: _("added"),
+		REMOVED: _("removed"),
+		MOVED: _("moved"),
+		CHANGED: _("changed"),
+	}
+
+def fieldLabels():
+	return {
+		"name": _("name"),
+		"description": _("description"),
+		"value": _("value"),
+		"states": _("states"),
+		"location": _("location"),
+	}
+
+def stableRows(pairs):
+	"""Returns the set of the new rows of pairs (oldPosition, newRow), in the order of the new rows,
+	that keep their order: a longest increasing subsequence of the old positions.
+	"""
+	tails = []
+	tailIndexes = []
+	previous = [-1]*len(pairs)
+	for i, (position, row) in enumerate(pairs):
+		j = bisect_left(tails, position)
+		if j == len(tails):
+			tails.append(position)
+			tailIndexes.append(i)
+		else:
+			tails[j] = position
+			tailIndexes[j] = i
+		previous[i] = tailIndexes[j-1] if j else -1
+	stable = set()
+	i = tailIndexes[-1] if tailIndexes else -1
+	while i >= 0:
+		stable.add(pairs[i][1])
+		i = previous[i]
+	return stable
+
+class TreeDiff(object):
+	"""Differences between the NodeTables old and new, which can be scans or snapshots.
+	location also reports objects that have only changed their location.
+	"""
+
+	FIELDS = ("name", "description", "value", "states", "location")
+
+	def __init__(self, old, new, location=False):
+		self.old = old
+		self.new = new
+		self.fields = self.FIELDS if location else self.FIELDS[:-1]
+		# Row of the other table matched with each row, -1 if none
+		self.oldOf = array("i", [-1])*len(new)
+		self.newOf = array("i", [-1])*len(old)
+		self.moved = bytearray(len(new))
+		self._oldSnapshots = {}
+		self._newSnapshots = {}
+		self.entries = []
+		self.counts = dict([(kind, 0) for kind in (ADDED, REMOVED, MOVED, CHANGED)])
+		if len(old) and len(new):
+			self._match()
+		self._collect()
+
+	def _snapshot(self, table, cache, row):
+		snapshot = cache.get(row)
+		if snapshot is None:
+			snapshot = cache[row] = table.snapshot(row)
+		return snapshot
+
+	def _pair(self, oldRow, newRow, moved=False):
+		self.oldOf[newRow] = oldRow
+		self.newOf[oldRow] = newRow
+		if moved:
+			self.moved[newRow] = 1
+
+	def _match(self):
+		old = self.old
+		new = self.new
+		oldRoots = [row for row in range(len(old)) if old.parents[row] < 0]
+		queue = deque()
+		self._matchRows(old.siblings(oldRoots[0]) if oldRoots else [], new.siblings(0), queue)
+		self._walk(queue)
+		# Objects left are looked for in the whole tree
+		candidates = {}
+		for row in range(len(old)):
+			if self.newOf[row] < 0:
+				candidates.setdefault(self._key(old, self._oldSnapshots, row, True), deque()).append(row)
+		for row in range(len(new)):
+			if self.oldOf[row] >= 0:
+				continue
+			rows = candidates.get(self._key(new, self._newSnapshots, row, True))
+			while rows:
+				oldRow = rows.popleft()
+				if self.newOf[oldRow] < 0:
+					self._pair(oldRow, row, True)
+					queue.append((oldRow, row))
+					self._walk(queue)
+					break
+
+	def _walk(self, queue):
+		while queue:
+			oldRow, newRow = queue.popleft()
+			self._matchRows(self.old.children(oldRow), self.new.children(newRow), queue)
+
+	def _key(self, table, cache, row, caption=False):
+		snapshot = self._snapshot(table, cache, row)
+		if caption:
+			return (int(snapshot.role), snapshot.windowClassName, table.caption(row))
+		return (int(snapshot.role), snapshot.windowClassName)
+
+	def _matchRows(self, oldRows, newRows, queue):
+		# Matches two lists of siblings and adds the pairs to queue
+		if not oldRows or not newRows:
+			return
+		pairs = []
+		for withName in (True, False):
+			buckets = {}
+			for position, row in enumerate(oldRows):
+				if self.newOf[row] < 0:
+					key = self._key(self.old, self._oldSnapshots, row)
+					if withName:
+						key = key+(self._oldSnapshots[row].name,)
+					buckets.setdefault(key, deque()).append((position, row))
+			if not buckets:
+				break
+			for row in newRows:
+				if self.oldOf[row] >= 0:
+					continue
+				key = self._key(self.new, self._newSnapshots, row)
+				if withName:
+					key = key+(self._newSnapshots[row].name,)
+				rows = buckets.get(key)
+				if rows:
+					position, oldRow = rows.popleft()
+					self._pair(oldRow, row)
+					pairs.append((position, row))
+		if not pairs:
+			return
+		# Pairs in the order of the new rows; the ones out of the longest sequence in the old order have been moved
+		order = dict([(row, i) for i, row in enumerate(newRows)])
+		pairs.sort(key=lambda pair: order[pair[1]])
+		stable = stableRows(pairs)
+		for position, row in pairs:
+			if row not in stable:
+				self.moved[row] = 1
+			queue.append((oldRows[position], row))
+
+	def changedFields(self, oldRow, newRow):
+		oldSnapshot = self._snapshot(self.old, self._oldSnapshots, oldRow)
+		newSnapshot = self._snapshot(self.new, self._newSnapshots, newRow)
+		return [field for field in self.fields if getattr(oldSnapshot, field) != getattr(newSnapshot, field)]
+
+	def _collect(self):
+		# entries are (kind, table, row, changed fields) in the order of the new scan, then the removed objects
+		entries = self.entries
+		for row in range(len(self.new)):
+			oldRow = self.oldOf[row]
+			if oldRow < 0:
+				entries.append((ADDED, self.new, row, []))
+				continue
+			fields = self.changedFields(oldRow, row)
+			if self.moved[row]:
+				entries.append((MOVED, self.new, row, fields))
+			elif fields:
+				entries.append((CHANGED, self.new, row, fields))
+		for row in range(len(self.old)):
+			if self.newOf[row] < 0:
+				entries.append((REMOVED, self.old, row, []))
+		for entry in entries:
+			self.counts[entry[0]] = self.counts[entry[0]]+1
+		self._oldSnapshots = {}
+		self._newSnapshots = {}
+
+	def summary(self):
+		labels = kindLabels()
+		return ", ".join(["%d %s" % (self.counts[kind], labels[kind]) for kind in (ADDED, REMOVED, MOVED, CHANGED)])
+
+	def table(self):
+		"""Returns a DiffTable with a row for each entry, to be shown in the objects window."""
+		return DiffTable(self)
+
+class DiffTable(NodeTable):
+	"""Rows of the differences of a TreeDiff. The caption of each row starts with its kind of change.
+	kinds has the kind of each row and source(index) gives the object of the scan it comes from.
+	Removed objects have no live object.
+	"""
+
+	def __init__(self, diff):
+		super(DiffTable, self).__init__()
+		self.live = diff.new.live
+		self.appName = diff.new.appName
+		self.sources = (diff.old, diff.new)
+		self.kinds = bytearray()
+		self.sourceRows = array("i")
+		self._sourceTables = bytearray()
+		labels = kindLabels()
+		names = fieldLabels()
+		for kind, table, row, fields in diff.entries:
+			caption = "%s: %s" % (labels[kind], table.caption(row))
+			if fields:
+				caption = "%s (%s)" % (caption, ", ".join([names[field] for field in fields]))
+			obj = table.objs[row] if kind != REMOVED else None
+			index = self.add(obj, table.snapshot(row), caption=caption, hash=table.hash(row))
+			# Rows have no parent in this table, their path is the one of the scan
+			self.rootPaths[index] = table.ancestry(row)
+			self.flags[index] = table.flags[row] & NodeTable.FAVORITE
+			self.kinds.append(kind)
+			self.sourceRows.append(row)
+			self._sourceTables.append(table is diff.new)
+
+	def source(self, index):
+		# Object of the old or the new scan of a row
+		return self.sources[self._sourceTables[index]][self.sourceRows[index]]
@@ -0,0 +1,156 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector benchmarks: synthetic trees of objects
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# FakeObject has the properties of an NVDAObject that the add-on reads. Each read
+# can wait a configurable time to imitate the cost of the accessibility calls of a real
+# application. Trees are generated with a seed so that runs are comparable.
+
+import random
+from time import perf_counter
+from controlTypes import Role, State
+
+# Properties that pay the latency when they are read
+PROPERTIES = ("role", "name", "description", "value", "states", "location", "windowClassName", "children", "childCount", "parent")
+
+class FakeApp(object):
+	appName = "benchmark"
+	productName = "benchmark"
+
+class FakeObject(object):
+	"""Object of a synthetic tree. latency is a dictionary of seconds by property name shared by the whole tree;
+	it is spent in a busy loop because sleep is not precise for microseconds.
+	"""
+
+	appModule = FakeApp()
+	windowHandle = 1
+	processID = 1
+
+	def __init__(self, tree, role, name=None, description=None, value=None, states=frozenset(), location=(0, 0, 10, 10), windowClassName="Window"):
+		self._tree = tree
+		self._role = role
+		self._name = name
+		self._description = description
+		self._value = value
+		self._states = states
+		self._location = location
+		self._windowClassName = windowClassName
+		self._children = []
+		self._parent = None
+
+	def _wait(self, name):
+		latency = self._tree.latency.get(name)
+		if latency:
+			end = perf_counter()+latency
+			while perf_counter() < end:
+				pass
+		self._tree.reads = self._tree.reads+1
+
+	def __repr__(self):
+		return "<FakeObject %s %s>" % (self._role.name, self._name)
+
+def makeProperty(name):
+	attribute = "_"+name
+	def getter(self):
+		self._wait(name)
+		return getattr(self, attribute)
+	return property(getter)
+
+for name in ("role", "name", "description", "value", "states", "location", "windowClassName"):
+	setattr(FakeObject, name, makeProperty(name))
+
+def getChildren(self):
+	self._wait("children")
+	return list(self._children)
+FakeObject.children = property(getChildren)
+
+def getChildCount(self):
+	self._wait("childCount")
+	return len(self._children)
+FakeObject.childCount = property(getChildCount)
+
+def getParent(self):
+	self._wait("parent")
+	return self._parent
+FakeObject.parent = property(getParent)
+
+ROLES = (Role.BUTTON, Role.LISTITEM, Role.STATICTEXT, Role.EDITABLETEXT, Role.CHECKBOX, Role.LINK,
+Role.PANE, Role.GROUPING, Role.LIST, Role.TABLECELL, Role.MENUITEM, Role.GRAPHIC)
+CONTAINER_ROLES = (Role.PANE, Role.GROUPING, Role.LIST, Role.TABLE, Role.TREEVIEW, Role.TOOLBAR)
+WINDOW_CLASSES = ("Window", "Button", "Static", "Edit", "SysListView32", "Chrome_RenderWidgetHostHWND")
+WORDS = ("open", "save", "file", "edit", "view", "search", "settings", "help", "close", "next", "previous", "item", "message", "folder")
+
+class FakeTree(object):
+	"""A synthetic tree. shape is "wide" (few levels with many children), "deep" (long chains with few children)
+	or "mixed" (random fan-out). hidden is the fraction of objects that are not visible.
+	"""
+
+	SHAPES = ("wide", "deep", "mixed")
+
+	def __init__(self, nodes=10000, shape="mixed", seed=1, hidden=0.1, latency=None):
+		if shape not in self.SHAPES:
+			raise ValueError("Unknown shape %s" % shape)
+		self.latency = dict(latency) if latency else {}
+		self.reads = 0
+		self.hidden = hidden
+		self._random = random.Random(seed)
+		self.root = self._makeObject(Role.WINDOW, 0, False)
+		self.root._name = "Benchmark window"
+		self.size = 1
+		self._build(nodes, shape)
+
+	def setLatency(self, seconds, names=PROPERTIES):
+		for name in names:
+			self.latency[name] = seconds
+
+	def _makeObject(self, role, depth, hidden):
+		r = self._random
+		name = None
+		if r.random() < 0.8:
+			name = " ".join([r.choice(WORDS) for i in range(r.randint(1, 3))])
+		description = "description %d" % r.randint(0, 99) if r.random() < 0.1 else None
+		value = "value %d" % r.randint(0, 999) if name is None and r.random() < 0.5 else None
+		states = frozenset([State.FOCUSABLE]) if not hidden else frozenset([State.INVISIBLE])
+		location = (r.randint(0, 1900), r.randint(0, 1000), r.randint(1, 200), r.randint(1, 50))
+		if hidden and r.random() < 0.5:
+			location = None
+		return FakeObject(self, role, name, description, value, states, location, WINDOW_CLASSES[depth%len(WINDOW_CLASSES)])
+
+	def _add(self, parent, depth, container=False):
+		r = self._random
+		role = r.choice(CONTAINER_ROLES) if container else r.choice(ROLES)
+		child = self._makeObject(role, depth, r.random() < self.hidden)
+		child._parent = parent
+		parent._children.append(child)
+		self.size = self.size+1
+		return child
+
+	def _build(self, nodes, shape):
+		r = self._random
+		if shape == "wide":
+			# Ten containers of hundreds of items each
+			containers = [self._add(self.root, 1, True) for i in range(min(10, nodes-1))]
+			while self.size < nodes:
+				self._add(r.choice(containers), 2)
+		elif shape == "deep":
+			# Chains of containers of depth 50 with an item at each level
+			parent = self.root
+			depth = 1
+			while self.size < nodes:
+				if depth >= 50:
+					parent = self.root
+					depth = 1
+				self._add(parent, depth)
+				if self.size < nodes:
+					parent = self._add(parent, depth, True)
+					depth = depth+1
+		else:
+			queue = [(self.root, 0)]
+			while queue and self.size < nodes:
+				parent, depth = queue.pop(r.randrange(len(queue)) if r.random() < 0.3 else 0)
+				for i in range(r.randint(1, 12)):
+					if self.size >= nodes:
+						break
+					child = self._add(parent, depth+1, r.random() < 0.3)
+					queue.append((child, depth+1))
@@ -0,0 +1,131 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector benchmarks: stand-ins for the NVDA modules
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# The add-on imports NVDA modules that only exist inside a running NVDA on Windows.
+# install() puts minimal versions of them in sys.modules so that the scanner, the
+# node table, the filters and the favorites can be run with plain Python.
+# Modules of the interface (wx, gui...) are permissive mocks: the benchmarks do not open windows.
+
+import builtins
+import enum
+import os
+import re
+import sys
+import types
+from unittest import mock
+
+# Roles used by the add-on and by the synthetic trees. Their values are not the ones of NVDA, only the names matter.
+Role = enum.IntEnum("Role", " ".join([
+	"UNKNOWN", "WINDOW", "TITLEBAR", "PANE", "DIALOG", "CHECKBOX", "RADIOBUTTON", "STATICTEXT", "EDITABLETEXT", "BUTTON",
+	"MENUBAR", "MENUITEM", "POPUPMENU", "COMBOBOX", "LIST", "LISTITEM", "GRAPHIC", "LINK", "TREEVIEW", "TREEVIEWITEM",
+	"TAB", "TABCONTROL", "SLIDER", "PROGRESSBAR", "SCROLLBAR", "STATUSBAR", "TABLE", "TABLECELL", "TABLECOLUMN", "TABLEROW",
+	"TABLECOLUMNHEADER", "TABLEROWHEADER", "FRAME", "TOOLBAR", "DROPDOWNBUTTON", "SEPARATOR", "FORM", "HEADING", "DOCUMENT",
+	"APPLICATION", "GROUPING", "PROPERTYPAGE", "CANVAS", "CAPTION", "CHECKMENUITEM", "ICON", "DIRECTORYPANE", "GLASSPANE",
+	"LABEL", "RADIOMENUITEM", "RICHEDIT", "SECTION", "TOGGLEBUTTON", "SPLITBUTTON", "MENUBUTTON", "SPINBUTTON",
+	"DESKTOPPANE", "OPTIONPANE", "COLORCHOOSER", "MENU", "PANEL", "PASSWORDEDIT", "DATAITEM", "PARAGRAPH",
+	]), start=0)
+
+class State(enum.IntEnum):
+	UNAVAILABLE = 0x1
+	FOCUSED = 0x2
+	SELECTED = 0x4
+	BUSY = 0x8
+	PRESSED = 0x10
+	CHECKED = 0x20
+	HALFCHECKED = 0x40
+	READONLY = 0x80
+	EXPANDED = 0x100
+	COLLAPSED = 0x200
+	INVISIBLE = 0x400
+	VISITED = 0x800
+	LINKED = 0x1000
+	HASPOPUP = 0x2000
+	PROTECTED = 0x4000
+	REQUIRED = 0x8000
+	DEFUNCT = 0x10000
+	INVALID_ENTRY = 0x20000
+	MODAL = 0x40000
+	AUTOCOMPLETE = 0x80000
+	MULTILINE = 0x100000
+	ICONIFIED = 0x200000
+	OFFSCREEN = 0x400000
+	SELECTABLE = 0x800000
+	FOCUSABLE = 0x1000000
+
+def specDefault(spec):
+	# Value of the default of a confspec entry, such as "integer(default=60, min=0)"
+	kind = spec[:spec.index("(")]
+	value = re.search(r"default=(list\(\)|[^,)]*)", spec).group(1).strip()
+	if kind == "boolean":
+		return value == "True"
+	if kind == "integer":
+		return int(value)
+	if kind == "float":
+		return float(value)
+	if kind == "string_list":
+		return []
+	return value.strip("\"'")
+
+class Spec(dict):
+	# config.conf.spec: when the add-on registers its confspec, the settings it does not have yet take their defaults
+	def __init__(self, conf):
+		dict.__init__(self)
+		self.conf = conf
+
+	def __setitem__(self, section, spec):
+		dict.__setitem__(self, section, spec)
+		values = self.conf.setdefault(section, {})
+		for name, entry in spec.items():
+			values.setdefault(name, specDefault(entry))
+
+class Conf(dict):
+	# config.conf: sections are plain dictionaries, spec receives the confspec of the add-on
+	def __init__(self):
+		dict.__init__(self)
+		self.spec = Spec(self)
+
+class StubClass(object):
+	# Base of the wx classes that the add-on subclasses; any attribute is a mock
+	def __init__(self, *args, **kwargs):
+		pass
+
+	def __getattr__(self, name):
+		value = mock.MagicMock(name=name)
+		object.__setattr__(self, name, value)
+		return value
+
+def permissiveModule(name):
+	module = mock.MagicMock(name=name)
+	module.__name__ = name
+	return module
+
+def install():
+	"""Puts the stand-ins of the NVDA modules in sys.modules and the add-on folder in sys.path.
+	Returns the config.conf section of the add-on.
+	"""
+	if "controlTypes" in sys.modules and getattr(sys.modules["controlTypes"], "Role", None) is Role:
+		return sys.modules["config"].conf["objInspector"]
+	controlTypes = types.ModuleType("controlTypes")
+	controlTypes.Role = Role
+	controlTypes.State = State
+	controlTypes.role = types.SimpleNamespace(_roleLabels=dict([(role, role.name.lower()) for role in Role]))
+	sys.modules["controlTypes"] = controlTypes
+	config = types.ModuleType("config")
+	config.conf = Conf()
+	# Filled with the defaults of the confspec when the add-on is imported, the settings users get
+	config.conf["objInspector"] = {}
+	sys.modules["config"] = config
+	addonHandler = types.ModuleType("addonHandler")
+	addonHandler.initTranslation = lambda: None
+	sys.modules["addonHandler"] = addonHandler
+	builtins._ = lambda text: text
+	for name in ("globalPluginHandler", "api", "ui", "winUser", "gui", "wx", "globalCommands", "globalVars",
+	"scriptHandler", "tones", "logHandler", "core", "eventHandler", "NVDAObjects", "mouseHandler", "textInfos"):
+		sys.modules[name] = permissiveModule(name)
+	sys.modules["globalPluginHandler"].GlobalPlugin = StubClass
+	for name in ("Dialog", "ListCtrl", "Frame", "Panel"):
+		setattr(sys.modules["wx"], name, type(name, (StubClass,), {}))
+	sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "addon", "globalPlugins"))
+	return config.conf["objInspector"]
@@ -0,0 +1,135 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector benchmarks: replay of recorded trees
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# Loads a file written by the "Record scanned trees to files" option of the add-on
+# (see objInspector/recorder.py) and gives back its objects as fake NVDAObjects.
+# Each property returns the value that was read in the application and can take
+# the time it took there, multiplied by speed.
+
+import gzip
+import json
+from time import perf_counter
+from controlTypes import Role, State
+
+class ReplayApp(object):
+
+	def __init__(self, appName):
+		self.appName = appName
+		self.productName = appName
+
+class ReplayObject(object):
+	"""Object of a recorded tree. Properties that were not read during the recording have empty values."""
+
+	windowHandle = 1
+	processID = 1
+
+	def __init__(self, tree, node):
+		self._tree = tree
+		self.node = node
+		self._values = {}
+		# Mean seconds of each property in the recording
+		self._latency = {}
+		self._parent = None
+
+	def _read(self, name, default=None):
+		latency = self._latency.get(name)
+		if latency and self._tree.speed:
+			end = perf_counter()+latency*self._tree.speed
+			while perf_counter() < end:
+				pass
+		self._tree.reads = self._tree.reads+1
+		return self._values.get(name, default)
+
+	@property
+	def appModule(self):
+		return self._tree.app
+
+	@property
+	def children(self):
+		return list(self._read("children", ()))
+
+	@property
+	def childCount(self):
+		count = self._read("childCount")
+		if count is None:
+			count = len(self._values.get("children", ()))
+		return count
+
+	@property
+	def parent(self):
+		self._read("parent")
+		return self._parent
+
+	@property
+	def states(self):
+		return self._read("states", frozenset())
+
+	def __repr__(self):
+		return "<ReplayObject %d %s>" % (self.node, self._values.get("name"))
+
+def makeProperty(name):
+	def getter(self):
+		return self._read(name)
+	return property(getter)
+
+for name in ("role", "name", "description", "value", "location", "windowClassName"):
+	setattr(ReplayObject, name, makeProperty(name))
+
+class ReplayTree(object):
+	"""Tree of a recording. speed multiplies the recorded time of each property read, 0 answers at once."""
+
+	def __init__(self, path, speed=0.0):
+		self.path = path
+		self.speed = speed
+		self.reads = 0
+		self.nodes = {}
+		# Reads and total seconds of the recording by property name
+		self.recorded = {}
+		with gzip.open(path, "rt", encoding="utf-8") as recording:
+			header = json.loads(recording.readline())
+			if header.get("version") != 1:
+				raise ValueError("Unknown recording version %s" % header.get("version"))
+			self.app = ReplayApp(header.get("appName", ""))
+			latencies = {}
+			for line in recording:
+				node, name, value, microseconds = json.loads(line)
+				obj = self._node(node)
+				if name not in obj._values:
+					# The first value read is kept, later reads of the same property only add their time
+					obj._values[name] = self._decode(name, value)
+				total = latencies.setdefault((node, name), [0, 0])
+				total[0] = total[0]+1
+				total[1] = total[1]+microseconds
+				entry = self.recorded.setdefault(name, [0, 0.0])
+				entry[0] = entry[0]+1
+				entry[1] = entry[1]+microseconds/1000000.0
+		for (node, name), (count, microseconds) in latencies.items():
+			self.nodes[node]._latency[name] = microseconds/1000000.0/count
+		self.root = self._node(0)
+		self.size = len(self.nodes)
+		self.linkParents()
+
+	def _node(self, node):
+		obj = self.nodes.get(node)
+		if obj is None:
+			obj = self.nodes[node] = ReplayObject(self, node)
+		return obj
+
+	def _decode(self, name, value):
+		if name == "children":
+			return [self._node(child) for child in value]
+		if name == "role":
+			return Role.__members__.get(value, Role.UNKNOWN)
+		if name == "states":
+			return frozenset([State.__members__[state] for state in value if state in State.__members__])
+		if name == "location":
+			return tuple(value) if value else None
+		return value
+
+	def linkParents(self):
+		# Parents are not recorded, they are taken from the lists of children
+		for obj in list(self.nodes.values()):
+			for child in obj._values.get("children", ()):
+				child._parent = obj
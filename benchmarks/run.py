@@ -0,0 +1,284 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector benchmarks
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# Measures the scan, the scan again reusing the previous one, the captions, the filters, the favorites hashes, the paths resolved through a trie, the marking
+# of favorites, the snapshot files, the differences between scans and the queries on synthetic trees, without NVDA. Run from the root of the repository:
+#   python benchmarks/run.py --shape mixed --nodes 20000 --latency 5
+#   python benchmarks/run.py --save baseline.json
+#   python benchmarks/run.py --compare baseline.json
+#   python benchmarks/run.py --replay outlook-20240101-120000.oir.gz --speed 1
+# --latency is the microseconds that each property read takes. With --compare the
+# exit code is 1 if a benchmark is slower than the baseline by more than --tolerance.
+# --replay uses a tree recorded by the add-on instead of a synthetic one; --speed
+# multiplies the time that each property read took in the application.
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import nvdaStubs
+nvdaStubs.install()
+
+from fakeTree import FakeTree
+from replay import ReplayTree
+import objInspector
+from objInspector.scanner import Scanner, ScanLimits
+from objInspector.nodeTable import OBJECT, makeCaption, favoriteHash
+from objInspector.filters import FilterEngine
+from objInspector.favorites import FavoritesStore
+from objInspector.snapshotFile import exportTable, SnapshotTable
+from objInspector.treeDiff import TreeDiff
+from objInspector.pathTrie import PathTrie
+from objInspector.query import Query, Finder
+from objInspector.spatialIndex import SpatialIndex
+from controlTypes import Role
+from types import SimpleNamespace
+
+def percentile(values, fraction):
+	values = sorted(values)
+	if not values:
+		return 0.0
+	return values[min(int(fraction*len(values)), len(values)-1)]
+
+class Measure(object):
+	"""Timings of a benchmark. samples are seconds per operation, items the number of items of each operation."""
+
+	def __init__(self, name, items):
+		self.name = name
+		self.items = items
+		self.samples = []
+		self.peak = 0
+
+	def time(self, function, *args):
+		start = perf_counter()
+		result = function(*args)
+		self.samples.append(perf_counter()-start)
+		return result
+
+	def memory(self, function, *args):
+		# Peak of the memory allocated by Python while function runs, in a separate run because tracing is slow
+		gc.collect()
+		tracemalloc.start()
+		result = function(*args)
+		self.peak = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+		return result
+
+	def summary(self):
+		median = percentile(self.samples, 0.5)
+		return {
+			"name": self.name,
+			"items": self.items,
+			"throughput": self.items/median if median else 0.0,
+			"p50": median,
+			"p95": percentile(self.samples, 0.95),
+			"max": max(self.samples) if self.samples else 0.0,
+			"peak": self.peak,
+		}
+
+def scanBenchmarks(tree, args):
+	limits = ScanLimits(documents=True, workers=args.workers)
+	result = Scanner(limits).scan(tree.root)
+	scan = Measure("scan", len(result))
+	for i in range(args.repeat):
+		scan.time(lambda: Scanner(limits).scan(tree.root))
+	scan.memory(lambda: Scanner(limits).scan(tree.root))
+	# Scan of the same window again with the previous one as reference: the unchanged subtrees are only checked
+	rescan = Measure("rescan reuse", len(result))
+	for i in range(args.repeat):
+		rescan.time(lambda: Scanner(limits, reference=result).scan(tree.root))
+	table = result.table
+	snapshots = [table.snapshot(i) for i in range(len(table))]
+	captions = Measure("captions", len(table))
+	for i in range(args.repeat):
+		captions.time(lambda: [makeCaption(snapshot) for snapshot in snapshots])
+	views = Measure("views", len(table))
+	for i in range(args.repeat):
+		views.time(lambda: list(table))
+	views.memory(lambda: list(table))
+	return result, [scan, rescan, captions, views]
+
+def hashBenchmarks(table, tree, args):
+	# Hashes rebuilt from the table and the legacy hash of getObjectHash, which walks the live objects
+	hashes = Measure("hashes", len(table))
+	for i in range(args.repeat):
+		hashes.time(lambda: [favoriteHash(table.appName, table.snapshot(index), *table.signature(index)) for index in range(len(table))])
+	sample = list(table)[:args.sample]
+	standalone = [OBJECT(view.obj, view.ancestry, view.snapshot) for view in sample]
+	legacy = Measure("legacy hashes", len(standalone))
+	for i in range(args.repeat):
+		# Objects out of the scan walk their paths through a new trie, as after each scan
+		dialog = SimpleNamespace(objects=[table[0]], appName=table.appName, pathTrie=PathTrie(tree.root))
+		legacy.time(lambda: [objInspector.ObjectsListDialog.getObjectHash(dialog, OBJ) for OBJ in standalone])
+	paths = Measure("path trie", len(table))
+	ancestries = [table.ancestry(index) for index in range(len(table))]
+	for i in range(args.repeat):
+		paths.time(lambda: PathTrie(tree.root).resolve(ancestries))
+	return [hashes, legacy, paths]
+
+def filterBenchmarks(objects, args):
+	# Typing a word character by character, each keystroke is an operation
+	engine = FilterEngine(objInspector.getRoleCategories())
+	# Keys are computed by the first filter after a reset
+	reset = Measure("filter keys", len(objects))
+	for i in range(args.repeat):
+		reset.time(lambda: (engine.reset(objects), engine.filter("")))
+	keystrokes = Measure("filter keystroke", len(objects))
+	for i in range(args.repeat):
+		for word in ("settings", "item", "open file"):
+			engine.filter("")
+			for end in range(1, len(word)+1):
+				keystrokes.time(engine.filter, word[:end])
+	categories = Measure("filter category", len(objects))
+	for i in range(args.repeat):
+		for category in range(1, 5):
+			categories.time(engine.filter, "", category, True)
+	return [reset, keystrokes, categories]
+
+def favoritesBenchmarks(objects, args):
+	store = FavoritesStore(path=os.devnull)
+	# Half of the favorites are in the scan, the other half belong to other windows
+	for OBJ in objects[::max(1, len(objects)//args.favorites)][:args.favorites//2]:
+		store.add(OBJ.hash, "benchmark", OBJ.caption)
+	for i in range(args.favorites//2):
+		store.add(os.urandom(16), "other", "")
+	mark = Measure("favorites mark", len(objects))
+	for i in range(args.repeat):
+		mark.time(store.mark, objects, "benchmark")
+	return [mark]
+
+def snapshotBenchmarks(table, args):
+	# Writing a snapshot, opening it and reading the captions of a page of the list, as the dialog does
+	folder = tempfile.mkdtemp()
+	path = os.path.join(folder, "benchmark.ois")
+	export = Measure("snapshot export", len(table))
+	for i in range(args.repeat):
+		export.time(exportTable, table, path)
+	load = Measure("snapshot open", len(table))
+	page = Measure("snapshot page", 30)
+	for i in range(args.repeat):
+		snapshot = load.time(SnapshotTable, path)
+		page.time(lambda: [snapshot.caption(index) for index in range(len(snapshot)//2, min(len(snapshot)//2+30, len(snapshot)))])
+		snapshot.close()
+	os.remove(path)
+	os.rmdir(folder)
+	return [export, load, page]
+
+def diffBenchmarks(table, tree, args):
+	# Two scans of the same tree: every object is matched and compared
+	other = Scanner(ScanLimits(documents=True, workers=args.workers)).scan(tree.root).table
+	diff = Measure("tree diff", len(table))
+	for i in range(args.repeat):
+		diff.time(TreeDiff, table, other)
+	return [diff]
+
+def queryBenchmarks(table, tree, args):
+	# Checkboxes with a description, a few objects spread over the whole tree: all of them and the first one
+	query = Query(role=Role.CHECKBOX, description="^description")
+	queryAll = Measure("query all", len(table))
+	queryFirst = Measure("query first", len(table))
+	for i in range(args.repeat):
+		queryAll.time(Finder(query).find, tree.root)
+		queryFirst.time(Finder(query).find, tree.root, 1)
+	return [queryAll, queryFirst]
+
+def spatialBenchmarks(table, args):
+	# Points and rectangles spread over the screen of the fake tree; items are the queries of each operation
+	rng = random.Random(args.seed)
+	points = [(rng.randrange(1900), rng.randrange(1000)) for i in range(1000)]
+	regions = [(x, y, x+200, y+150) for x, y in points[:100]]
+	build = Measure("spatial index", len(table))
+	pointQueries = Measure("spatial point", len(points))
+	regionQueries = Measure("spatial region", len(regions))
+	nearestQueries = Measure("spatial nearest", len(points))
+	focusable = lambda row: row % 3 == 0
+	for i in range(args.repeat):
+		index = build.time(SpatialIndex, table)
+		pointQueries.time(lambda: [index.at(x, y) for x, y in points])
+		regionQueries.time(lambda: [index.inside(*region) for region in regions])
+		nearestQueries.time(lambda: [index.nearest(x, y, focusable, 10) for x, y in points])
+	build.memory(SpatialIndex, table)
+	return [build, pointQueries, regionQueries, nearestQueries]
+
+def report(results, args, tree):
+	if args.replay:
+		print("Tree: %s, %d objects, %g times the recorded latency, %d workers" % (args.replay, tree.size, args.speed, args.workers))
+	else:
+		print("Tree: %s, %d objects, latency %g us per property read, %d workers" % (args.shape, tree.size, args.latency, args.workers))
+	print("%-18s %8s %14s %10s %10s %10s %10s" % ("benchmark", "items", "items/s", "p50 ms", "p95 ms", "max ms", "peak KB"))
+	for result in results:
+		print("%-18s %8d %14.0f %10.3f %10.3f %10.3f %10s" % (result["name"], result["items"], result["throughput"],
+		result["p50"]*1000, result["p95"]*1000, result["max"]*1000, result["peak"]//1024 if result["peak"] else "-"))
+
+def compare(results, path, tolerance, args):
+	# Returns the names of the benchmarks whose median is slower than the baseline by more than tolerance
+	with open(path) as baselineFile:
+		data = json.load(baselineFile)
+	for name in ("shape", "nodes", "seed", "latency", "workers", "replay", "speed"):
+		if data["arguments"].get(name) != getattr(args, name):
+			print("Warning: the baseline was run with --%s %s" % (name, data["arguments"].get(name)))
+	baseline = dict([(result["name"], result) for result in data["results"]])
+	regressions = []
+	for result in results:
+		old = baseline.get(result["name"])
+		if not old or not old["p50"]:
+			continue
+		ratio = result["p50"]/old["p50"]
+		print("%-18s %6.2fx baseline" % (result["name"], ratio))
+		if ratio > 1+tolerance:
+			regressions.append(result["name"])
+	return regressions
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmarks of objInspector on synthetic trees")
+	parser.add_argument("--shape", choices=FakeTree.SHAPES, default="mixed")
+	parser.add_argument("--nodes", type=int, default=20000)
+	parser.add_argument("--seed", type=int, default=1)
+	parser.add_argument("--latency", type=float, default=0.0, help="microseconds per property read")
+	parser.add_argument("--workers", type=int, default=1)
+	parser.add_argument("--repeat", type=int, default=5)
+	parser.add_argument("--sample", type=int, default=1000, help="objects used for the legacy hashes")
+	parser.add_argument("--favorites", type=int, default=1000)
+	parser.add_argument("--replay", help="file of a tree recorded by the add-on")
+	parser.add_argument("--speed", type=float, default=0.0, help="multiplier of the recorded latency, 0 for none")
+	parser.add_argument("--save", help="write the results to a JSON file")
+	parser.add_argument("--compare", help="JSON file of a previous run to compare with")
+	parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline, 0.2 is 20%%")
+	args = parser.parse_args()
+	if args.replay:
+		tree = ReplayTree(args.replay, args.speed)
+	else:
+		tree = FakeTree(args.nodes, args.shape, args.seed)
+		tree.setLatency(args.latency/1000000.0)
+	result, measures = scanBenchmarks(tree, args)
+	objects = list(result.table)
+	measures.extend(hashBenchmarks(result.table, tree, args))
+	measures.extend(filterBenchmarks(objects, args))
+	measures.extend(favoritesBenchmarks(objects, args))
+	measures.extend(snapshotBenchmarks(result.table, args))
+	measures.extend(diffBenchmarks(result.table, tree, args))
+	measures.extend(queryBenchmarks(result.table, tree, args))
+	measures.extend(spatialBenchmarks(result.table, args))
+	results = [measure.summary() for measure in measures]
+	report(results, args, tree)
+	if args.save:
+		with open(args.save, "w") as resultsFile:
+			json.dump({"arguments": vars(args), "results": results}, resultsFile, indent=1)
+	if args.compare:
+		regressions = compare(results, args.compare, args.tolerance, args)
+		if regressions:
+			print("Slower than the baseline: %s" % ", ".join(regressions))
+			return 1
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
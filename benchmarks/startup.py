@@ -0,0 +1,51 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector benchmarks: cost of loading the add-on
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# Measures the time to import the add-on and to create its GlobalPlugin, which
+# NVDA does on every start. Each run is a new Python process so that nothing is
+# imported yet. The NVDA modules are the stand-ins of nvdaStubs, so only the cost
+# of the add-on itself is measured.
+#   python benchmarks/startup.py --runs 20
+
+import argparse
+import os
+import subprocess
+import sys
+
+RUN = """
+import sys
+sys.path.insert(0, %r)
+import nvdaStubs
+nvdaStubs.install()
+from time import perf_counter
+start = perf_counter()
+import objInspector
+imported = perf_counter()
+plugin = objInspector.GlobalPlugin()
+created = perf_counter()
+print(imported-start, created-imported, len(sys.modules))
+"""
+
+def percentile(values, fraction):
+	values = sorted(values)
+	return values[min(int(fraction*len(values)), len(values)-1)]
+
+def main():
+	parser = argparse.ArgumentParser(description="Time to load objInspector")
+	parser.add_argument("--runs", type=int, default=10)
+	args = parser.parse_args()
+	code = RUN % os.path.dirname(os.path.abspath(__file__))
+	imports = []
+	inits = []
+	for i in range(args.runs):
+		output = subprocess.check_output([sys.executable, "-c", code]).decode().split()
+		imports.append(float(output[0]))
+		inits.append(float(output[1]))
+	for name, values in (("import", imports), ("init", inits)):
+		print("%-8s p50 %7.2f ms   p95 %7.2f ms" % (name, percentile(values, 0.5)*1000, percentile(values, 0.95)*1000))
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,79 @@
+# -*- coding: UTF-8 -*-
+
+# objInspector tests: favorites saved by previous versions
+# Author: Javi Dominguez <fjavids@gmail.com>
+
+# Run from the root of the repository with: python -m unittest discover tests
+# The NVDA modules are replaced by the stand-ins of the benchmarks.
+
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+import nvdaStubs
+nvdaStubs.install()
+
+from fakeTree import FakeTree
+from objInspector.favorites import FavoritesStore
+from objInspector.nodeTable import makeCaption, takeSnapshot
+from objInspector.pathTrie import PathTrie
+from objInspector.resolver import PathResolver
+from objInspector.scanner import Scanner, ScanLimits
+from objInspector.treeDiff import DiffTable, TreeDiff
+
+class LegacyFavoritesTest(unittest.TestCase):
+
+	def setUp(self):
+		self.tree = FakeTree(2000, "mixed", 1)
+		self.table = Scanner(ScanLimits(documents=True)).scan(self.tree.root).table
+		self.row = len(self.table)//2
+		# Previous versions saved a list of hashes without metadata
+		handle, self.path = tempfile.mkstemp(suffix=".dat")
+		with os.fdopen(handle, "wb") as favoritesFile:
+			pickle.dump([self.table.hash(self.row)], favoritesFile, 2)
+		self.store = FavoritesStore(path=self.path)
+		self.store.load()
+
+	def tearDown(self):
+		os.remove(self.path)
+
+	def testLegacyEntryIsNotResolvableBeforeScan(self):
+		self.assertEqual(self.store.resolvable("benchmark"), [])
+
+	def testMarkedLegacyEntryResolves(self):
+		hash = self.table.hash(self.row)
+		self.assertEqual(self.store.mark(list(self.table), "benchmark"), 1)
+		entry = self.store.entries[hash]
+		self.assertEqual(entry["app"], "benchmark")
+		self.assertEqual(entry["caption"], self.table.caption(self.row))
+		self.assertEqual(self.store.resolvable("benchmark"), [hash])
+		# The jump command resolves it from the foreground object, accepting it by its caption
+		accept = lambda obj: makeCaption(takeSnapshot(obj)) == entry["caption"]
+		resolution = PathResolver().resolve(self.tree.root, entry["path"], entry["steps"], accept)
+		self.assertIs(resolution.obj, self.table.objs[self.row])
+		self.assertFalse(resolution.moved)
+		found = PathTrie(self.tree.root).resolve([entry["path"]], [entry["steps"]])
+		self.assertEqual(found.missing, [])
+
+	def testDiffRowsDoNotGivePath(self):
+		# Rows of the differences between two scans keep the path of the scan but not its signatures
+		self.table.objs[self.row]._description = "Changed"
+		other = Scanner(ScanLimits(documents=True)).scan(self.tree.root).table
+		diff = DiffTable(TreeDiff(self.table, other))
+		self.assertEqual(self.store.mark(list(diff), "benchmark"), 1)
+		self.assertEqual(self.store.resolvable("benchmark"), [])
+		self.store.mark(list(other), "benchmark")
+		self.assertEqual(self.store.resolvable("benchmark"), [self.table.hash(self.row)])
+
+	def testMetadataSurvivesSave(self):
+		self.store.mark(list(self.table), "benchmark")
+		self.store.save()
+		store = FavoritesStore(path=self.path)
+		store.load()
+		self.assertEqual(store.resolvable("benchmark"), [self.table.hash(self.row)])
+
+if __name__ == "__main__":
+	unittest.main()